@@ -0,0 +1,224 @@
+'''
+End-to-end throughput benchmark for the OKX market data pipeline.
+
+Replays a websocket capture through OKX.message_handler, with book and trade
+callbacks that run the slippage and volatility models and serialize every
+update the way the backends do. Per-stage latencies are recorded for each
+message and summarized as p50/p99/p999, along with overall messages/sec and
+peak RSS. Results are written as JSON so runs can be compared:
+
+    python -m benchmarks.pipeline --scale 20 --output before.json
+    python -m benchmarks.pipeline --scale 20 --output after.json --compare before.json
+'''
+import argparse
+import asyncio
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+from yapic import json
+
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback
+from cryptofeed.defines import DECIMAL, FIXED_POINT, FLOAT, L2_BOOK, TICKER, TRADES
+from cryptofeed.exchanges.okx import OKX
+from cryptofeed.util.replay import ReplayConnection, load_symbols
+from models.slippage import SlippageCalculator
+from models.volatility import VolatilityEstimator
+
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_data')
+PERCENTILES = (50, 99, 99.9)
+
+
+class Timings:
+    '''Per-stage durations, in nanoseconds'''
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage: str, coro):
+        samples = self.samples[stage]
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            ret = await coro(*args, **kwargs)
+            samples.append(time.perf_counter_ns() - start)
+            return ret
+        return timed
+
+    def record(self, stage: str, start: int):
+        self.samples[stage].append(time.perf_counter_ns() - start)
+
+    def summary(self) -> dict:
+        ret = {}
+        for stage, samples in self.samples.items():
+            us = np.asarray(samples, dtype=np.float64) / 1_000
+            p50, p99, p999 = np.percentile(us, PERCENTILES)
+            ret[stage] = {'count': len(us), 'mean_us': float(us.mean()), 'p50_us': float(p50), 'p99_us': float(p99), 'p999_us': float(p999), 'max_us': float(us.max())}
+        return ret
+
+
+class MemoryBackend(BackendCallback):
+    '''Serializes like a backend and keeps only the byte count, so no I/O is measured'''
+    def __init__(self, numeric_type=float, none_to=None):
+        self.numeric_type = numeric_type
+        self.none_to = none_to
+        self.bytes = 0
+
+    async def write(self, data):
+        self.bytes += len(json.dumps(data))
+
+
+class MemoryBookBackend(BackendBookCallback):
+    def __init__(self, numeric_type=float, none_to=None, snapshots_only=False, snapshot_interval=1000):
+        self.numeric_type = numeric_type
+        self.none_to = none_to
+        self.snapshots_only = snapshots_only
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_count = defaultdict(int)
+        self.bytes = 0
+
+    async def write(self, data):
+        self.bytes += len(json.dumps(data))
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_feed(rest_capture: str, timings: Timings, numeric_mode: str, quantity: float):
+    subscription = load_symbols(OKX, rest_capture)
+    slippage = SlippageCalculator()
+    volatility = {}
+    book_backend = MemoryBookBackend()
+    backend = MemoryBackend()
+
+    async def book(book, receipt_timestamp):
+        start = time.perf_counter_ns()
+        slippage.estimate(book, quantity)
+        timings.record('slippage', start)
+        start = time.perf_counter_ns()
+        await book_backend(book, receipt_timestamp)
+        timings.record('backend', start)
+
+    async def trade(trade, receipt_timestamp):
+        start = time.perf_counter_ns()
+        if trade.symbol not in volatility:
+            volatility[trade.symbol] = VolatilityEstimator()
+        volatility[trade.symbol].update(trade)
+        timings.record('volatility', start)
+        start = time.perf_counter_ns()
+        await backend(trade, receipt_timestamp)
+        timings.record('backend', start)
+
+    async def ticker(ticker, receipt_timestamp):
+        start = time.perf_counter_ns()
+        await backend(ticker, receipt_timestamp)
+        timings.record('backend', start)
+
+    feed = OKX(subscription=subscription, numeric_mode=numeric_mode, callbacks={L2_BOOK: book, TRADES: trade, TICKER: ticker})
+    feed.book_callback = timings.wrap('book_callback', feed.book_callback)
+    return feed, (book_backend, backend)
+
+
+async def run(capture: str, feed, timings: Timings, scale: int) -> int:
+    '''
+    Play the capture scale times in a row. Every pass starts with the book
+    snapshots, so repeated passes are valid input; receipt timestamps are
+    shifted forward by the capture's length each pass.
+    '''
+    handler = timings.wrap('message_handler', feed.message_handler)
+    messages = 0
+    offset = 0.0
+    for _ in range(scale):
+        conn = ReplayConnection(capture)
+        first = None
+        async with conn.connect():
+            async for data in conn.read():
+                if first is None:
+                    first = conn.last_message
+                await handler(data, conn, conn.last_message + offset)
+        messages += conn.received
+        if first is not None:
+            offset += conn.last_message - first
+    return messages
+
+
+def compare(results: dict, baseline: dict):
+    print(f"\n{'':24}{'baseline':>14}{'current':>14}{'change':>10}")
+
+    def row(name, old, new):
+        change = (new - old) / old * 100 if old else float('nan')
+        print(f'{name:24}{old:14.2f}{new:14.2f}{change:+9.1f}%')
+
+    row('messages/sec', baseline['messages_per_sec'], results['messages_per_sec'])
+    row('peak rss (MB)', baseline['peak_rss_mb'], results['peak_rss_mb'])
+    for stage, stats in results['stages'].items():
+        if stage not in baseline['stages']:
+            continue
+        for key in ('p50_us', 'p99_us', 'p999_us'):
+            row(f'{stage} {key[:-3]}', baseline['stages'][stage][key], stats[key])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capture', default=os.path.join(SAMPLE_DATA, 'OKX.ws.1.0'), help='websocket capture to replay')
+    parser.add_argument('--rest-capture', default=os.path.join(SAMPLE_DATA, 'OKX.0'), help='REST capture holding the symbol data and subscription')
+    parser.add_argument('--scale', type=int, default=1, help='number of times the capture is replayed back to back')
+    parser.add_argument('--numeric-mode', default=DECIMAL, choices=(DECIMAL, FLOAT, FIXED_POINT))
+    parser.add_argument('--quantity', type=float, default=1.0, help='order size priced by the slippage model on every book update')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    timings = Timings()
+    feed, backends = build_feed(args.rest_capture, timings, args.numeric_mode, args.quantity)
+    start = time.perf_counter()
+    messages = asyncio.run(run(args.capture, feed, timings, args.scale))
+    elapsed = time.perf_counter() - start
+
+    results = {
+        'benchmark': 'pipeline',
+        'created': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'args': vars(args),
+        'messages': messages,
+        'elapsed_sec': elapsed,
+        'messages_per_sec': messages / elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'backend_bytes': sum(b.bytes for b in backends),
+        'stages': timings.summary()
+    }
+
+    print(f"{messages} messages in {elapsed:.3f}s, {results['messages_per_sec']:,.0f} msg/s, peak RSS {results['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':24}{'count':>10}{'p50 us':>10}{'p99 us':>10}{'p999 us':>10}")
+    for stage, stats in results['stages'].items():
+        print(f"{stage:24}{stats['count']:>10}{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}{stats['p999_us']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(json.dumps(results))
+    if args.compare:
+        with open(args.compare) as fp:
+            compare(results, json.loads(fp.read()))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -83,6 +83,11 @@ GET = 'GET'
 DELETE = 'DELETE'
 POST = 'POST'
 
+# Numeric modes
+DECIMAL = 'decimal'
+FLOAT = 'float'
+FIXED_POINT = 'fixed_point'
+
 
 """
 L2 Orderbook Layout
@@ -9,6 +9,8 @@ import logging
 import requests
 import time
 
+import numpy as np
+
 from cryptofeed.connection import AsyncConnection, RestEndpoint, Routes, WebsocketEndpoint
 from cryptofeed.defines import CALL, CANCELLED, FILL_OR_KILL, FUTURES, IMMEDIATE_OR_CANCEL, MAKER_OR_CANCEL, MARKET, OKX as OKX_str, LIQUIDATIONS, BUY, OPEN, OPTION, PARTIAL, PERPETUAL, PUT, SELL, FILLED, ASK, BID, FUNDING, L2_BOOK, OPEN_INTEREST, TICKER, TRADES, ORDER_INFO, CANDLES, SPOT, UNFILLED, LIMIT
 from cryptofeed.exchanges.mixins.okx_rest import OKXRestMixin
@@ -16,8 +18,7 @@ from cryptofeed.feed import Feed
 from cryptofeed.exceptions import BadChecksum
 from cryptofeed.symbols import Symbol
 from cryptofeed.types import OrderBook, Trade, Ticker, Funding, OpenInterest, Liquidation, OrderInfo, Candle
-from cryptofeed.exchanges.mixins.okx import OKXMixin
-from cryptofeed.connection import WebsocketConnection
+from cryptofeed.util.book import BookAggregates
 import time
 
 LOG = logging.getLogger("feedhandler")
@@ -36,6 +37,8 @@ FEE_SCHEDULES = {
         {'tier': 2, 'maker': 0.0000, 'taker': 0.0008}
     ]
 }
+# OKX schedule name of each instrument type
+FEE_SCHEDULE_NAMES = {SPOT: 'SPOT', PERPETUAL: 'SWAP', FUTURES: 'FUTURES'}
 
 class OKX(Feed, OKXRestMixin):
     id = OKX_str
@@ -51,6 +54,9 @@ class OKX(Feed, OKXRestMixin):
         ORDER_INFO: 'orders',
         CANDLES: 'candle'
     }
+    # every order book channel is routed to _book. books5 and bbo-tbt push a
+    # full snapshot each time, without an action or checksum
+    book_channels = ('books', 'books5', 'bbo-tbt', 'books-l2-tbt', 'books50-l2-tbt')
     websocket_endpoints = [
         WebsocketEndpoint('wss://ws.okx.com:8443/ws/v5/public', channel_filter=(websocket_channels[L2_BOOK], websocket_channels[TRADES], websocket_channels[TICKER], websocket_channels[FUNDING], websocket_channels[OPEN_INTEREST], websocket_channels[LIQUIDATIONS], websocket_channels[CANDLES]), options={'compression': None}),
         WebsocketEndpoint('wss://ws.okx.com:8443/ws/v5/private', channel_filter=(websocket_channels[ORDER_INFO],), options={'compression': None}),
@@ -90,6 +96,7 @@ class OKX(Feed, OKXRestMixin):
                 s = Symbol(base, quote, expiry_date=expiry, type=stype, option_type=otype, strike_price=strike)
                 ret[s.normalized] = e['instId']
                 info['tick_size'][s.normalized] = e['tickSz']
+                info['lot_size'][s.normalized] = e['lotSz']
                 info['instrument_type'][s.normalized] = stype
 
         return ret, info
@@ -169,6 +176,7 @@ class OKX(Feed, OKXRestMixin):
         '''
         symbol = self.exchange_symbol_to_std_symbol(msg['arg']['instId'])
         ts = int(msg['data'][0][0]) / 1_000
+        px, sz = self.numeric_parsers(symbol)
 
         for entry in msg['data']:
             candle = Candle(
@@ -178,12 +186,12 @@ class OKX(Feed, OKXRestMixin):
                 ts + self.candle_interval_map[self.candle_interval],
                 self.candle_interval,
                 None,
-                Decimal(entry[1]),
-                Decimal(entry[4]),
-                Decimal(entry[2]),
-                Decimal(entry[3]),
-                Decimal(entry[5]),
-                Decimal(entry[6]),
+                px(entry[1]),
+                px(entry[4]),
+                px(entry[2]),
+                px(entry[3]),
+                sz(entry[5]),
+                len(entry) > 8 and entry[8] == '1',
                 timestamp,
                 raw=msg
             )
@@ -194,13 +202,14 @@ class OKX(Feed, OKXRestMixin):
         {"arg": {"channel": "tickers", "instId": "LTC-USD-200327"}, "data": [{"instType": "SWAP","instId": "LTC-USD-SWAP","last": "9999.99","lastSz": "0.1","askPx": "9999.99","askSz": "11","bidPx": "8888.88","bidSz": "5","open24h": "9000","high24h": "10000","low24h": "8888.88","volCcy24h": "2222","vol24h": "2222","sodUtc0": "2222","sodUtc8": "2222","ts": "1597026383085"}]}
         """
         pair = self.exchange_symbol_to_std_symbol(msg['arg']['instId'])
+        px, _ = self.numeric_parsers(pair)
         for update in msg['data']:
             update_timestamp = self.timestamp_normalize(int(update['ts']))
             t = Ticker(
                 self.id,
                 pair,
-                Decimal(update['bidPx']) if update['bidPx'] else Decimal(0),
-                Decimal(update['askPx']) if update['askPx'] else Decimal(0),
+                px(update['bidPx']) if update['bidPx'] else px('0'),
+                px(update['askPx']) if update['askPx'] else px('0'),
                 update_timestamp,
                 raw=update
             )
@@ -255,12 +264,14 @@ class OKX(Feed, OKXRestMixin):
         }
         """
         for trade in msg['data']:
+            symbol = self.exchange_symbol_to_std_symbol(trade['instId'])
+            px, sz = self.numeric_parsers(symbol)
             t = Trade(
                 self.id,
-                self.exchange_symbol_to_std_symbol(trade['instId']),
+                symbol,
                 BUY if trade['side'] == 'buy' else SELL,
-                Decimal(trade['sz']),
-                Decimal(trade['px']),
+                sz(trade['sz']),
+                px(trade['px']),
                 self.timestamp_normalize(int(trade['ts'])),
                 id=trade['tradeId'],
                 raw=trade
@@ -282,39 +293,59 @@ class OKX(Feed, OKXRestMixin):
             await self.callback(FUNDING, f, timestamp)
 
     async def _book(self, msg: dict, timestamp: float):
-        if msg['action'] == 'snapshot':
+        processing_start = time.time()
+        if msg.get('action', 'snapshot') == 'snapshot':
             # snapshot
             pair = self.exchange_symbol_to_std_symbol(msg['arg']['instId'])
+            px, sz = self.numeric_parsers(pair)
             for update in msg['data']:
-                bids = {Decimal(price): Decimal(amount) for price, amount, *_ in update['bids']}
-                asks = {Decimal(price): Decimal(amount) for price, amount, *_ in update['asks']}
+                bids = {px(price): sz(amount) for price, amount, *_ in update['bids']}
+                asks = {px(price): sz(amount) for price, amount, *_ in update['asks']}
                 self._l2_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth, checksum_format=self.id, bids=bids, asks=asks)
+                if self.book_aggregates:
+                    self._l2_book[pair].aggregates = BookAggregates(bands=self.aggregate_bands, top_k=self.aggregate_top_k)
+                    self._l2_book[pair].aggregates.reset(self._l2_book[pair].book)
 
-                if self.checksum_validation and self._l2_book[pair].book.checksum() != (update['checksum'] & 0xFFFFFFFF):
+                checksum = update['checksum'] & 0xFFFFFFFF if 'checksum' in update else None
+                if self.checksum_validation and checksum is not None and self._l2_book[pair].book.checksum() != checksum:
                     raise BadChecksum
-                await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, timestamp=self.timestamp_normalize(int(update['ts'])), checksum=update['checksum'] & 0xFFFFFFFF, raw=msg)
+                await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, timestamp=self.timestamp_normalize(int(update['ts'])), checksum=checksum, raw=msg)
         else:
             # update
             pair = self.exchange_symbol_to_std_symbol(msg['arg']['instId'])
+            px, sz = self.numeric_parsers(pair)
+            aggregates = self._l2_book[pair].aggregates
             for update in msg['data']:
                 delta = {BID: [], ASK: []}
 
                 for side in ('bids', 'asks'):
                     s = BID if side == 'bids' else ASK
+                    levels = self._l2_book[pair].book[s]
                     for price, amount, *_ in update[side]:
-                        price = Decimal(price)
-                        amount = Decimal(amount)
+                        price = px(price)
+                        amount = sz(amount)
                         if amount == 0:
-                            if price in self._l2_book[pair].book[s]:
+                            if price in levels:
                                 delta[s].append((price, 0))
-                                del self._l2_book[pair].book[s][price]
+                                if aggregates is not None:
+                                    aggregates.update(s, price, levels[price], 0)
+                                del levels[price]
                         else:
+                            if aggregates is not None:
+                                aggregates.update(s, price, levels[price] if price in levels else 0, amount)
                             delta[s].append((price, amount))
-                            self._l2_book[pair].book[s][price] = amount
+                            levels[price] = amount
+                if aggregates is not None:
+                    aggregates.refresh()
                 if self.checksum_validation and self._l2_book[pair].book.checksum() != (update['checksum'] & 0xFFFFFFFF):
                     raise BadChecksum
                 await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, timestamp=self.timestamp_normalize(int(update['ts'])), raw=msg, delta=delta, checksum=update['checksum'] & 0xFFFFFFFF)
 
+        # latency tracking
+        self.latency_stats['count'] += 1
+        self.latency_stats['total'] += (processing_start - timestamp) * 1000
+        self.latency_stats['processing_ms'] = (time.time() - processing_start) * 1000
+
     async def _order(self, msg: dict, timestamp: float):
         '''
         {
@@ -374,9 +405,9 @@ class OKX(Feed, OKXRestMixin):
         '''
         status = msg['data'][0]['state']
         if status == 'canceled':
-            status == CANCELLED
+            status = CANCELLED
         elif status == 'live':
-            status == OPEN
+            status = OPEN
         elif status == 'partially-filled':
             status = PARTIAL
         elif status == 'filled':
@@ -416,7 +447,7 @@ class OKX(Feed, OKXRestMixin):
         # DEFLATE compression, no header
         # msg = zlib.decompress(msg, -15)
         # not required, as websocket now set to "Per-Message Deflate"
-        msg = json.loads(msg, parse_float=Decimal)
+        msg = json.loads(msg, parse_float=self.parse_float)
 
         if 'event' in msg:
             if msg['event'] == 'error':
@@ -428,23 +459,37 @@ class OKX(Feed, OKXRestMixin):
             else:
                 LOG.warning("%s: Unhandled event %s", self.id, msg)
         elif 'arg' in msg:
-            if self.websocket_channels[L2_BOOK] in msg['arg']['channel']:
-                await self._book(msg, timestamp)
-            elif self.websocket_channels[TICKER] in msg['arg']['channel']:
-                await self._ticker(msg, timestamp)
-            elif self.websocket_channels[TRADES] in msg['arg']['channel']:
-                await self._trade(msg, timestamp)
-            elif self.websocket_channels[CANDLES] in msg['arg']['channel']:
-                await self._candle(msg, timestamp)
-            elif self.websocket_channels[FUNDING] in msg['arg']['channel']:
-                await self._funding(msg, timestamp)
-            elif self.websocket_channels[ORDER_INFO] in msg['arg']['channel']:
-                await self._order(msg, timestamp)
-            elif self.websocket_channels[OPEN_INTEREST] in msg['arg']['channel']:
-                await self._open_interest(msg, timestamp)
+            channel = msg['arg']['channel']
+            try:
+                handler = self._handlers[channel]
+            except KeyError:
+                handler = self._resolve_handler(channel)
+            if handler is None:
+                self.unhandled_channels[channel] += 1
+                if self.unhandled_channels[channel] == 1:
+                    LOG.warning("%s: Unhandled channel %s", self.id, channel)
+            else:
+                await handler(msg, timestamp)
         else:
             LOG.warning("%s: Unhandled message %s", self.id, msg)
 
+    def _resolve_handler(self, channel: str):
+        '''
+        Handler for a channel name not in the dispatch table yet. Candle channels
+        carry their interval in the name (candle1m, candle1Dutc), anything else
+        unknown resolves to None. The result is cached so each name is resolved once.
+        '''
+        prefix = self.websocket_channels[CANDLES]
+        interval = channel[len(prefix):]
+        if interval.endswith('utc'):
+            interval = interval[:-3]
+        if channel.startswith(prefix) and interval in self.valid_candle_intervals:
+            handler = self._candle
+        else:
+            handler = None
+        self._handlers[channel] = handler
+        return handler
+
     async def subscribe(self, connection: AsyncConnection):
         channels = []
         for chan in self.subscription:
@@ -475,6 +520,9 @@ class OKX(Feed, OKXRestMixin):
             subscription_dict = {"channel": channel,
                                  "instType": self.inst_type_to_okx_type(ticker),
                                  "instId": ticker}
+        elif channel == self.websocket_channels[L2_BOOK]:
+            subscription_dict = {"channel": self.book_channel,
+                                 "instId": ticker}
         elif channel in ['candle']:
             subscription_dict = {"channel": f"{channel}{self.candle_interval}",
                                  "instId": ticker}
@@ -518,11 +566,70 @@ class OKX(Feed, OKXRestMixin):
         sign = self._create_sign(timestamp, key_secret)
         return timestamp, sign
     
-    def __init__(self, **kwargs):
+    def __init__(self, fee_tier=1, book_channel='books', book_aggregates=False, aggregate_bands=(10, 50, 100), aggregate_top_k=20, **kwargs):
+        """
+        fee_tier: int
+            OKX fee tier used by calculate_fee, may be changed at any time
+        book_channel: str
+            OKX channel subscribed for L2_BOOK, one of book_channels
+        book_aggregates: bool
+            maintain a BookAggregates (volume, notional, depth inside aggregate_bands bps
+            of mid, top aggregate_top_k levels) on every L2 book, updated from the levels
+            each delta changes. Exposed as OrderBook.aggregates
+        """
+        if book_channel not in self.book_channels:
+            raise ValueError(f"{book_channel} is not an OKX book channel, expected one of {self.book_channels}")
         super().__init__(**kwargs)
-        self.fee_tier = kwargs.get('fee_tier', 1)  # Default to tier 1
-        self._fee_schedules = FEE_SCHEDULES
+        # (instrument type, tier) -> (taker, maker) rates, parsed once
+        self._fee_rates = {
+            (instrument_type, s['tier']): (self.parse_float(str(s['taker'])), self.parse_float(str(s['maker'])))
+            for instrument_type, name in FEE_SCHEDULE_NAMES.items()
+            for s in FEE_SCHEDULES.get(name, [])
+        }
+        self._symbol_fee_rates = {}
+        self.fee_tier = fee_tier
+        self.book_channel = book_channel
+        # exchange channel name -> bound handler, see _resolve_handler
+        self._handlers = {
+            self.websocket_channels[TICKER]: self._ticker,
+            self.websocket_channels[TRADES]: self._trade,
+            self.websocket_channels[FUNDING]: self._funding,
+            self.websocket_channels[ORDER_INFO]: self._order,
+            self.websocket_channels[OPEN_INTEREST]: self._open_interest,
+            f"{self.websocket_channels[CANDLES]}{self.candle_interval}": self._candle
+        }
+        self._handlers.update({channel: self._book for channel in self.book_channels})
+        self.unhandled_channels = defaultdict(int)
+        self.book_aggregates = book_aggregates
+        self.aggregate_bands = aggregate_bands
+        self.aggregate_top_k = aggregate_top_k
+        self.last_update = time.time()
+        self.latency_stats = {'count': 0, 'total': 0}
         
+    @property
+    def fee_tier(self) -> int:
+        return self._fee_tier
+
+    @fee_tier.setter
+    def fee_tier(self, tier: int):
+        self._fee_tier = tier
+        self._symbol_fee_rates.clear()
+
+    def fee_rates(self, symbol: str) -> tuple:
+        """
+        (taker, maker) rates of symbol at the current fee tier, resolved from
+        the compiled schedules on first use and cached per symbol
+        """
+        rates = self._symbol_fee_rates.get(symbol)
+        if rates is None:
+            instrument_type = self.instrument_type(symbol)
+            rates = self._fee_rates.get((instrument_type, self.fee_tier))
+            if rates is None:
+                LOG.warning("%s: No fee schedule found for %s tier %s", self.id, instrument_type, self.fee_tier)
+                rates = (self.parse_float('0'), self.parse_float('0'))
+            self._symbol_fee_rates[symbol] = rates
+        return rates
+
     def calculate_fee(self, symbol: str, notional: Decimal, is_maker: bool = False) -> Decimal:
         """
         Calculate fees based on instrument type and fee tier
@@ -533,66 +640,12 @@ class OKX(Feed, OKXRestMixin):
         Returns:
             Decimal: Fee amount
         """
-        instrument_type = self.instrument_type(symbol).upper()
-        schedule = next(
-            (s for s in self._fee_schedules.get(instrument_type, []) 
-             if s['tier'] == self.fee_tier),
-            None
-        )
-        
-        if not schedule:
-            LOG.warning(f"No fee schedule found for {instrument_type} tier {self.fee_tier}")
-            return Decimal(0)
-            
-        rate = schedule['maker'] if is_maker else schedule['taker']
-        return notional * Decimal(str(rate))
-    
-    async def _order(self, msg: dict, timestamp: float):
-        '''
-        [Previous _order implementation...]
-        '''
-        # Add fee calculation to order info
-        oi = OrderInfo(
-            self.id,
-            self.exchange_symbol_to_std_symbol(msg['data'][0]['instId'].upper()),
-            msg['data'][0]['ordId'],
-            BUY if msg['data'][0]['side'].lower() == 'buy' else SELL,
-            status,
-            o_type,
-            Decimal(msg['data'][0]['px']) if msg['data'][0]['px'] else Decimal(msg['data'][0]['avgPx']),
-            Decimal(msg['data'][0]['sz']),
-            Decimal(msg['data'][0]['sz']) - Decimal(msg['data'][0]['accFillSz']) if msg['data'][0]['accFillSz'] else Decimal(msg['data'][0]['sz']),
-            self.timestamp_normalize(int(msg['data'][0]['uTime'])),
-            fee=self.calculate_fee(
-                self.exchange_symbol_to_std_symbol(msg['data'][0]['instId']),
-                Decimal(msg['data'][0]['fillNotionalUsd']) if msg['data'][0]['fillNotionalUsd'] else Decimal(0),
-                msg['data'][0]['execType'] == 'M'  # Maker if execution type is M
-            ),
-            raw=msg
-        )
-        await self.callback(ORDER_INFO, oi, timestamp)
-        
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.last_update = time.time()
-        self.latency_stats = {'count': 0, 'total': 0}
-    
-    async def _book(self, msg: dict, timestamp: float):
-        """Override book handler to add latency tracking"""
-        receipt = time.time()
-        processing_start = time.time()
-        
-        # Original processing
-        await super()._book(msg, timestamp)
-        
-        # Latency measurement
-        processing_time = (time.time() - processing_start) * 1000
-        total_latency = (receipt - timestamp) * 1000
-        self.latency_stats['count'] += 1
-        self.latency_stats['total'] += total_latency
-        
-        return {
-            'processing_ms': processing_time,
-            'total_latency_ms': total_latency,
-            'avg_latency_ms': self.latency_stats['total'] / self.latency_stats['count']
-        }
+        return notional * self.fee_rates(symbol)[1 if is_maker else 0]
+
+    def calculate_fees(self, symbol: str, notionals, is_maker) -> np.ndarray:
+        """
+        Fees of a batch of fills on symbol, as floats. is_maker is a bool or
+        an array of bools broadcastable against notionals.
+        """
+        rates = np.array(self.fee_rates(symbol), dtype=np.float64)
+        return np.asarray(notionals, dtype=np.float64) * rates[np.asarray(is_maker, dtype=np.intp)]
@@ -1,6 +1,7 @@
 import asyncio
 from collections import defaultdict
 import logging
+from decimal import Decimal
 from typing import Tuple, Callable, List, Union
 
 from aiohttp.typedefs import StrOrURL
@@ -8,17 +9,27 @@ from aiohttp.typedefs import StrOrURL
 from cryptofeed.callback import Callback
 from cryptofeed.connection import AsyncConnection, HTTPAsyncConn, WSAsyncConn
 from cryptofeed.connection_handler import ConnectionHandler
-from cryptofeed.defines import BALANCES, CANDLES, FUNDING, INDEX, L2_BOOK, L3_BOOK, LIQUIDATIONS, OPEN_INTEREST, ORDER_INFO, POSITIONS, TICKER, TRADES, FILLS
+from cryptofeed.defines import BALANCES, CANDLES, DECIMAL, FIXED_POINT, FLOAT, FUNDING, INDEX, L2_BOOK, L3_BOOK, LIQUIDATIONS, OPEN_INTEREST, ORDER_INFO, POSITIONS, TICKER, TRADES, FILLS
 from cryptofeed.exceptions import BidAskOverlapping
 from cryptofeed.exchange import Exchange
+from cryptofeed.symbols import Symbols
 from cryptofeed.types import OrderBook
 
 
 LOG = logging.getLogger('feedhandler')
 
 
+def fixed_point(increment) -> Callable[[str], int]:
+    '''
+    Returns a parser that converts a numeric string to an integer count of increment
+    (e.g. the tick or lot size). Assumes values are multiples of the increment.
+    '''
+    scale = 1 / float(increment)
+    return lambda value: int(round(float(value) * scale))
+
+
 class Feed(Exchange):
-    def __init__(self, candle_interval='1m', candle_closed_only=True, timeout=120, timeout_interval=30, retries=10, symbols=None, channels=None, subscription=None, callbacks=None, max_depth=0, checksum_validation=False, cross_check=False, exceptions=None, log_message_on_error=False, delay_start=0, http_proxy: StrOrURL = None, **kwargs):
+    def __init__(self, candle_interval='1m', candle_closed_only=True, timeout=120, timeout_interval=30, retries=10, symbols=None, channels=None, subscription=None, callbacks=None, max_depth=0, checksum_validation=False, cross_check=False, exceptions=None, log_message_on_error=False, delay_start=0, http_proxy: StrOrURL = None, numeric_mode=DECIMAL, **kwargs):
         """
         candle_interval: str
             the candle interval. See the specific exchange to see what intervals they support
@@ -53,6 +64,12 @@ class Feed(Exchange):
             on a single exchange, you may encounter 429s. You can use this to stagger the starts.
         http_proxy: str
             URL of proxy server. Passed to HTTPPoll and HTTPAsyncConn. Only used for HTTP GET requests.
+        numeric_mode: str
+            How prices and sizes are parsed by exchanges that support it. DECIMAL (default) builds
+            decimal.Decimal values; FLOAT uses Python floats and skips Decimal construction entirely;
+            FIXED_POINT yields integers: prices as a count of the instrument's tick size and sizes
+            as a count of its lot size. Trade, Ticker, Candle and OrderBook accept these floats and
+            integers, see cryptofeed.types. Checksum validation requires DECIMAL.
         """
         super().__init__(**kwargs)
         self.log_on_error = log_message_on_error
@@ -75,6 +92,14 @@ class Feed(Exchange):
         self.candle_interval = candle_interval
         self.candle_closed_only = candle_closed_only
         self._sequence_no = {}
+        self._numeric_parsers = {}
+
+        if numeric_mode not in (DECIMAL, FLOAT, FIXED_POINT):
+            raise ValueError(f"numeric_mode must be one of {DECIMAL}, {FLOAT}, {FIXED_POINT}")
+        if numeric_mode != DECIMAL and checksum_validation:
+            raise ValueError("Checksum validation requires the decimal numeric mode")
+        self.numeric_mode = numeric_mode
+        self.parse_float = Decimal if numeric_mode == DECIMAL else float
 
         if self.valid_candle_intervals != NotImplemented:
             if candle_interval not in self.valid_candle_intervals:
@@ -140,6 +165,25 @@ class Feed(Exchange):
             if not isinstance(callback, list):
                 self.callbacks[key] = [callback]
 
+    def numeric_parsers(self, symbol: str) -> Tuple[Callable, Callable]:
+        '''
+        (price, size) parsers for a normalized symbol under the configured numeric mode
+        '''
+        try:
+            return self._numeric_parsers[symbol]
+        except KeyError:
+            pass
+
+        if self.numeric_mode == DECIMAL:
+            parsers = (Decimal, Decimal)
+        elif self.numeric_mode == FLOAT:
+            parsers = (float, float)
+        else:
+            info = Symbols.get(self.id)[1]
+            parsers = (fixed_point(info['tick_size'][symbol]), fixed_point(info['lot_size'][symbol]))
+        self._numeric_parsers[symbol] = parsers
+        return parsers
+
     def _connect_rest(self):
         """
         Child classes should override this method to generate connection objects that
@@ -22,6 +22,12 @@ cdef extern from *:
     cdef bint _COMPILED_WITH_ASSERTIONS
 COMPILED_WITH_ASSERTIONS = _COMPILED_WITH_ASSERTIONS
 
+# Prices and sizes of market data (Trade, Ticker, Candle and OrderBook levels)
+# are Decimal in the default numeric mode. Feeds in the FLOAT or FIXED_POINT
+# numeric mode (see Feed) build them from floats or ints instead. Every other
+# type, orders and fills included, always holds Decimal values.
+NUMERIC_TYPES = (Decimal, float, int)
+
 
 cdef dict convert_none_values(d: dict, s: str):
     for key, value in d.items():
@@ -43,8 +49,8 @@ cdef class Trade:
     cdef readonly object raw  # can be dict or list
 
     def __init__(self, exchange, symbol, side, amount, price, timestamp, id=None, type=None, raw=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
+        assert isinstance(amount, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -95,8 +101,8 @@ cdef class Ticker:
     cdef readonly object raw
 
     def __init__(self, exchange, symbol, bid, ask, timestamp, raw=None):
-        assert isinstance(bid, Decimal)
-        assert isinstance(ask, Decimal)
+        assert isinstance(bid, NUMERIC_TYPES)
+        assert isinstance(ask, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -261,11 +267,11 @@ cdef class Candle:
 
     def __init__(self, exchange, symbol, start, stop, interval, trades, open, close, high, low, volume, closed, timestamp, raw=None):
         assert trades is None or isinstance(trades, int)
-        assert isinstance(open, Decimal)
-        assert isinstance(close, Decimal)
-        assert isinstance(high, Decimal)
-        assert isinstance(low, Decimal)
-        assert isinstance(volume, Decimal)
+        assert isinstance(open, NUMERIC_TYPES)
+        assert isinstance(close, NUMERIC_TYPES)
+        assert isinstance(high, NUMERIC_TYPES)
+        assert isinstance(low, NUMERIC_TYPES)
+        assert isinstance(volume, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -394,6 +400,7 @@ cdef class OrderBook:
     cdef public object checksum
     cdef public object timestamp
     cdef public object raw  # Can be dict or list
+    cdef public object aggregates  # None or cryptofeed.util.book.BookAggregates
 
     def __init__(self, exchange, symbol, bids=None, asks=None, max_depth=0, truncate=False, checksum_format=None):
         self.exchange = exchange
@@ -408,6 +415,7 @@ cdef class OrderBook:
         self.sequence_number = None
         self.checksum = None
         self.raw = None
+        self.aggregates = None
 
     @staticmethod
     def from_dict(data: dict) -> OrderBook:
@@ -417,6 +425,23 @@ cdef class OrderBook:
             ob.delta = data['delta']
         return ob
 
+    def top_levels(self, str side, Py_ssize_t k, double[::1] prices, double[::1] sizes):
+        """
+        Copy the best k levels of side (BID or ASK) into prices and sizes, best
+        first, read in order from the sorted book without sorting or copying the
+        rest of it. prices and sizes are caller allocated float64 arrays, so the
+        same buffers can be reused on every update. Returns the number of levels
+        copied, which is at most the depth of the side and the length of the arrays.
+        """
+        cdef Py_ssize_t i
+        levels = self.book[side]
+        cdef Py_ssize_t n = min(k, len(levels), prices.shape[0], sizes.shape[0])
+        for i in range(n):
+            price, size = levels.index(i)
+            prices[i] = price
+            sizes[i] = size
+        return n
+
     def _delta(self, numeric_type) -> dict:
         return {
             BID: [tuple([numeric_type(v) if isinstance(v, Decimal) else v for v in value]) for value in self.delta[BID]],
@@ -20,3 +20,102 @@ def book_delta(former: dict, latter: dict, book_type=L2_BOOK) -> list:
         raise ValueError("Not supported for L3 Books")
 
     return ret
+
+
+class BookAggregates:
+    """
+    Running aggregates for an L2 book, maintained from the levels each update
+    touches instead of rescanning the book: total volume and notional per side,
+    cumulative depth inside bands (in basis points from mid) and the top K levels.
+
+    Band depth is measured against an anchor mid. While the mid stays within
+    rebase_bps of the anchor, updates are O(changed levels); once it drifts
+    further the bands are re-anchored with a scan of only the levels inside the
+    widest band.
+    """
+    def __init__(self, bands=(10, 50, 100), top_k=20, rebase_bps=1.0):
+        self.bands = tuple(bands)
+        self.top_k = top_k
+        self.rebase_bps = rebase_bps
+        self.volume = {BID: 0, ASK: 0}
+        self.notional = {BID: 0, ASK: 0}
+        self.depth = {BID: [0] * len(self.bands), ASK: [0] * len(self.bands)}
+        self.anchor = None
+        self.rebases = 0
+        self._bounds = {BID: [], ASK: []}
+        self._top = {BID: [], ASK: []}
+        self._top_stale = {BID: True, ASK: True}
+        self._book = None
+
+    def reset(self, book):
+        """Full recompute from a snapshot. book is the underlying order_book object"""
+        self._book = book
+        for side in (BID, ASK):
+            volume = 0
+            notional = 0
+            for price, size in book[side].to_dict().items():
+                volume += size
+                notional += price * size
+            self.volume[side] = volume
+            self.notional[side] = notional
+            self._top_stale[side] = True
+        self.anchor = None
+        self.refresh()
+
+    def update(self, side: str, price, old, new):
+        """Account for one level changing size from old to new (0 for added/removed levels)"""
+        diff = new - old
+        if not diff:
+            return
+        self.volume[side] += diff
+        self.notional[side] += price * diff
+
+        depth = self.depth[side]
+        for i, bound in enumerate(self._bounds[side]):
+            if price >= bound if side == BID else price <= bound:
+                depth[i] += diff
+
+        top = self._top[side]
+        if not self._top_stale[side] and (len(top) < self.top_k or (price >= top[-1][0] if side == BID else price <= top[-1][0])):
+            self._top_stale[side] = True
+
+    def refresh(self):
+        """Call once an update has been fully applied, re-anchors the bands if the mid drifted"""
+        bids, asks = self._book[BID], self._book[ASK]
+        if len(bids) == 0 or len(asks) == 0:
+            return
+        mid = (float(bids.index(0)[0]) + float(asks.index(0)[0])) / 2
+        if self.anchor is None or abs(mid - self.anchor) > self.anchor * self.rebase_bps / 10_000:
+            self._rebase(mid)
+
+    def _rebase(self, mid: float):
+        self.anchor = mid
+        self.rebases += 1
+        for side in (BID, ASK):
+            sign = -1 if side == BID else 1
+            bounds = [mid * (1 + sign * bps / 10_000) for bps in self.bands]
+            depth = [0] * len(bounds)
+            levels = self._book[side]
+            widest = min(bounds) if side == BID else max(bounds)
+            for i in range(len(levels)):
+                price, size = levels.index(i)
+                if price < widest if side == BID else price > widest:
+                    break
+                for j, bound in enumerate(bounds):
+                    if price >= bound if side == BID else price <= bound:
+                        depth[j] += size
+            self._bounds[side] = bounds
+            self.depth[side] = depth
+
+    def top(self, side: str) -> list:
+        """Best top_k (price, size) levels of a side, rebuilt only after a change reached them"""
+        if self._top_stale[side]:
+            levels = self._book[side]
+            self._top[side] = [levels.index(i) for i in range(min(self.top_k, len(levels)))]
+            self._top_stale[side] = False
+        return self._top[side]
+
+    def imbalance(self, band: int = 0) -> float:
+        """(bid - ask) / (bid + ask) depth inside the given band index"""
+        bid, ask = self.depth[BID][band], self.depth[ASK][band]
+        return float((bid - ask) / (bid + ask)) if bid + ask else 0.0
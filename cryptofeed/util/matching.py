@@ -0,0 +1,282 @@
+'''
+Simulated order matching against a feed's live L2 books.
+
+MatchingEngine accepts market, limit, immediate-or-cancel, fill-or-kill and
+maker-or-cancel (post-only) orders, fills them from the book the feed
+maintains and reports fills and order updates as Fill and OrderInfo objects
+through Feed.callback, exactly like an exchange's private channels.
+
+Taker orders walk the opposite side of the book. Liquidity they take is
+remembered per level until the feed next updates that level, so consecutive
+orders on the same tick do not fill against the same size twice; the live
+book itself is never modified.
+
+Resting limit orders join the back of the queue at their price. The size
+ahead of them shrinks with trades printed at that price and, when the level
+shrinks below it, with cancellations. That size is the exchange's own queue,
+shared by every simulated order at the price, so a print consumes it once for
+all of them. Trades through the price, or the opposite side crossing it, fill
+the order as maker.
+
+Prices, sizes and fees are Decimal throughout, as Fill and OrderInfo require,
+so the feed must use the DECIMAL numeric mode.
+'''
+from collections import defaultdict
+from decimal import Decimal
+import itertools
+import time
+from typing import Dict, List
+
+from cryptofeed.defines import ASK, BID, BUY, CANCELLED, DECIMAL, FILL_OR_KILL, FILLED, FILLS, IMMEDIATE_OR_CANCEL, L2_BOOK, LIMIT, MAKER, MAKER_OR_CANCEL, MARKET, OPEN, ORDER_INFO, PARTIAL, SELL, TAKER, TRADES
+from cryptofeed.types import Fill, OrderBook, OrderInfo, Trade
+
+
+class SimulatedOrder:
+    __slots__ = ('id', 'client_order_id', 'symbol', 'side', 'type', 'price', 'amount', 'remaining', 'status', 'queue_ahead')
+
+    def __init__(self, id, client_order_id, symbol, side, type, price, amount):
+        self.id = id
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.type = type
+        self.price = price
+        self.amount = amount
+        self.remaining = amount
+        self.status = OPEN
+        self.queue_ahead = 0
+
+
+class MatchingEngine:
+    def __init__(self, feed, fees: bool = True, fee_engine=None, account: str = 'default'):
+        """
+        feed: Feed
+            the feed whose books orders are matched against and whose callbacks
+            receive FILLS and ORDER_INFO updates, in the DECIMAL numeric mode
+        fees: bool
+            charge fees with feed.calculate_fee when the feed provides it
+        fee_engine: VolumeTieredFees
+            charge fees with fee_engine.record_fill instead, so the fee tier
+            follows the rolling volume of account
+        """
+        if getattr(feed, 'numeric_mode', DECIMAL) != DECIMAL:
+            raise ValueError(f"Matching requires the {DECIMAL} numeric mode, the feed uses {feed.numeric_mode}")
+        self.feed = feed
+        self.fee_engine = fee_engine
+        self.account = account
+        self.fees = fees and (fee_engine is not None or hasattr(feed, 'calculate_fee'))
+        self.orders: Dict[str, SimulatedOrder] = {}
+        # symbol -> side -> price -> resting orders in time priority
+        self.resting = defaultdict(lambda: {BUY: defaultdict(list), SELL: defaultdict(list)})
+        # symbol -> (book side, price) -> size already taken from the level since it last changed
+        self.consumed = defaultdict(dict)
+        self._ids = itertools.count(1)
+        self._fill_ids = itertools.count(1)
+        feed.callbacks[L2_BOOK].append(self._on_book)
+        feed.callbacks[TRADES].append(self._on_trade)
+
+    @staticmethod
+    def _number(value):
+        if isinstance(value, Decimal) or value is None:
+            return value
+        return Decimal(str(value))
+
+    def book(self, symbol: str) -> OrderBook:
+        return self.feed._l2_book[symbol]
+
+    async def submit(self, symbol: str, side: str, amount, order_type: str = LIMIT, price=None, timestamp: float = None, client_order_id: str = None) -> SimulatedOrder:
+        """
+        Submit an order of order_type (MARKET, LIMIT, IMMEDIATE_OR_CANCEL,
+        FILL_OR_KILL or MAKER_OR_CANCEL). Fills happen before this returns;
+        anything left of a LIMIT or MAKER_OR_CANCEL order rests on the book.
+        """
+        if order_type != MARKET and price is None:
+            raise ValueError(f"{order_type} orders need a price")
+        if order_type not in (MARKET, LIMIT, IMMEDIATE_OR_CANCEL, FILL_OR_KILL, MAKER_OR_CANCEL):
+            raise ValueError(f"Unsupported order type {order_type}")
+
+        timestamp = timestamp if timestamp is not None else time.time()
+        order = SimulatedOrder(str(next(self._ids)), client_order_id, symbol, side, order_type, self._number(price), self._number(amount))
+        self.orders[order.id] = order
+        levels = self.book(symbol).book[ASK if side == BUY else BID]
+
+        if order_type == MAKER_OR_CANCEL and self._crosses(order, levels):
+            return await self._finish(order, CANCELLED, timestamp)
+        if order_type == FILL_OR_KILL and self._available(order, levels) < order.amount:
+            return await self._finish(order, CANCELLED, timestamp)
+
+        if order_type != MAKER_OR_CANCEL:
+            await self._take(order, levels, timestamp)
+        if order.remaining == 0:
+            return await self._finish(order, FILLED, timestamp)
+        if order_type in (MARKET, IMMEDIATE_OR_CANCEL, FILL_OR_KILL):
+            return await self._finish(order, CANCELLED, timestamp)
+
+        own = self.book(symbol).book[BID if side == BUY else ASK]
+        order.queue_ahead = own[order.price] if order.price in own else 0
+        self.resting[symbol][side][order.price].append(order)
+        order.status = PARTIAL if order.remaining < order.amount else OPEN
+        await self._order_info(order, timestamp)
+        return order
+
+    async def cancel(self, order_id: str, timestamp: float = None) -> SimulatedOrder:
+        order = self.orders[order_id]
+        if order.status in (OPEN, PARTIAL):
+            self._unrest(order)
+            await self._finish(order, CANCELLED, timestamp if timestamp is not None else time.time())
+        return order
+
+    def _crosses(self, order: SimulatedOrder, levels) -> bool:
+        if len(levels) == 0:
+            return False
+        best = levels.index(0)[0]
+        return best <= order.price if order.side == BUY else best >= order.price
+
+    def _levels(self, symbol: str, side: str, limit, levels):
+        """Opposite levels an order of side may take from up to limit (None for no limit), best first, with the size still available"""
+        consumed = self.consumed[symbol]
+        book_side = ASK if side == BUY else BID
+        for i in range(len(levels)):
+            price, size = levels.index(i)
+            if limit is not None and (price > limit if side == BUY else price < limit):
+                return
+            size -= consumed.get((book_side, price), 0)
+            if size > 0:
+                yield price, size
+
+    def _available(self, order: SimulatedOrder, levels):
+        available = 0
+        for _, size in self._levels(order.symbol, order.side, order.price, levels):
+            available += size
+            if available >= order.amount:
+                break
+        return available
+
+    async def _take(self, order: SimulatedOrder, levels, timestamp):
+        consumed = self.consumed[order.symbol]
+        book_side = ASK if order.side == BUY else BID
+        fills = []
+        for price, size in self._levels(order.symbol, order.side, order.price, levels):
+            amount = min(size, order.remaining)
+            fills.append((price, amount))
+            order.remaining -= amount
+            if order.remaining == 0:
+                break
+        # applied once the walk is done, the generator reads consumed as it goes
+        for price, amount in fills:
+            consumed[(book_side, price)] = consumed.get((book_side, price), 0) + amount
+            await self._fill(order, price, amount, TAKER, timestamp)
+
+    async def _fill(self, order: SimulatedOrder, price, amount, liquidity: str, timestamp):
+        fee = None
+        if self.fees and self.fee_engine is not None:
+            fee = self._number(self.fee_engine.record_fill(self.account, timestamp, float(price * amount), is_maker=liquidity == MAKER))
+        elif self.fees:
+            fee = self._number(self.feed.calculate_fee(order.symbol, price * amount, is_maker=liquidity == MAKER))
+        fill = Fill(self.feed.id, order.symbol, order.side, amount, price, fee, str(next(self._fill_ids)), order.id, order.type, liquidity, timestamp)
+        await self.feed.callback(FILLS, fill, timestamp)
+
+    async def _order_info(self, order: SimulatedOrder, timestamp):
+        oi = OrderInfo(self.feed.id, order.symbol, order.id, order.side, order.status, order.type, order.price if order.price is not None else Decimal(0), order.amount, order.remaining, timestamp, client_order_id=order.client_order_id)
+        await self.feed.callback(ORDER_INFO, oi, timestamp)
+
+    async def _finish(self, order: SimulatedOrder, status: str, timestamp) -> SimulatedOrder:
+        order.status = status
+        await self._order_info(order, timestamp)
+        return order
+
+    def _unrest(self, order: SimulatedOrder):
+        queue = self.resting[order.symbol][order.side][order.price]
+        queue.remove(order)
+        if not queue:
+            del self.resting[order.symbol][order.side][order.price]
+
+    async def _maker_fill(self, order: SimulatedOrder, amount, timestamp):
+        amount = min(amount, order.remaining)
+        if amount <= 0:
+            return 0
+        order.remaining -= amount
+        await self._fill(order, order.price, amount, MAKER, timestamp)
+        if order.remaining == 0:
+            self._unrest(order)
+            await self._finish(order, FILLED, timestamp)
+        else:
+            order.status = PARTIAL
+            await self._order_info(order, timestamp)
+        return amount
+
+    async def _on_trade(self, trade: Trade, receipt_timestamp: float):
+        # a taker selling hits resting buys and vice versa
+        side = BUY if trade.side == SELL else SELL
+        resting = self.resting.get(trade.symbol)
+        if not resting or not resting[side]:
+            return
+
+        volume = trade.amount
+        for price in sorted(resting[side], reverse=side == BUY):
+            if volume <= 0 or (price < trade.price if side == BUY else price > trade.price):
+                break
+            through = price != trade.price
+            # exchange size at the price taken by the print, ahead of each order
+            # in turn; the queue is shared so it shrinks for every order at once
+            taken = 0
+            orders = list(resting[side][price])
+            for order in orders:
+                if not through:
+                    ahead = min(max(order.queue_ahead - taken, 0), volume)
+                    taken += ahead
+                    volume -= ahead
+                volume -= await self._maker_fill(order, volume, trade.timestamp)
+                if volume <= 0:
+                    break
+            for order in orders:
+                order.queue_ahead = max(order.queue_ahead - taken, 0)
+
+    async def _on_book(self, book: OrderBook, receipt_timestamp: float):
+        symbol = book.symbol
+        if book.delta is None:
+            self.consumed.pop(symbol, None)
+        elif symbol in self.consumed:
+            consumed = self.consumed[symbol]
+            for side in (BID, ASK):
+                for price, _ in book.delta[side]:
+                    consumed.pop((side, price), None)
+
+        resting = self.resting.get(symbol)
+        if not resting:
+            return
+        timestamp = book.timestamp if book.timestamp is not None else receipt_timestamp
+        for side, book_side, opposite in ((BUY, BID, ASK), (SELL, ASK, BID)):
+            if not resting[side]:
+                continue
+            # cancellations can only shrink the queue ahead down to the level's size
+            levels = book.book[book_side]
+            for price, orders in resting[side].items():
+                size = levels[price] if price in levels else 0
+                for order in orders:
+                    if order.queue_ahead > size:
+                        order.queue_ahead = size
+
+            # the opposite side trading through a resting price fills it
+            opposite_levels = book.book[opposite]
+            consumed = self.consumed[symbol]
+            for price in sorted(resting[side], reverse=side == BUY):
+                crossing = list(self._levels(symbol, side, price, opposite_levels))
+                if not crossing:
+                    break
+                available = sum(size for _, size in crossing)
+                filled = 0
+                for order in list(resting[side][price]):
+                    filled += await self._maker_fill(order, available - filled, timestamp)
+                    if filled >= available:
+                        break
+                # the liquidity that filled us is used up until those levels change
+                for level, size in crossing:
+                    used = min(size, filled)
+                    consumed[(opposite, level)] = consumed.get((opposite, level), 0) + used
+                    filled -= used
+                    if filled <= 0:
+                        break
+
+    def open_orders(self, symbol: str = None) -> List[SimulatedOrder]:
+        return [o for o in self.orders.values() if o.status in (OPEN, PARTIAL) and (symbol is None or o.symbol == symbol)]
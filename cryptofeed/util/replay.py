@@ -0,0 +1,172 @@
+'''
+Playback of captures written by the raw data callback.
+
+A websocket capture (e.g. OKX.ws.1.0) holds one record per line:
+
+    address <-> timestamp              connection opened
+    address <- timestamp: payload      message sent to the exchange
+    timestamp: payload                 message received from the exchange
+
+and the REST capture for the same run (e.g. OKX.0) holds
+
+    url -> timestamp: payload          response to a REST request
+    configuration: payload             the feed's subscription, as JSON
+
+Captures are read a line at a time so their size is not bounded by memory.
+'''
+import asyncio
+import os
+import time
+from decimal import Decimal
+from typing import Iterator, NamedTuple, Optional
+
+from yapic import json
+
+from cryptofeed.connection import AsyncConnection
+from cryptofeed.symbols import Symbols
+
+
+CONNECT = 'connect'
+SEND = 'send'
+RECEIVE = 'receive'
+REST = 'rest'
+CONFIGURATION = 'configuration'
+
+
+class Record(NamedTuple):
+    kind: str
+    address: Optional[str]
+    timestamp: Optional[float]
+    payload: Optional[str]
+
+
+def parse_record(line: str) -> Record:
+    line = line.rstrip('\r\n')
+    if line.startswith('configuration: '):
+        return Record(CONFIGURATION, None, None, line[len('configuration: '):])
+
+    # addresses contain ':' but never ': ', the timestamp is the last token of the head
+    head, sep, payload = line.partition(': ')
+    if ' <-> ' in head:
+        address, _, ts = head.rpartition(' <-> ')
+        return Record(CONNECT, address, float(ts), None)
+    if not sep:
+        raise ValueError(f'Invalid capture record: {line[:100]!r}')
+    if ' <- ' in head:
+        address, _, ts = head.rpartition(' <- ')
+        return Record(SEND, address, float(ts), payload)
+    if ' -> ' in head:
+        address, _, ts = head.rpartition(' -> ')
+        return Record(REST, address, float(ts), payload)
+    return Record(RECEIVE, None, float(head), payload)
+
+
+def read_capture(path: str) -> Iterator[Record]:
+    '''
+    Lazily yield the records of a capture file, in file order. Blank lines are skipped.
+    '''
+    with open(path, 'r', encoding='utf-8', newline='') as fp:
+        for line in fp:
+            if line.strip():
+                yield parse_record(line)
+
+
+def load_symbols(exchange, path: str) -> dict:
+    '''
+    Populate the symbol cache of exchange (an Exchange class) from the REST
+    responses in a capture, so replaying needs no network access. When an
+    endpoint was requested more than once the most recent response is used.
+    Returns the recorded subscription, or an empty dict if there is none.
+    '''
+    responses = {}
+    configuration = {}
+    for record in read_capture(path):
+        if record.kind == REST:
+            responses[record.address] = record.payload
+        elif record.kind == CONFIGURATION:
+            configuration = json.loads(record.payload)
+
+    data = [json.loads(payload, parse_float=Decimal) for payload in responses.values()]
+    if not data:
+        raise ValueError(f'{path} has no REST responses to load symbols from')
+    syms, info = exchange._parse_symbol_data(data if len(data) > 1 else data[0])
+    Symbols.set(exchange.id, syms, info)
+    return configuration
+
+
+class ReplayConnection(AsyncConnection):
+    def __init__(self, path: str, speed: float = None):
+        """
+        path: str
+            websocket capture to play back
+        speed: float
+            None (or 0) delivers messages as fast as they can be handled. Otherwise
+            messages are paced against the wall clock at speed times the recorded
+            rate, i.e. 1.0 is real time and 10.0 is ten times faster.
+        """
+        self._is_open = False
+        if speed is not None and speed < 0:
+            raise ValueError('speed must not be negative')
+        super().__init__(os.path.basename(path))
+        self.path = path
+        self.speed = speed or None
+        self.address = None
+        self.lag = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._is_open
+
+    async def _open(self):
+        self._is_open = True
+        self.sent = 0
+        self.received = 0
+        self.last_message = None
+
+    async def close(self):
+        self._is_open = False
+
+    async def read(self):
+        '''
+        Yield received payloads. last_message is set to the recorded receipt
+        time of the message being yielded. In paced mode lag holds the largest
+        delay, in wall clock seconds, behind the schedule.
+        '''
+        start_wall = None
+        start_ts = None
+        for record in read_capture(self.path):
+            if record.kind == CONNECT:
+                self.address = record.address
+                continue
+            if record.kind != RECEIVE:
+                continue
+
+            if self.speed:
+                if start_wall is None:
+                    start_wall = time.perf_counter()
+                    start_ts = record.timestamp
+                delay = start_wall + (record.timestamp - start_ts) / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.lag = max(self.lag, -delay)
+
+            self.received += 1
+            self.last_message = record.timestamp
+            yield record.payload
+
+    async def write(self, msg: str):
+        # subscriptions were already answered in the capture
+        self.sent += 1
+
+
+async def replay(feed, path: str, speed: float = None) -> ReplayConnection:
+    '''
+    Stream a websocket capture through feed.message_handler with the recorded
+    receipt timestamps. Returns the connection, which holds the message count.
+    '''
+    conn = ReplayConnection(path, speed=speed)
+    async with conn.connect():
+        async for data in conn.read():
+            await feed.message_handler(data, conn, conn.last_message)
+    return conn
@@ -1,20 +1,17 @@
-import asyncio
 import threading
-from cryptofeed import FeedHandler
 from ui.app import app, start_feed_handler
 
 def run_ui():
     """Run Dash application"""
-    app.run_server(debug=True, host='0.0.0.0', port=8050)
+    # the reloader re-executes this module, which would start a second set of feed workers
+    app.run_server(debug=True, host='0.0.0.0', port=8050, use_reloader=False)
 
 def run_feed():
-    """Run cryptofeed in background"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    """Run the feed workers in background"""
     start_feed_handler()
 
 if __name__ == '__main__':
-    # Start cryptofeed in background thread
+    # Relay the feed workers' snapshots from a background thread
     feed_thread = threading.Thread(target=run_feed, daemon=True)
     feed_thread.start()
     
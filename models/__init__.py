@@ -0,0 +1,5 @@
+from models.book_features import BookFeatureCache, BookFeatures, feature_cache
+from models.slippage import DepthWalk, SlippageCalculator, SlippageModel
+from models.volatility import RangeVolatility, RealizedVolatility, RollingVolatility, VolatilityEngine, VolatilityEstimator
+from models.training import FittedModel, TrainingService
+from models.monte_carlo import ExecutionSimulator, SimulationResult
@@ -1,28 +1,312 @@
+import math
+from collections import defaultdict, deque
+from typing import Callable, Union
+
 import numpy as np
-from cryptofeed.exchanges.okx import OKX
-from cryptofeed.connection import WebsocketConnection
+from cryptofeed.defines import ASK, BID, BUY, SELL
+from cryptofeed.types import OrderBook
+from models.book_features import BookFeatureCache, feature_cache, level_arrays
+from models.volatility import SECONDS_PER_YEAR
+
+
+def stack_books(books, levels: int = 20, features: BookFeatureCache = None) -> tuple:
+    """
+    Top levels of many books as (bid_prices, bid_sizes, ask_prices, ask_sizes),
+    each a (books, levels) array best first, padded with NaN prices and zero
+    sizes. Books are read through the shared BookFeatures cache.
+    """
+    features = features if features is not None else feature_cache
+    shape = (len(books), levels)
+    bid_prices, ask_prices = np.full(shape, np.nan), np.full(shape, np.nan)
+    bid_sizes, ask_sizes = np.zeros(shape), np.zeros(shape)
+    for i, book in enumerate(books):
+        f = features.get(book)
+        n = min(levels, len(f.bid_prices))
+        bid_prices[i, :n], bid_sizes[i, :n] = f.bid_prices[:n], f.bid_sizes[:n]
+        n = min(levels, len(f.ask_prices))
+        ask_prices[i, :n], ask_sizes[i, :n] = f.ask_prices[:n], f.ask_sizes[:n]
+    return bid_prices, bid_sizes, ask_prices, ask_sizes
+
 
 class AlmgrenChriss:
-    def __init__(self, volatility=0.02, risk_aversion=0.1):
+    """
+    Almgren-Chriss impact model calibrated from live data. Impacts are fractions
+    of mid for an order of quantity q:
+
+    temporary  half spread + eta * q   paid while consuming liquidity, then reverts
+    permanent  gamma * q               lasting move of the mid
+
+    eta comes from the visible book: moving the price depth_bps through the depth
+    inside that band gives a price slope, and walking it costs half the slope on
+    average. Fills calibrate the symbol they were recorded for only. Once
+    min_fills fills of a symbol have been recorded, gamma is fit to the mid
+    move that followed them and eta to their realized cost, net of the half of
+    that move each fill paid itself, so the modelled total reproduces the
+    realized cost. Without fills, gamma defaults to the book estimate of eta.
+
+    Coefficients are recomputed only when the book tick or the recorded fills
+    change, so repeated queries against one tick are lookups.
+    """
+    def __init__(self, volatility: Union[float, Callable[[], float]] = 0.02, risk_aversion=0.1, depth_bps=50, horizon=60.0, fill_window=500, min_fills=20, features: BookFeatureCache = None):
+        """
+        volatility: float or callable
+            annualized volatility, or a function returning the current value, e.g.
+            lambda: engine.current_volatility('BTC-USDT')['long_term']
+        risk_aversion: float
+            trader's aversion to execution risk (lambda)
+        depth_bps: float
+            band around mid, in basis points, whose depth sets the book estimate of eta
+        horizon: float
+            execution horizon in seconds used for the risk estimate
+        fill_window: int
+            number of most recent fills of a symbol its coefficients are fit on
+        min_fills: int
+            fills needed before they replace the book estimates
+        features: BookFeatureCache
+            where book features are read from, defaults to the cache shared by all models
+        """
         self.volatility = volatility
         self.risk_aversion = risk_aversion
-        self.conn = WebsocketConnection(OKX)
-
-    def calculate_impact(self, quantity: float, book_data: dict):
-        """Calculate market impact using Almgren-Chriss model"""
-        bids, asks = book_data['bids'], book_data['asks']
-        spread = asks[0][0] - bids[0][0]
-        mid_price = (asks[0][0] + bids[0][0]) / 2
-        
-        # Temporary impact (linear)
-        temp_impact = (spread / mid_price) * quantity
-        
-        # Permanent impact (square root)
-        perm_impact = self.volatility * np.sqrt(quantity)
-        
+        self.depth_bps = depth_bps
+        self.horizon = horizon
+        self.min_fills = min_fills
+        self.features = features if features is not None else feature_cache
+        # symbol -> recent fills and the number recorded so far
+        self.fills = defaultdict(lambda: deque(maxlen=fill_window))
+        self.fills_version = defaultdict(int)
+        # symbol -> half spread of the last book of that symbol seen by coefficients
+        self.half_spreads = {}
+        self._cache_key = None
+        self._coefficients = None
+        # symbol -> (fills_version, (eta, gamma))
+        self._fits = {}
+
+    @property
+    def sigma(self) -> float:
+        """Current annualized volatility"""
+        return float(self.volatility() if callable(self.volatility) else self.volatility)
+
+    @property
+    def sigma_per_second(self) -> float:
+        return self.sigma / math.sqrt(SECONDS_PER_YEAR)
+
+    def record_fill(self, side: str, quantity: float, price: float, arrival_mid: float, post_mid: float = None, symbol: str = None):
+        """
+        Record an execution. arrival_mid is the mid when the order was sent and
+        post_mid, if known, the mid some time after it completed. symbol is the
+        fill's instrument, e.g. Fill.symbol: the fill calibrates that symbol's
+        books only, and the half spread taken out of its cost is the one last seen
+        on that symbol's book. Fills without a symbol pair with books without one,
+        i.e. dict books.
+        """
+        sign = 1.0 if side == BUY else -1.0
+        arrival_mid = float(arrival_mid)
+        cost = sign * (float(price) - arrival_mid) / arrival_mid
+        move = sign * (float(post_mid) - arrival_mid) / arrival_mid if post_mid is not None else np.nan
+        self.fills[symbol].append((float(quantity), cost - self.half_spreads.get(symbol, 0.0), move))
+        self.fills_version[symbol] += 1
+
+    def _fill_coefficients(self, symbol: str) -> tuple:
+        """(eta, gamma) least squares fits through the origin of symbol's fills, NaN where there is too little data"""
+        version = self.fills_version.get(symbol, 0)
+        fit = self._fits.get(symbol)
+        if fit is not None and fit[0] == version:
+            return fit[1]
+        eta = gamma = np.nan
+        fills = self.fills.get(symbol, ())
+        if len(fills) >= self.min_fills:
+            q, cost, move = np.asarray(fills, dtype=np.float64).T
+            observed = ~np.isnan(move)
+            if observed.sum() >= self.min_fills:
+                qm = q[observed]
+                gamma = float(qm @ move[observed] / (qm @ qm))
+                # the realized cost includes the order's own permanent impact,
+                # gamma * q / 2 on average, which calculate_impact adds separately
+                cost = cost - gamma * q / 2
+            eta = float(q @ cost / (q @ q))
+        self._fits[symbol] = (version, (eta, gamma))
+        return eta, gamma
+
+    def _book_inputs(self, book, side: str) -> tuple:
+        """(cache key, mid, half spread, depth inside depth_bps on the side an order of side consumes)"""
+        if isinstance(book, dict):
+            bid_prices, bid_sizes = level_arrays(book['bids'], BID)
+            ask_prices, ask_sizes = level_arrays(book['asks'], ASK)
+            mid = (bid_prices[0] + ask_prices[0]) / 2
+            width = self.depth_bps / 10_000 * mid
+            if side == BUY:
+                depth = ask_sizes[ask_prices <= mid + width].sum()
+            else:
+                depth = bid_sizes[bid_prices >= mid - width].sum()
+            return None, float(mid), float((ask_prices[0] - bid_prices[0]) / 2 / mid), float(depth)
+
+        features = self.features.get(book)
+        bid, ask = features.depth(self.depth_bps)
+        key = (book.exchange, book.symbol, features.key) if features.key is not None else None
+        return key, float(features.mid), float(features.spread / 2 / features.mid), ask if side == BUY else bid
+
+    def coefficients(self, book: Union[OrderBook, dict], side: str = BUY) -> dict:
+        """
+        Calibrated impact coefficients for an order of side against book, which
+        is an OrderBook or a dict of 'bids' and 'asks' (price, size) lists, best
+        first, and optionally a 'symbol'.
+        """
+        symbol = book.get('symbol') if isinstance(book, dict) else book.symbol
+        key, mid, half_spread, depth = self._book_inputs(book, side)
+        cache_key = (key, side, self.fills_version.get(symbol, 0))
+        if key is not None and cache_key == self._cache_key:
+            return self._coefficients
+
+        book_eta = 0.5 * self.depth_bps / 10_000 / depth if depth > 0 else np.nan
+        eta, gamma = self._fill_coefficients(symbol)
+        self.half_spreads[symbol] = half_spread
+        self._coefficients = {
+            'mid': mid,
+            'half_spread': half_spread,
+            'eta': eta if not np.isnan(eta) else book_eta,
+            'gamma': gamma if not np.isnan(gamma) else book_eta
+        }
+        self._cache_key = cache_key
+        return self._coefficients
+
+    def calculate_impact(self, quantity: float, book_data: Union[OrderBook, dict], side: str = BUY):
+        """
+        Calculate market impact using Almgren-Chriss model. total is the expected
+        cost of the order: the temporary impact plus half the permanent impact,
+        which the order pays on average as it moves the price. risk is the standard
+        deviation of the cost from price moves while working it over horizon.
+
+        quantity may be an array, e.g. a size ladder, and the impacts are returned
+        as arrays of the same shape. See calculate_impact_batch for many books.
+        """
+        if np.ndim(quantity):
+            quantity = np.asarray(quantity, dtype=np.float64)
+        c = self.coefficients(book_data, side)
+        temp_impact = c['half_spread'] + c['eta'] * quantity
+        perm_impact = c['gamma'] * quantity
+        total = temp_impact + perm_impact / 2
+        sign = 1 if side == BUY else -1
+
         return {
             'temporary': temp_impact,
             'permanent': perm_impact,
-            'total': temp_impact + perm_impact,
-            'execution_price': mid_price * (1 + temp_impact + perm_impact)
-        }
\ No newline at end of file
+            'total': total,
+            'risk': self.sigma_per_second * math.sqrt(self.horizon / 3),
+            'execution_price': c['mid'] * (1 + sign * total)
+        }
+
+    def calculate_impact_batch(self, quantities, bid_prices: np.ndarray, bid_sizes: np.ndarray, ask_prices: np.ndarray, ask_sizes: np.ndarray, side: str = BUY) -> dict:
+        """
+        calculate_impact for many books at once, from their top levels stacked in
+        (books, levels) arrays, best first (see stack_books). Books with fewer
+        levels are padded with NaN prices and zero sizes.
+
+        quantities is a scalar, one quantity per book (books,) or a ladder per
+        book (books, n). Coefficients come from each book's depth alone, since
+        the stacked arrays do not say whose fills apply. Returns a dict of arrays
+        shaped like the broadcast quantities.
+        """
+        bid_prices = np.asarray(bid_prices, dtype=np.float64)
+        ask_prices = np.asarray(ask_prices, dtype=np.float64)
+        bid_sizes = np.asarray(bid_sizes, dtype=np.float64)
+        ask_sizes = np.asarray(ask_sizes, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+
+        mid = (bid_prices[:, 0] + ask_prices[:, 0]) / 2
+        half_spread = (ask_prices[:, 0] - bid_prices[:, 0]) / 2 / mid
+        width = (self.depth_bps / 10_000 * mid)[:, None]
+        with np.errstate(invalid='ignore'):
+            if side == BUY:
+                depth = np.where(ask_prices <= mid[:, None] + width, ask_sizes, 0.0).sum(axis=1)
+            else:
+                depth = np.where(bid_prices >= mid[:, None] - width, bid_sizes, 0.0).sum(axis=1)
+        with np.errstate(divide='ignore'):
+            eta = np.where(depth > 0, 0.5 * self.depth_bps / 10_000 / depth, np.nan)
+
+        # per book coefficients against a trailing ladder axis
+        expand = (slice(None),) + (None,) * max(quantities.ndim - 1, 0)
+        temp_impact = half_spread[expand] + eta[expand] * quantities
+        perm_impact = eta[expand] * quantities
+        total = temp_impact + perm_impact / 2
+        sign = 1 if side == BUY else -1
+
+        return {
+            'temporary': temp_impact,
+            'permanent': perm_impact,
+            'total': total,
+            'risk': self.sigma_per_second * math.sqrt(self.horizon / 3),
+            'execution_price': mid[expand] * (1 + sign * total)
+        }
+
+    def solve_schedule(self, quantity: float, horizon: float, n_slices: int, risk_aversion=None, book: Union[OrderBook, dict] = None, side: str = SELL) -> dict:
+        """
+        Almgren-Chriss optimal schedule for working quantity over horizon seconds
+        in n_slices equal intervals, for one risk aversion or a grid of them (in
+        1 / quote currency), all solved in one vectorized pass.
+
+        Each slice pays the temporary impact of the calibrated model and every
+        unit traded moves the price permanently by gamma. Minimizing
+        E[cost] + risk_aversion * Var[cost] gives holdings
+
+            x_k = X sinh(kappa (T - t_k)) / sinh(kappa T)
+            cosh(kappa tau) = 1 + risk_aversion * sigma^2 * tau / (2 * eta~)
+
+        with eta~ = eta - gamma / 2, which is a straight line for a risk neutral
+        trader. Costs are in quote currency against the arrival mid; expected_cost
+        and variance over the grid trace the efficient frontier.
+
+        Coefficients are calibrated against book, or the last book seen when None.
+        Returns arrays with a leading risk aversion axis, dropped when
+        risk_aversion is a scalar.
+        """
+        if n_slices < 1 or horizon <= 0:
+            raise ValueError("n_slices and horizon must be positive")
+        if book is not None:
+            c = self.coefficients(book, side)
+        elif self._coefficients is not None:
+            c = self._coefficients
+        else:
+            raise ValueError("No book has been seen yet to calibrate against")
+
+        risk_aversion = self.risk_aversion if risk_aversion is None else risk_aversion
+        scalar = np.ndim(risk_aversion) == 0
+        lam = np.atleast_1d(np.asarray(risk_aversion, dtype=np.float64))
+        if (lam < 0).any():
+            raise ValueError("risk_aversion must not be negative")
+
+        X = float(quantity)
+        mid = c['mid']
+        tau = horizon / n_slices
+        # coefficients in quote currency per unit of base
+        sigma = self.sigma_per_second * mid
+        epsilon = c['half_spread'] * mid
+        eta = c['eta'] * mid
+        gamma = c['gamma'] * mid
+        eta_tilde = eta - gamma / 2
+        if not eta_tilde > 0:
+            raise ValueError("Temporary impact must exceed half the permanent impact for a unique schedule")
+
+        # kappa * tau per risk aversion, then x_k / X = sinh(theta (N - k)) / sinh(theta N)
+        # written with decaying exponentials so large theta * N cannot overflow
+        theta = np.arccosh(1 + lam * sigma ** 2 * tau / (2 * eta_tilde))[:, None]
+        k = np.arange(n_slices + 1, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.exp(-theta * k) * np.expm1(-2 * theta * (n_slices - k)) / np.expm1(-2 * theta * n_slices)
+        holdings = X * np.where(theta > 0, ratio, (n_slices - k) / n_slices)
+        trades = -np.diff(holdings, axis=1)
+
+        expected_cost = gamma * X ** 2 / 2 + epsilon * X + eta_tilde * (trades ** 2).sum(axis=1)
+        variance = sigma ** 2 * tau * (holdings[:, 1:] ** 2).sum(axis=1)
+
+        result = {
+            'risk_aversion': lam,
+            'kappa': theta[:, 0] / tau,
+            'times': k * tau,
+            'holdings': holdings,
+            'trades': trades,
+            'expected_cost': expected_cost,
+            'variance': variance
+        }
+        if scalar:
+            result = {key: value[0] if key != 'times' else value for key, value in result.items()}
+        return result
@@ -0,0 +1,133 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+
+
+def level_arrays(levels, side: str, depth: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Copy one side of a book into contiguous float64 price and size arrays, best price first.
+
+    levels may be an order_book side (already kept in priority order), a plain
+    price -> size mapping, or a sequence of (price, size) pairs given best first.
+    depth limits the number of levels copied, 0 copies all of them.
+    """
+    if hasattr(levels, 'index') and hasattr(levels, 'to_dict'):
+        count = len(levels) if not depth else min(depth, len(levels))
+        if count < len(levels):
+            items = [levels.index(i) for i in range(count)]
+        else:
+            items = levels.to_dict().items()
+    elif hasattr(levels, 'items'):
+        items = sorted(levels.items(), reverse=side == BID)
+        count = len(items) if not depth else min(depth, len(items))
+        items = items[:count]
+    else:
+        pairs = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+        if depth:
+            pairs = pairs[:depth]
+        return np.ascontiguousarray(pairs[:, 0]), np.ascontiguousarray(pairs[:, 1])
+
+    prices = np.empty(count, dtype=np.float64)
+    sizes = np.empty(count, dtype=np.float64)
+    for i, (price, size) in enumerate(items):
+        prices[i] = price
+        sizes[i] = size
+    return prices, sizes
+
+
+def book_arrays(book: OrderBook, side: str, depth: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """level_arrays for one side of an OrderBook, read straight into the arrays with OrderBook.top_levels"""
+    count = len(book.book[side]) if not depth else min(depth, len(book.book[side]))
+    prices = np.empty(count, dtype=np.float64)
+    sizes = np.empty(count, dtype=np.float64)
+    book.top_levels(side, count, prices, sizes)
+    return prices, sizes
+
+
+class BookFeatures:
+    """
+    Everything the models read from one book tick, computed in a single pass over
+    the levels: mid, microprice, spread, top of book imbalance, total volume and
+    cumulative depth inside each band (in basis points from mid).
+    """
+    __slots__ = ('key', 'bands', 'bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes', 'best_bid', 'best_ask',
+                 'mid', 'microprice', 'spread', 'imbalance', 'bid_volume', 'ask_volume', 'total_volume', 'bid_depth', 'ask_depth')
+
+    def __init__(self, book: OrderBook, bands: Sequence[float] = (500, 1000), key=None):
+        self.key = key
+        self.bands = tuple(bands)
+        self.bid_prices, self.bid_sizes = book_arrays(book, BID)
+        self.ask_prices, self.ask_sizes = book_arrays(book, ASK)
+
+        self.bid_volume = float(self.bid_sizes.sum())
+        self.ask_volume = float(self.ask_sizes.sum())
+        self.total_volume = self.bid_volume + self.ask_volume
+
+        if len(self.bid_prices) == 0 or len(self.ask_prices) == 0:
+            self.best_bid = self.bid_prices[0] if len(self.bid_prices) else np.nan
+            self.best_ask = self.ask_prices[0] if len(self.ask_prices) else np.nan
+            self.mid = self.microprice = self.spread = self.imbalance = np.nan
+            self.bid_depth = self.ask_depth = np.zeros(len(self.bands))
+            return
+
+        self.best_bid = self.bid_prices[0]
+        self.best_ask = self.ask_prices[0]
+        bid_size, ask_size = self.bid_sizes[0], self.ask_sizes[0]
+        self.mid = (self.best_bid + self.best_ask) / 2
+        self.microprice = (self.best_bid * ask_size + self.best_ask * bid_size) / (bid_size + ask_size)
+        self.spread = self.best_ask - self.best_bid
+        self.imbalance = (bid_size - ask_size) / (bid_size + ask_size)
+
+        width = np.asarray(self.bands, dtype=np.float64) / 10_000 * self.mid
+        bid_cum = np.concatenate(([0.0], np.cumsum(self.bid_sizes)))
+        ask_cum = np.concatenate(([0.0], np.cumsum(self.ask_sizes)))
+        # bids are descending, so search on the negated prices
+        self.bid_depth = bid_cum[np.searchsorted(-self.bid_prices, -(self.mid - width), side='right')]
+        self.ask_depth = ask_cum[np.searchsorted(self.ask_prices, self.mid + width, side='right')]
+
+    def depth(self, bps: float) -> Tuple[float, float]:
+        """(bid, ask) depth within bps of mid. Bands given at construction are a lookup"""
+        if bps in self.bands:
+            i = self.bands.index(bps)
+            return float(self.bid_depth[i]), float(self.ask_depth[i])
+        width = bps / 10_000 * self.mid
+        bid = self.bid_sizes[self.bid_prices >= self.mid - width].sum()
+        ask = self.ask_sizes[self.ask_prices <= self.mid + width].sum()
+        return float(bid), float(ask)
+
+
+class BookFeatureCache:
+    """
+    Last BookFeatures per (exchange, symbol), keyed on the sequence number,
+    checksum and timestamp that Feed.book_callback stamps on every update. Any
+    model reading the same tick gets the same object; the next delta changes the
+    key and the entry is rebuilt on first access. Books carrying none of these
+    (e.g. built by hand) are never cached.
+    """
+    def __init__(self, bands: Sequence[float] = (500, 1000)):
+        self.bands = tuple(bands)
+        self._entries: Dict[tuple, BookFeatures] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, book: OrderBook) -> BookFeatures:
+        key = (book.sequence_number, book.checksum, book.timestamp)
+        if key == (None, None, None):
+            return BookFeatures(book, self.bands)
+
+        slot = (book.exchange, book.symbol)
+        features = self._entries.get(slot)
+        if features is not None and features.key == key:
+            self.hits += 1
+            return features
+
+        self.misses += 1
+        features = BookFeatures(book, self.bands, key=key)
+        self._entries[slot] = features
+        return features
+
+
+feature_cache = BookFeatureCache()
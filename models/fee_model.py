@@ -1,24 +1,218 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import numpy as np
 import yaml
 from pathlib import Path
 
 class FeeModel:
+    """
+    Fee schedules from the config, compiled at load into a table keyed by
+    (exchange, instrument type, tier) holding the [taker, maker] rates, so a
+    fee is one dict lookup and a multiply. Schedule entries may carry an
+    instrument_type; entries without one apply to every instrument type.
+    """
     def __init__(self, config_path: str = "config/settings.yaml"):
         self.config = self._load_config(config_path)
         self.fee_schedules = self.config['fee_schedules']
+        self.rates = self._compile(self.fee_schedules)
 
     def _load_config(self, config_path: str) -> Dict:
         with open(Path(__file__).parent.parent / config_path) as f:
             return yaml.safe_load(f)
 
-    def calculate_fee(self, exchange: str, tier: int, notional: float, 
-                     is_maker: bool = False) -> float:
-        schedule = next(
-            s for s in self.fee_schedules[exchange] 
-            if s['tier'] == tier
-        )
-        rate = schedule['maker'] if is_maker else schedule['taker']
-        return notional * rate
+    @staticmethod
+    def _compile(fee_schedules: Dict) -> Dict[Tuple[str, str, int], np.ndarray]:
+        rates = {}
+        for exchange, schedules in fee_schedules.items():
+            for s in schedules:
+                rates[(exchange, s.get('instrument_type'), s['tier'])] = np.array([s['taker'], s['maker']], dtype=np.float64)
+        return rates
+
+    def _rates(self, exchange: str, tier: int, instrument_type: str = None) -> np.ndarray:
+        rates = self.rates.get((exchange, instrument_type, tier))
+        if rates is None:
+            rates = self.rates.get((exchange, None, tier))
+        if rates is None:
+            raise KeyError(f"No fee schedule for {exchange} {instrument_type or ''} tier {tier}")
+        return rates
+
+    def rate(self, exchange: str, tier: int, is_maker: bool = False, instrument_type: str = None) -> float:
+        return float(self._rates(exchange, tier, instrument_type)[int(is_maker)])
+
+    def calculate_fee(self, exchange: str, tier: int, notional: float,
+                     is_maker: bool = False, instrument_type: str = None) -> float:
+        return notional * self.rate(exchange, tier, is_maker, instrument_type)
+
+    def calculate_fees(self, exchange: str, tier: int, notionals, is_maker, instrument_type: str = None) -> np.ndarray:
+        """
+        Fees of a batch of fills. is_maker is a bool or an array of bools
+        broadcastable against notionals.
+        """
+        rates = self._rates(exchange, tier, instrument_type)
+        return np.asarray(notionals, dtype=np.float64) * rates[np.asarray(is_maker, dtype=np.intp)]
 
     def get_available_tiers(self, exchange: str) -> List[int]:
-        return [s['tier'] for s in self.fee_schedules.get(exchange, [])]
\ No newline at end of file
+        return sorted({s['tier'] for s in self.fee_schedules.get(exchange, [])})
+
+
+class VolumeTracker:
+    """
+    Traded notional of one account in time buckets (days by default). Holds the
+    buckets of the trailing window plus the current one in a ring, so memory
+    and update cost do not grow with the number of fills.
+    """
+    __slots__ = ('window', 'bucket_seconds', 'bucket', 'current', 'ring', 'total')
+
+    def __init__(self, window: int = 30, bucket_seconds: float = 86400):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.bucket = None
+        self.current = 0.0
+        self.ring = np.zeros(window, dtype=np.float64)
+        # volume of the window buckets before the current one
+        self.total = 0.0
+
+    def bucket_of(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _advance(self, bucket: int):
+        if self.bucket is None:
+            self.bucket = bucket
+            return
+        # fills older than the current bucket are counted in it
+        steps = bucket - self.bucket
+        if steps <= 0:
+            return
+        if steps > self.window:
+            self.ring[:] = 0.0
+        else:
+            # closing day b overwrites the slot of day b - window, which just left the window
+            self.ring[self.bucket % self.window] = self.current
+            for b in range(self.bucket + 1, bucket):
+                self.ring[b % self.window] = 0.0
+        self.total = float(self.ring.sum())
+        self.current = 0.0
+        self.bucket = bucket
+
+    def add(self, timestamp: float, notional: float):
+        self._advance(self.bucket_of(timestamp))
+        self.current += abs(notional)
+
+    def add_buckets(self, buckets: np.ndarray, volumes: np.ndarray):
+        """Add volume per bucket, buckets ascending"""
+        for bucket, volume in zip(buckets.tolist(), volumes.tolist()):
+            self._advance(bucket)
+            self.current += volume
+
+    def volume(self, timestamp: float = None) -> float:
+        """Trailing window volume tiers are based on at timestamp, excluding its own bucket"""
+        if timestamp is not None:
+            self._advance(self.bucket_of(timestamp))
+        return self.total
+
+    def history(self):
+        """(buckets, volumes) of the trailing window and the current bucket, ascending"""
+        if self.bucket is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        buckets = np.arange(self.bucket - self.window, self.bucket + 1, dtype=np.int64)
+        volumes = np.append(self.ring[buckets[:-1] % self.window], self.current)
+        return buckets, volumes
+
+
+class VolumeTieredFees:
+    """
+    Fees that follow the account's rolling traded volume. The tier of a fill is
+    the highest tier whose min_volume the account traded over the window
+    buckets (30 days) before the fill's bucket, so like on exchanges the tier
+    is re-evaluated at each day boundary. Tier rates and thresholds come from
+    the FeeModel's schedules.
+    """
+    def __init__(self, fee_model: FeeModel = None, exchange: str = 'OKX', instrument_type: str = None, window: int = 30, bucket_seconds: float = 86400):
+        """
+        window: int
+            number of buckets in the rolling volume
+        bucket_seconds: float
+            bucket length, volume is tracked per bucket
+        """
+        fee_model = fee_model or FeeModel()
+        self.exchange = exchange
+        self.instrument_type = instrument_type
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+
+        schedules = [s for s in fee_model.fee_schedules[exchange] if s.get('instrument_type') in (None, instrument_type)]
+        tiers = {}
+        for s in schedules:
+            if 'min_volume' not in s:
+                raise ValueError(f"{exchange} tier {s['tier']} has no min_volume")
+            # instrument type specific entries take precedence
+            if s['tier'] not in tiers or s.get('instrument_type') is not None:
+                tiers[s['tier']] = s
+        ordered = sorted(tiers.values(), key=lambda s: s['min_volume'])
+        self.tiers = np.array([s['tier'] for s in ordered])
+        self.thresholds = np.array([s['min_volume'] for s in ordered], dtype=np.float64)
+        # tier index -> [taker, maker]
+        self.rates = np.array([[s['taker'], s['maker']] for s in ordered], dtype=np.float64)
+        self.accounts: Dict[str, VolumeTracker] = {}
+
+    def tracker(self, account: str) -> VolumeTracker:
+        tracker = self.accounts.get(account)
+        if tracker is None:
+            tracker = self.accounts[account] = VolumeTracker(self.window, self.bucket_seconds)
+        return tracker
+
+    def _tier_index(self, volume):
+        return np.maximum(np.searchsorted(self.thresholds, volume, side='right') - 1, 0)
+
+    def volume(self, account: str, timestamp: float = None) -> float:
+        return self.tracker(account).volume(timestamp)
+
+    def tier(self, account: str, timestamp: float = None) -> int:
+        return int(self.tiers[self._tier_index(self.volume(account, timestamp))])
+
+    def record_fill(self, account: str, timestamp: float, notional: float, is_maker: bool = False) -> float:
+        """Add a fill to the account's volume and return its fee"""
+        tracker = self.tracker(account)
+        rate = self.rates[self._tier_index(tracker.volume(timestamp)), int(is_maker)]
+        tracker.add(timestamp, notional)
+        return notional * rate
+
+    def project_fees(self, account: str, timestamps, notionals, is_maker, record: bool = False):
+        """
+        Fees of a batch of fills, in one vectorized pass. Fills in earlier
+        buckets count towards the volume of later ones, the account's recorded
+        volume is left unchanged unless record is True.
+
+        Returns (fees, tiers), one per fill.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        notionals = np.asarray(notionals, dtype=np.float64)
+        is_maker = np.broadcast_to(np.asarray(is_maker, dtype=np.intp), notionals.shape)
+        tracker = self.tracker(account)
+
+        buckets = np.floor_divide(timestamps, self.bucket_seconds).astype(np.int64)
+        if tracker.bucket is not None:
+            buckets = np.maximum(buckets, tracker.bucket)
+        days, inverse = np.unique(buckets, return_inverse=True)
+        volumes = np.bincount(inverse, weights=np.abs(notionals), minlength=len(days))
+
+        # volume per bucket, history and batch together, as a prefix sum over buckets
+        history_days, history_volumes = tracker.history()
+        all_days = np.concatenate((history_days, days))
+        order = np.argsort(all_days, kind='stable')
+        all_days = all_days[order]
+        cumulative = np.concatenate(([0.0], np.cumsum(np.concatenate((history_volumes, volumes))[order])))
+
+        def through(day):
+            return cumulative[np.searchsorted(all_days, day, side='right')]
+
+        trailing = through(days - 1) - through(days - self.window - 1)
+        index = self._tier_index(trailing)[inverse]
+        fees = notionals * self.rates[index, is_maker]
+
+        if record:
+            tracker.add_buckets(days, volumes)
+        return fees, self.tiers[index]
+
+    def record_fills(self, account: str, timestamps, notionals, is_maker):
+        """project_fees that also adds the fills to the account's volume"""
+        return self.project_fees(account, timestamps, notionals, is_maker, record=True)
@@ -0,0 +1,194 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from cryptofeed.defines import BUY, SELL
+from cryptofeed.types import OrderBook
+from models.algren_chriss import AlmgrenChriss
+
+# default number of shards, each with its own random stream. Fixed, never
+# derived from the pool size, since the paths for a seed depend on it
+SHARDS = 32
+
+
+@dataclass(frozen=True)
+class ExecutionParams:
+    """
+    Everything one shard of paths needs, snapshot from the live models so it can
+    be pickled to a worker process. Book levels are offsets from the arrival mid
+    on the side the order consumes, as a fraction of mid, best first.
+    """
+    side: str
+    mid: float
+    trades: np.ndarray
+    tau: float
+    sigma: float
+    gamma: float
+    eta: float
+    offsets: np.ndarray
+    sizes: np.ndarray
+    liquidity_vol: float
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    """
+    Implementation shortfall of every simulated path, in quote currency against
+    the arrival mid. Positive values are costs.
+    """
+    costs: np.ndarray
+    notional: float
+
+    @property
+    def mean(self) -> float:
+        return float(self.costs.mean())
+
+    @property
+    def std(self) -> float:
+        return float(self.costs.std())
+
+    def percentiles(self, q: Sequence[float] = (5, 50, 95, 99)) -> Dict[float, float]:
+        return dict(zip(q, np.percentile(self.costs, q).tolist()))
+
+    def cost_at_risk(self, level: float = 0.95) -> float:
+        """Cost exceeded by only 1 - level of the paths"""
+        return float(np.quantile(self.costs, level))
+
+    def expected_shortfall(self, level: float = 0.95) -> float:
+        """Mean cost of the paths beyond cost_at_risk(level)"""
+        return float(self.costs[self.costs >= np.quantile(self.costs, level)].mean())
+
+    def summary(self) -> dict:
+        return {
+            'paths': len(self.costs),
+            'mean': self.mean,
+            'std': self.std,
+            'mean_bps': self.mean / self.notional * 10_000,
+            'cost_at_risk_95': self.cost_at_risk(0.95),
+            'cost_at_risk_99': self.cost_at_risk(0.99),
+            'expected_shortfall_95': self.expected_shortfall(0.95),
+            'percentiles': self.percentiles()
+        }
+
+
+def simulate_paths(params: ExecutionParams, n_paths: int, seed) -> np.ndarray:
+    """
+    Simulate n_paths executions of params.trades, vectorized across paths, and
+    return the cost of each. Each slice the mid takes an arithmetic Brownian
+    step plus the permanent impact of the previous slices, and the slice walks
+    the book with every level's size scaled by a lognormal liquidity factor.
+    Quantity beyond the visible depth pays the last level plus eta per unit.
+    """
+    rng = np.random.default_rng(seed)
+    sign = 1.0 if params.side == BUY else -1.0
+    cum_size = np.concatenate(([0.0], np.cumsum(params.sizes)))
+    cum_offset = np.concatenate(([0.0], np.cumsum(params.offsets * params.sizes)))
+    depth = cum_size[-1]
+    last = len(params.sizes) - 1
+
+    # mid return since arrival
+    drift = np.zeros(n_paths)
+    costs = np.zeros(n_paths)
+    for quantity in params.trades:
+        if quantity <= 0:
+            drift += params.sigma * np.sqrt(params.tau) * rng.standard_normal(n_paths)
+            continue
+        # a book with sizes scaled by m fills q like the unscaled book fills q / m
+        scale = np.exp(params.liquidity_vol * rng.standard_normal(n_paths) - params.liquidity_vol ** 2 / 2)
+        q = quantity / scale
+        filled = np.minimum(q, depth)
+        level = np.minimum(np.searchsorted(cum_size[1:], filled, side='left'), last)
+        walked = cum_offset[level] + (filled - cum_size[level]) * params.offsets[level]
+        beyond = q - filled
+        walked += beyond * (params.offsets[last] + params.eta * beyond * scale / 2)
+        # fraction of mid paid on average across the slice
+        slippage = walked / q
+
+        price = params.mid * (1 + drift) * (1 + sign * slippage)
+        costs += sign * (price - params.mid) * quantity
+        drift += sign * (params.gamma * quantity) + params.sigma * np.sqrt(params.tau) * rng.standard_normal(n_paths)
+    return costs
+
+
+class ExecutionSimulator:
+    """
+    Monte Carlo cost distribution of working a parent order with the Almgren-Chriss
+    schedule of an AlmgrenChriss model, seeded from the live book, volatility and
+    calibrated impact. Paths are split into shards with independent random streams
+    and run in a process pool, so results for a seed do not depend on the number
+    of workers.
+    """
+    def __init__(self, model: AlmgrenChriss, max_workers: int = None, executor: Executor = None, levels: int = 50):
+        """
+        max_workers: int
+            size of the process pool, defaults to the number of CPUs
+        executor: Executor
+            run shards on this executor instead of an owned process pool
+        levels: int
+            book levels the simulated walk uses
+        """
+        self.model = model
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = executor
+        self.levels = levels
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def params(self, book: Union[OrderBook, dict], quantity: float, horizon: float, n_slices: int, side: str = SELL, risk_aversion=None, liquidity_vol: float = 0.25) -> ExecutionParams:
+        schedule = self.model.solve_schedule(quantity, horizon, n_slices, risk_aversion=risk_aversion, book=book, side=side)
+        c = self.model.coefficients(book, side)
+        if isinstance(book, dict):
+            levels = book['asks'] if side == BUY else book['bids']
+            prices, sizes = np.asarray(levels, dtype=np.float64).reshape(-1, 2)[:self.levels].T
+        else:
+            features = self.model.features.get(book)
+            prices = features.ask_prices if side == BUY else features.bid_prices
+            sizes = features.ask_sizes if side == BUY else features.bid_sizes
+            prices, sizes = prices[:self.levels], sizes[:self.levels]
+
+        sign = 1.0 if side == BUY else -1.0
+        return ExecutionParams(
+            side=side,
+            mid=c['mid'],
+            trades=np.asarray(schedule['trades'], dtype=np.float64),
+            tau=horizon / n_slices,
+            sigma=self.model.sigma_per_second,
+            gamma=c['gamma'],
+            eta=c['eta'],
+            offsets=sign * (np.asarray(prices, dtype=np.float64) / c['mid'] - 1),
+            sizes=np.asarray(sizes, dtype=np.float64),
+            liquidity_vol=liquidity_vol
+        )
+
+    def simulate(self, book: Union[OrderBook, dict], quantity: float, horizon: float, n_slices: int, side: str = SELL, risk_aversion=None, n_paths: int = 10_000,
+                 liquidity_vol: float = 0.25, seed=None, shards: int = None, parallel: bool = True) -> SimulationResult:
+        """
+        Simulate n_paths executions of quantity over horizon seconds in n_slices.
+        risk_aversion selects the schedule (a scalar), see AlmgrenChriss.solve_schedule.
+        liquidity_vol is the lognormal volatility of each level's size per slice.
+        shards is the number of independent random streams the paths are split
+        into, SHARDS by default. parallel=False runs every shard inline.
+        """
+        params = self.params(book, quantity, horizon, n_slices, side=side, risk_aversion=risk_aversion, liquidity_vol=liquidity_vol)
+        shards = shards or SHARDS
+        sizes = [n_paths // shards + (1 if i < n_paths % shards else 0) for i in range(shards)]
+        seeds = np.random.SeedSequence(seed).spawn(shards)
+
+        if parallel and shards > 1:
+            futures = [self.executor.submit(simulate_paths, params, n, s) for n, s in zip(sizes, seeds) if n]
+            costs = np.concatenate([f.result() for f in futures])
+        else:
+            costs = np.concatenate([simulate_paths(params, n, s) for n, s in zip(sizes, seeds) if n])
+        return SimulationResult(costs, quantity * params.mid)
@@ -0,0 +1,138 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+class SampleWindow:
+    """
+    Fixed size ring buffer of (features, target) samples held in preallocated arrays.
+    Appending is O(features) and never reallocates; the oldest sample is evicted
+    once the window is full.
+    """
+    def __init__(self, n_features: int, size: int):
+        self.size = size
+        self.features = np.zeros((size, n_features), dtype=np.float64)
+        self.targets = np.zeros(size, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x, y: float) -> Optional[Tuple[np.ndarray, float]]:
+        """Store a sample, returning the evicted (features, target) if the window was full"""
+        evicted = None
+        if self.count == self.size:
+            evicted = (self.features[self.head].copy(), self.targets[self.head])
+        else:
+            self.count += 1
+        self.features[self.head] = x
+        self.targets[self.head] = y
+        self.head = (self.head + 1) % self.size
+        return evicted
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy of the window, oldest sample first"""
+        if self.count < self.size:
+            return self.features[:self.count].copy(), self.targets[:self.count].copy()
+        order = np.roll(np.arange(self.size), -self.head)
+        return self.features[order], self.targets[order]
+
+
+class RollingLeastSquares:
+    """
+    Ordinary least squares over a sliding window, maintained from the sufficient
+    statistics X'X and X'y. Adding or removing a sample is O(features^2); the
+    coefficients are re-solved lazily, only when a prediction needs them.
+    """
+    def __init__(self, n_features: int, ridge: float = 1e-8, resync_interval: int = 10_000):
+        """
+        resync_interval: int
+            adds and removes after which resync_due is set. The owner of the sample
+            window then calls resync with it, which bounds the rounding error that
+            adding and removing samples accumulates in the statistics
+        """
+        self.ridge = ridge
+        self.resync_interval = resync_interval
+        self.updates = 0
+        self._xtx = np.zeros((n_features + 1, n_features + 1), dtype=np.float64)
+        self._xty = np.zeros(n_features + 1, dtype=np.float64)
+        self._row = np.ones(n_features + 1, dtype=np.float64)
+        self._beta = np.zeros(n_features + 1, dtype=np.float64)
+        self._stale = False
+        self.n_samples = 0
+
+    def _accumulate(self, x, y: float, weight: float):
+        row = self._row
+        row[1:] = x
+        self._xtx += weight * np.outer(row, row)
+        self._xty += weight * y * row
+        self.n_samples += int(weight)
+        self.updates += 1
+        self._stale = True
+
+    @property
+    def resync_due(self) -> bool:
+        return self.updates >= self.resync_interval
+
+    def resync(self, X: np.ndarray, y: np.ndarray):
+        """Recompute the statistics exactly from the samples in the window, e.g. SampleWindow.arrays()"""
+        rows = np.column_stack([np.ones(len(y)), X])
+        self._xtx = rows.T @ rows
+        self._xty = rows.T @ y
+        self.n_samples = len(y)
+        self.updates = 0
+        self._stale = True
+
+    def add(self, x, y: float):
+        self._accumulate(x, y, 1.0)
+
+    def remove(self, x, y: float):
+        self._accumulate(x, y, -1.0)
+
+    def _solve(self):
+        if self._stale:
+            # scale the ridge with the data so it only guards against singular windows
+            penalty = self.ridge * max(np.trace(self._xtx), 1.0)
+            reg = self._xtx + penalty * np.eye(len(self._xty))
+            self._beta = np.linalg.lstsq(reg, self._xty, rcond=None)[0]
+            self._stale = False
+        return self._beta
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return self._solve()[1:]
+
+    @property
+    def intercept_(self) -> float:
+        return self._solve()[0]
+
+    def predict(self, X) -> np.ndarray:
+        beta = self._solve()
+        return np.asarray(X, dtype=np.float64) @ beta[1:] + beta[0]
+
+
+class OnlineQuantile:
+    """
+    Streaming estimate of a quantile by stochastic gradient descent on the pinball
+    loss. The step is scaled by a running mean absolute deviation so the estimator
+    adapts to the magnitude of its input without tuning.
+    """
+    def __init__(self, quantile: float = 0.95, learning_rate: float = 0.05, decay: float = 0.01):
+        self.quantile = quantile
+        self.learning_rate = learning_rate
+        self.decay = decay
+        self.value = 0.0
+        self.scale = 0.0
+        self.n_samples = 0
+
+    def update(self, x: float):
+        if self.n_samples == 0:
+            self.value = x
+        self.n_samples += 1
+        self.scale += self.decay * (abs(x - self.value) - self.scale)
+        step = self.learning_rate * self.scale
+        # subgradient of the pinball loss
+        if x > self.value:
+            self.value += step * self.quantile
+        else:
+            self.value -= step * (1 - self.quantile)
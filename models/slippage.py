@@ -1,52 +1,287 @@
+import time
+from typing import Dict
+
 import numpy as np
-from sklearn.linear_model import QuantileRegressor
+from sklearn.linear_model import LinearRegression, QuantileRegressor
+from cryptofeed.defines import ASK, BID, BUY, SELL
 from cryptofeed.types import OrderBook
-from cryptofeed.util.book import cumulative_depth, weighted_midpoint
+from models.book_features import BookFeatureCache, BookFeatures, book_arrays, feature_cache, level_arrays
+from models.online import OnlineQuantile, RollingLeastSquares, SampleWindow
+from models.training import FittedModel, TrainingService, fit_regressors
+
+
+class DepthWalk:
+    """
+    Cumulative size and notional for one side of a book. Built once per book tick
+    and reused to price any number of order sizes with a single searchsorted pass.
+    """
+    __slots__ = ('side', 'prices', 'sizes', '_cum_size', '_cum_notional')
+
+    def __init__(self, prices: np.ndarray, sizes: np.ndarray, side: str):
+        """
+        prices, sizes: np.ndarray
+            levels of the side being consumed, best price first
+        side: str
+            BUY walks asks, SELL walks bids
+        """
+        self.side = side
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self.sizes = np.ascontiguousarray(sizes, dtype=np.float64)
+        self._cum_size = np.concatenate(([0.0], np.cumsum(self.sizes)))
+        self._cum_notional = np.concatenate(([0.0], np.cumsum(self.prices * self.sizes)))
+
+    @classmethod
+    def from_book(cls, book: OrderBook, side: str, depth: int = 0) -> 'DepthWalk':
+        return cls(*book_arrays(book, ASK if side == BUY else BID, depth=depth), side)
+
+    @classmethod
+    def from_features(cls, features: BookFeatures, side: str, depth: int = 0) -> 'DepthWalk':
+        if side == BUY:
+            prices, sizes = features.ask_prices, features.ask_sizes
+        else:
+            prices, sizes = features.bid_prices, features.bid_sizes
+        if depth:
+            prices, sizes = prices[:depth], sizes[:depth]
+        return cls(prices, sizes, side)
+
+    @property
+    def best(self) -> float:
+        return self.prices[0] if len(self.prices) else np.nan
+
+    @property
+    def available(self) -> float:
+        return self._cum_size[-1]
+
+    def vwap(self, quantities):
+        """
+        Average fill price of a market order for each quantity. Quantities larger
+        than the visible depth cannot be filled and return NaN.
+        """
+        q = np.asarray(quantities, dtype=np.float64)
+        if len(self.prices) == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        # index of the level the fill finishes on
+        level = np.searchsorted(self._cum_size[1:], q, side='left')
+        last = np.minimum(level, len(self.prices) - 1)
+        notional = self._cum_notional[last] + (q - self._cum_size[last]) * self.prices[last]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(q > 0, notional / q, self.prices[0])
+        vwap = np.where(level < len(self.prices), vwap, np.nan)
+        return vwap if vwap.ndim else float(vwap)
+
+    def slippage(self, quantities):
+        """
+        Fractional cost of the fill relative to the best price, positive for both
+        sides. NaN where the book is too thin to fill.
+        """
+        best = self.best
+        diff = np.subtract(self.vwap(quantities), best)
+        return (diff if self.side == BUY else -diff) / best
+
+
+class SlippageModel:
+    """
+    Book-walk slippage with an empirical correction for order size. The walk
+    prices the visible depth exactly; train() fits observed slippage against size
+    so predict() can cover costs the visible book understates.
+    """
+    def __init__(self):
+        self.coef = None
+
+    def _baseline_slippage(self, quantity: float, book_depth, side: str = BUY) -> float:
+        """Slippage, in percent, of walking book_depth (best level first) with a market order"""
+        prices, sizes = level_arrays(book_depth, ASK if side == BUY else BID)
+        return float(DepthWalk(prices, sizes, side).slippage(quantity)) * 100
+
+    def train(self, quantities, slippages):
+        """Fit observed slippage (percent) against order quantity"""
+        self.coef = np.polyfit(np.asarray(quantities, dtype=np.float64), np.asarray(slippages, dtype=np.float64), 1)
+
+    def predict(self, quantity: float, book_depth, side: str = BUY) -> float:
+        baseline = self._baseline_slippage(quantity, book_depth, side=side)
+        if self.coef is None:
+            return baseline
+        # the walk is a floor: visible depth is always consumed at least this badly
+        return float(np.fmax(baseline, np.polyval(self.coef, quantity)))
+
 
 class SlippageCalculator:
-    def __init__(self, window_size=1000):
+    n_features = 6
+
+    def __init__(self, window_size=1000, online=False, retrain_interval=100, trainer: TrainingService = None, features: BookFeatureCache = None):
+        """
+        window_size: int
+            number of most recent executions the models are fit on
+        online: bool
+            update the models incrementally on every execution (rolling least squares
+            plus a streaming 95% residual quantile) instead of refitting the sklearn
+            models from scratch every retrain_interval executions
+        retrain_interval: int
+            executions between full refits when online is False
+        trainer: TrainingService
+            run the periodic refits in the trainer's process pool instead of inline in
+            update_model. Ignored when online is True
+        features: BookFeatureCache
+            where book features are read from, defaults to the cache shared by all models
+        """
         self.window_size = window_size
-        self.history = []
-        self.linear_model = self._init_linear_model()
-        self.quantile_model = QuantileRegressor(quantile=0.95)
-        
+        self.online = online
+        self.retrain_interval = retrain_interval
+        self.trainer = trainer
+        self.features = features if features is not None else feature_cache
+        self.samples = SampleWindow(self.n_features, window_size)
+        self.updates = 0
+        if online:
+            self.linear_model = RollingLeastSquares(self.n_features)
+            self.quantile_model = OnlineQuantile(quantile=0.95)
+        else:
+            self.linear_model = self._init_linear_model()
+            self.quantile_model = QuantileRegressor(quantile=0.95)
+        self.fitted = False
+        self.fitted_model: FittedModel = None
+
+    def _init_linear_model(self):
+        return LinearRegression()
+
     def update_model(self, book: OrderBook, executed_price: float, quantity: float):
         """Update models with new trade execution data"""
         features = self._extract_features(book, quantity)
-        actual_slippage = (executed_price - weighted_midpoint(book)) / weighted_midpoint(book)
-        
+        mid = self.features.get(book).microprice
+        actual_slippage = (executed_price - mid) / mid
+
         # Maintain rolling window of samples
-        self.history.append((features, actual_slippage))
-        if len(self.history) > self.window_size:
-            self.history.pop(0)
-            
-        # Retrain models periodically
-        if len(self.history) % 100 == 0:
-            self._retrain_models()
+        evicted = self.samples.append(features, actual_slippage)
+        self.updates += 1
+
+        if self.online:
+            if self.fitted:
+                # out-of-sample residual, before the model has seen this execution
+                self.quantile_model.update(actual_slippage - float(self.linear_model.predict(features)))
+            self.linear_model.add(features, actual_slippage)
+            if evicted is not None:
+                self.linear_model.remove(*evicted)
+            if self.linear_model.resync_due:
+                self.linear_model.resync(*self.samples.arrays())
+            self.fitted = self.linear_model.n_samples > self.n_features
+        elif self.updates % self.retrain_interval == 0:
+            # Retrain models periodically
+            if self.trainer is not None:
+                self.trainer.submit(self)
+            else:
+                self._retrain_models()
+
+    def training_job(self) -> tuple:
+        """Snapshot of the sample window and the estimators to fit on it, see TrainingService"""
+        X, y = self.samples.arrays()
+        return fit_regressors, (X, y, {'linear': self.linear_model, 'quantile': self.quantile_model})
+
+    def install(self, params: dict, trained_at: float):
+        version = self.fitted_model.version + 1 if self.fitted_model else 1
+        self.fitted_model = FittedModel(version, trained_at, params)
+        self.fitted = True
+
+    def _retrain_models(self):
+        fn, args = self.training_job()
+        self.install(fn(*args), time.time())
+
+    def _predict(self, X: np.ndarray) -> tuple:
+        """Expected and worst case slippage for each row of the feature matrix X"""
+        if not self.fitted:
+            return np.zeros(len(X)), np.zeros(len(X))
+        if self.online:
+            expected = self.linear_model.predict(X)
+            return expected, expected + self.quantile_model.value
+        params = self.fitted_model.params
+        return X @ params['linear_coef'] + params['linear_intercept'], X @ params['quantile_coef'] + params['quantile_intercept']
 
     def estimate(self, book: OrderBook, quantity: float) -> dict:
         """Estimate slippage for given quantity"""
         features = self._extract_features(book, quantity)
-        
+        expected, worst_case = self._predict(np.asarray([features], dtype=np.float64))
+
         return {
-            'expected': float(self.linear_model.predict([features])[0]),
-            'worst_case': float(self.quantile_model.predict([features])[0]),
+            'expected': float(expected[0]),
+            'worst_case': float(worst_case[0]),
             'liquidity_shortfall': self._calculate_shortfall(book, quantity),
             'features': features
         }
 
+    def estimate_many(self, book: OrderBook, quantities, sides=BUY) -> Dict[str, np.ndarray]:
+        """
+        Estimate slippage for a whole grid of orders against one book. quantities
+        and sides (BUY/SELL) are broadcast against each other. Book features and the
+        depth walks are computed once and each model predicts the full feature
+        matrix in a single call. Returns a dict of equal length arrays.
+        """
+        quantities, sides = np.broadcast_arrays(np.atleast_1d(np.asarray(quantities, dtype=np.float64)), np.atleast_1d(np.asarray(sides)))
+        quantities = quantities.ravel()
+        sides = sides.ravel()
+
+        book_features = self.features.get(book)
+        spread, imbalance, bid_depth, ask_depth, total_volume = self._book_features(book_features)
+        X = np.empty((len(quantities), self.n_features), dtype=np.float64)
+        X[:, 0] = quantities
+        X[:, 1] = spread
+        X[:, 2] = imbalance
+        X[:, 3] = bid_depth
+        X[:, 4] = ask_depth
+        X[:, 5] = np.log(quantities / total_volume)
+        expected, worst_case = self._predict(X)
+
+        exact = np.empty(len(quantities), dtype=np.float64)
+        buys = sides == BUY
+        exact[buys] = DepthWalk.from_features(book_features, BUY).slippage(quantities[buys])
+        exact[~buys] = DepthWalk.from_features(book_features, SELL).slippage(quantities[~buys])
+
+        available = self._shortfall_depth(book_features)
+        return {
+            'quantity': quantities,
+            'side': sides,
+            'expected': expected,
+            'worst_case': worst_case,
+            'liquidity_shortfall': np.maximum(0, quantities - available) / quantities,
+            'exact': exact
+        }
+
+    def exact_slippage(self, book: OrderBook, quantities, depth: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Exact slippage of market orders for one quantity or an array of them,
+        from walking the visible book. Keyed by BUY/SELL, fractional units.
+        """
+        book_features = self.features.get(book)
+        return {
+            BUY: DepthWalk.from_features(book_features, BUY, depth=depth).slippage(quantities),
+            SELL: DepthWalk.from_features(book_features, SELL, depth=depth).slippage(quantities)
+        }
+
+    def _book_features(self, features: BookFeatures) -> tuple:
+        """Features that depend only on the book, shared by every order size"""
+        bid_depth, ask_depth = features.depth(500)  # Depth at 5% from mid
+        return (
+            features.spread,
+            features.imbalance,
+            bid_depth,
+            ask_depth,
+            features.total_volume
+        )
+
     def _extract_features(self, book: OrderBook, quantity: float) -> list:
         """Create feature vector for prediction"""
+        spread, imbalance, bid_depth, ask_depth, total_volume = self._book_features(self.features.get(book))
         return [
             quantity,
-            book.spread(),
-            book.imbalance(),
-            cumulative_depth(book.bids, 0.05),  # Depth at 5% from mid
-            cumulative_depth(book.asks, 0.05),
-            np.log(quantity / book.total_volume())
+            spread,
+            imbalance,
+            bid_depth,
+            ask_depth,
+            np.log(quantity / total_volume)
         ]
 
+    def _shortfall_depth(self, features: BookFeatures) -> float:
+        return sum(features.depth(1000))
+
     def _calculate_shortfall(self, book: OrderBook, quantity: float) -> float:
         """Calculate liquidity shortfall probability"""
-        available = cumulative_depth(book.bids, 0.1) + cumulative_depth(book.asks, 0.1)
+        available = self._shortfall_depth(self.features.get(book))
         return max(0, quantity - available) / quantity
@@ -0,0 +1,106 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+import logging
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.base import clone
+
+
+LOG = logging.getLogger('feedhandler')
+
+
+@dataclass(frozen=True)
+class FittedModel:
+    """
+    Immutable result of one training run. Models hold a single reference to
+    their current FittedModel, so installing a new one is an atomic swap. The
+    version is numbered by the model, which owns its sequence of fits however
+    they were run.
+    """
+    version: int
+    trained_at: float
+    params: Dict[str, np.ndarray]
+
+
+def fit_regressors(X: np.ndarray, y: np.ndarray, estimators: dict) -> Dict[str, np.ndarray]:
+    """
+    Fit a fresh clone of each sklearn linear estimator on (X, y) and return only
+    their coefficients, which are cheap to pickle back from a worker process.
+    """
+    params = {}
+    for name, estimator in estimators.items():
+        fitted = clone(estimator).fit(X, y)
+        params[f'{name}_coef'] = np.asarray(fitted.coef_, dtype=np.float64)
+        params[f'{name}_intercept'] = float(fitted.intercept_)
+    return params
+
+
+class TrainingService:
+    """
+    Fits models in a process pool so refits on large windows never run on the
+    feed's event loop.
+
+    A model taking part implements two methods:
+        training_job() -> (fn, args)
+            snapshot its training data; fn(*args) must be picklable and return params
+        install(params: dict, trained_at: float)
+            swap the new parameters in as the model's next FittedModel, called
+            from the executor's callback thread
+
+    Only one job per model is in flight at a time; submissions made while a fit
+    is still running are dropped, since the next one will see newer data anyway.
+    """
+    def __init__(self, max_workers: int = 1, executor: Executor = None):
+        self.max_workers = max_workers
+        self._executor = executor
+        self._pending = set()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'skipped': 0}
+        self.last_trained_at: Optional[float] = None
+        self.last_fit_seconds: Optional[float] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, model) -> Optional[Future]:
+        key = id(model)
+        if key in self._pending:
+            self.stats['skipped'] += 1
+            return None
+
+        fn, args = model.training_job()
+        self._pending.add(key)
+        self.stats['submitted'] += 1
+        start = time.time()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done(model, f, start))
+        return future
+
+    def _done(self, model, future: Future, start: float):
+        key = id(model)
+        try:
+            params = future.result()
+        except Exception:
+            self.stats['failed'] += 1
+            LOG.error('TrainingService: fit failed for %s', model.__class__.__name__, exc_info=True)
+            return
+        finally:
+            self._pending.discard(key)
+
+        now = time.time()
+        model.install(params, now)
+        self.stats['completed'] += 1
+        self.last_trained_at = now
+        self.last_fit_seconds = now - start
+
+    def metrics(self) -> dict:
+        return dict(self.stats, pending=len(self._pending), last_trained_at=self.last_trained_at, last_fit_seconds=self.last_fit_seconds)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
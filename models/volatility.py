@@ -1,29 +1,482 @@
+import math
+from typing import Dict
+
 import numpy as np
-from collections import deque
-from cryptofeed.types import Trade
+from cryptofeed.types import Candle, Trade
+
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+class RollingVolatility:
+    """
+    Standard deviation of the most recent values over several window lengths at
+    once. Values are kept in a preallocated ring buffer sized for the longest
+    window and each window carries a running mean and sum of squared deviations
+    (Welford), updated as values enter and leave it, so update and std are O(1)
+    and allocate nothing.
+    """
+    def __init__(self, windows=(10, 99), resync_interval=10_000):
+        """
+        windows: tuple
+            window lengths, in number of values
+        resync_interval: int
+            updates between exact recomputes of the running moments, which bounds
+            the rounding error that adding and removing values accumulates
+        """
+        if not windows or min(windows) < 1:
+            raise ValueError("windows must be positive lengths")
+        self.windows = tuple(windows)
+        self.index = {window: i for i, window in enumerate(self.windows)}
+        self.capacity = max(self.windows)
+        self.resync_interval = resync_interval
+        self.buffer = np.zeros(self.capacity, dtype=np.float64)
+        self.head = 0
+        self.updates = 0
+        self.counts = [0] * len(self.windows)
+        self.means = [0.0] * len(self.windows)
+        self.m2 = [0.0] * len(self.windows)
+
+    def __len__(self):
+        return min(self.updates, self.capacity)
+
+    @property
+    def last(self) -> float:
+        return float(self.buffer[(self.head - 1) % self.capacity]) if self.updates else np.nan
+
+    def update(self, value: float):
+        value = float(value)
+        for i, window in enumerate(self.windows):
+            n = self.counts[i]
+            mean = self.means[i]
+            m2 = self.m2[i]
+            if n == window:
+                # drop the value leaving this window before it is overwritten
+                old = self.buffer[(self.head - window) % self.capacity]
+                n -= 1
+                if n:
+                    delta = old - mean
+                    mean -= delta / n
+                    m2 -= delta * (old - mean)
+                else:
+                    mean = m2 = 0.0
+            n += 1
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            self.counts[i] = n
+            self.means[i] = mean
+            self.m2[i] = m2 if m2 > 0.0 else 0.0
+
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.updates += 1
+        if self.updates % self.resync_interval == 0:
+            self.resync()
+
+    def resync(self):
+        """Recompute every window's moments exactly from the buffer"""
+        for i, window in enumerate(self.windows):
+            n = self.counts[i]
+            if n == 0:
+                continue
+            values = np.take(self.buffer, np.arange(self.head - n, self.head), mode='wrap')
+            self.means[i] = float(values.mean())
+            self.m2[i] = float(((values - self.means[i]) ** 2).sum())
+
+    def count(self, window: int) -> int:
+        return self.counts[self.index[window]]
+
+    def mean(self, window: int) -> float:
+        return self.means[self.index[window]]
+
+    def std(self, window: int, ddof: int = 0) -> float:
+        i = self.index[window]
+        n = self.counts[i]
+        if n <= ddof:
+            return 0.0
+        return (self.m2[i] / (n - ddof)) ** 0.5
+
 
 class VolatilityEstimator:
-    def __init__(self, window_size=100):
+    def __init__(self, window_size=100, windows=(10,), periods_per_year=365 * 24):
+        """
+        window_size: int
+            number of prices the long term volatility is measured over
+        windows: tuple
+            additional return windows tracked alongside it, the first is reported
+            as short_term
+        periods_per_year: float
+            number of return periods in a year, used to annualize
+        """
         self.window_size = window_size
-        self.price_history = deque(maxlen=window_size)
-        self.returns = deque(maxlen=window_size-1)
-        
+        self.long_window = window_size - 1
+        self.windows = tuple(windows)
+        self.short_window = self.windows[0] if self.windows else self.long_window
+        self.annualization = np.sqrt(periods_per_year)
+        self.returns = RollingVolatility(tuple(dict.fromkeys(self.windows + (self.long_window,))))
+        self.last_price = None
+
     def update(self, trade: Trade):
         """Update with new trade data"""
-        if len(self.price_history) > 0:
-            prev_price = self.price_history[-1]
-            self.returns.append((trade.price - prev_price) / prev_price)
-        self.price_history.append(trade.price)
-    
+        price = float(trade.price)
+        if self.last_price is not None:
+            self.returns.update((price - self.last_price) / self.last_price)
+        self.last_price = price
+
+    def volatility(self, window: int) -> float:
+        """Annualized volatility of the last window returns"""
+        return self.returns.std(window) * self.annualization
+
     def current_volatility(self) -> dict:
         """Calculate current volatility metrics"""
-        if len(self.returns) < 2:
+        if self.returns.updates < 2:
             return {'instantaneous': 0, 'short_term': 0, 'long_term': 0}
-        
-        returns = np.array(self.returns)
+
+        return {
+            'instantaneous': abs(self.returns.last),
+            'short_term': self.volatility(self.short_window),
+            'long_term': self.volatility(self.long_window),
+            'current_price': self.last_price
+        }
+
+
+class VolatilityEngine:
+    """
+    Rolling return volatility for many symbols at once. State is columnar: one
+    row per symbol (ids assigned in order of first trade) in 2-D arrays holding
+    each symbol's ring buffer of returns and the running moments of every window,
+    so a batch of trades updates all symbols it touches with a few array
+    operations and queries return every symbol in one array.
+    """
+    def __init__(self, windows=(10, 99), periods_per_year=365 * 24, capacity=16, resync_interval=10_000):
+        """
+        windows: tuple
+            return windows tracked for every symbol, in number of returns. The first
+            is reported as short_term and the last as long_term
+        periods_per_year: float
+            number of return periods in a year, used to annualize
+        capacity: int
+            initial number of symbol rows, grown as needed
+        resync_interval: int
+            per-symbol updates between exact recomputes of the running moments
+        """
+        if not windows or min(windows) < 1:
+            raise ValueError("windows must be positive lengths")
+        self.windows = tuple(windows)
+        self.index = {window: i for i, window in enumerate(self.windows)}
+        self.window_lengths = np.asarray(self.windows, dtype=np.int64)
+        self.length = max(self.windows)
+        self.annualization = np.sqrt(periods_per_year)
+        self.resync_interval = resync_interval
+        self.ids: Dict[str, int] = {}
+        self.symbols = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        def grow(old, shape, fill, dtype):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        k = len(self.windows)
+        self.buffer = grow(getattr(self, 'buffer', None), (capacity, self.length), 0.0, np.float64)
+        self.head = grow(getattr(self, 'head', None), capacity, 0, np.int64)
+        self.updates = grow(getattr(self, 'updates', None), capacity, 0, np.int64)
+        self.last_price = grow(getattr(self, 'last_price', None), capacity, np.nan, np.float64)
+        self.last_return = grow(getattr(self, 'last_return', None), capacity, np.nan, np.float64)
+        self.counts = grow(getattr(self, 'counts', None), (capacity, k), 0, np.int64)
+        self.means = grow(getattr(self, 'means', None), (capacity, k), 0.0, np.float64)
+        self.m2 = grow(getattr(self, 'm2', None), (capacity, k), 0.0, np.float64)
+
+    def symbol_id(self, symbol: str) -> int:
+        try:
+            return self.ids[symbol]
+        except KeyError:
+            pass
+        row = len(self.symbols)
+        if row == len(self.head):
+            self._allocate(2 * row)
+        self.ids[symbol] = row
+        self.symbols.append(symbol)
+        return row
+
+    def update(self, trade: Trade):
+        """Update with new trade data"""
+        self.update_batch([trade.symbol], [float(trade.price)])
+
+    def update_trades(self, trades):
+        self.update_batch([t.symbol for t in trades], [float(t.price) for t in trades])
+
+    def update_batch(self, symbols, prices):
+        """
+        Apply trades given as parallel sequences of symbols and prices, in time
+        order. Trades for different symbols are applied together; a symbol with
+        several trades in the batch takes them in successive passes.
+        """
+        rows = np.fromiter((self.symbol_id(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(rows) == 0:
+            return
+
+        # occurrence number of each trade within its symbol, preserving order
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+
+        for step in range(rank.max() + 1):
+            mask = rank == step
+            self._step(rows[mask], prices[mask])
+
+    def _step(self, rows: np.ndarray, prices: np.ndarray):
+        """One price for each of rows, which are distinct"""
+        prev = self.last_price[rows]
+        self.last_price[rows] = prices
+        valid = ~np.isnan(prev)
+        if not valid.all():
+            rows, prices, prev = rows[valid], prices[valid], prev[valid]
+        if len(rows) == 0:
+            return
+        returns = (prices - prev) / prev
+
+        head = self.head[rows]
+        n = self.counts[rows]
+        mean = self.means[rows]
+        m2 = self.m2[rows]
+
+        # remove the return leaving each full window
+        full = n == self.window_lengths
+        old = self.buffer[rows[:, None], (head[:, None] - self.window_lengths) % self.length]
+        remaining = n - full
+        delta = np.where(full, old - mean, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(full & (remaining > 0), mean - delta / remaining, np.where(full, 0.0, mean))
+        m2 = np.where(full & (remaining > 0), m2 - delta * (old - mean), np.where(full, 0.0, m2))
+
+        # add the new return
+        n = remaining + 1
+        x = returns[:, None]
+        delta = x - mean
+        mean = mean + delta / n
+        m2 = np.maximum(m2 + delta * (x - mean), 0.0)
+
+        self.counts[rows] = n
+        self.means[rows] = mean
+        self.m2[rows] = m2
+        self.buffer[rows, head] = returns
+        self.head[rows] = (head + 1) % self.length
+        self.updates[rows] += 1
+        self.last_return[rows] = returns
+
+        resync = rows[self.updates[rows] % self.resync_interval == 0]
+        for row in resync:
+            self._resync(row)
+
+    def _resync(self, row: int):
+        for i, n in enumerate(self.counts[row]):
+            if n:
+                values = np.take(self.buffer[row], np.arange(self.head[row] - n, self.head[row]), mode='wrap')
+                self.means[row, i] = values.mean()
+                self.m2[row, i] = ((values - self.means[row, i]) ** 2).sum()
+
+    def std(self, window: int, ddof: int = 0) -> np.ndarray:
+        """Return standard deviation over window for every symbol, indexed by symbol id"""
+        i = self.index[window]
+        n = self.counts[:len(self.symbols), i]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > ddof, np.sqrt(self.m2[:len(self.symbols), i] / (n - ddof)), 0.0)
+
+    def volatility(self, window: int) -> np.ndarray:
+        """Annualized volatility over window for every symbol, indexed by symbol id"""
+        return self.std(window) * self.annualization
+
+    def volatilities(self) -> Dict[int, np.ndarray]:
+        """Annualized volatility for every window and symbol, keyed by window"""
+        n = len(self.symbols)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.where(self.counts[:n] > 0, np.sqrt(self.m2[:n] / self.counts[:n]), 0.0)
+        return {window: std[:, i] * self.annualization for i, window in enumerate(self.windows)}
+
+    def current_volatility(self, symbol: str) -> dict:
+        """Same metrics as VolatilityEstimator.current_volatility, for one symbol"""
+        row = self.ids.get(symbol)
+        if row is None or self.updates[row] < 2:
+            return {'instantaneous': 0, 'short_term': 0, 'long_term': 0}
+
+        short, long = self.windows[0], self.windows[-1]
+        std = np.sqrt(self.m2[row] / self.counts[row])
+        return {
+            'instantaneous': abs(float(self.last_return[row])),
+            'short_term': float(std[self.index[short]] * self.annualization),
+            'long_term': float(std[self.index[long]] * self.annualization),
+            'current_price': float(self.last_price[row])
+        }
+
+
+class RealizedVolatility:
+    """
+    Close-to-close volatility of fixed length time bars built from trades. Bars
+    are aligned to multiples of bar_seconds of Trade.timestamp and a bar's log
+    return is fed to the rolling windows when the first trade of a later bar
+    arrives. Bars without trades repeat the previous close.
+    """
+    def __init__(self, bar_seconds=60, windows=(60,), seconds_per_year=SECONDS_PER_YEAR):
+        """
+        bar_seconds: float
+            bar length, in seconds
+        windows: tuple
+            window lengths, in bars
+        seconds_per_year: float
+            annualization basis, crypto markets trade around the clock
+        """
+        self.bar_seconds = bar_seconds
+        self.windows = tuple(windows)
+        self.annualization = math.sqrt(seconds_per_year / bar_seconds)
+        self.returns = RollingVolatility(self.windows)
+        self.bar = None
+        self.close = None
+        self.previous_close = None
+
+    def update(self, trade: Trade):
+        """Update with new trade data"""
+        self.update_price(trade.timestamp, trade.price)
+
+    def update_price(self, timestamp: float, price):
+        bar = int(timestamp // self.bar_seconds)
+        price = float(price)
+        if self.bar is None:
+            self.bar = bar
+        elif bar > self.bar:
+            self._close_bar(bar - self.bar)
+            self.bar = bar
+        self.close = price
+
+    def _close_bar(self, elapsed: int):
+        if self.previous_close is not None:
+            self.returns.update(math.log(self.close / self.previous_close))
+            # empty bars in between have a zero return; more than a window of
+            # them would only flush the windows with zeros
+            for _ in range(min(elapsed - 1, self.returns.capacity)):
+                self.returns.update(0.0)
+        self.previous_close = self.close
+
+    def volatility(self, window: int = None) -> float:
+        """Annualized volatility over the last window closed bars, the first window by default"""
+        return self.returns.std(window or self.windows[0], ddof=1) * self.annualization
+
+
+class RangeVolatility:
+    """
+    Range-based volatility estimators over the most recent closed candles,
+    updated incrementally as each candle closes:
+
+    Parkinson     high/low range
+    Garman-Klass  high/low range and open/close move
+    Yang-Zhang    close-to-open gap, open/close move and the Rogers-Satchell
+                  term, robust to drift and opening jumps
+
+    A candle is taken as closed when it is flagged closed or when a later
+    candle arrives, so the repeated in-progress updates pushed on the candle
+    channel can be fed in directly.
+    """
+    def __init__(self, windows=(30,), bar_seconds: float = None, seconds_per_year=SECONDS_PER_YEAR):
+        """
+        windows: tuple
+            window lengths, in candles
+        bar_seconds: float
+            candle length used to annualize, defaults to stop - start of the first candle
+        """
+        self.windows = tuple(windows)
+        self.bar_seconds = bar_seconds
+        self.seconds_per_year = seconds_per_year
+        # per candle variance terms, averaged over each window
+        self.parkinson_terms = RollingVolatility(self.windows)
+        self.garman_klass_terms = RollingVolatility(self.windows)
+        self.rogers_satchell_terms = RollingVolatility(self.windows)
+        # log returns whose sample variances Yang-Zhang combines
+        self.overnight_returns = RollingVolatility(self.windows)
+        self.open_close_returns = RollingVolatility(self.windows)
+        self.pending: Candle = None
+        self.last_start = None
+        self.previous_close = None
+
+    @property
+    def annualization(self) -> float:
+        return math.sqrt(self.seconds_per_year / self.bar_seconds)
+
+    def update(self, candle: Candle):
+        if self.last_start is not None and candle.start <= self.last_start:
+            # already committed
+            return
+        if self.pending is not None and candle.start > self.pending.start:
+            self._commit(self.pending)
+            self.pending = None
+        if candle.closed:
+            self._commit(candle)
+            self.pending = None
+        else:
+            self.pending = candle
+
+    def update_candles(self, candles):
+        """Update from a sequence of candles, e.g. a page of OKXRestMixin.candles"""
+        for candle in candles:
+            self.update(candle)
+
+    def _commit(self, candle: Candle):
+        if self.bar_seconds is None:
+            self.bar_seconds = candle.stop - candle.start
+        o, h, l, c = float(candle.open), float(candle.high), float(candle.low), float(candle.close)
+        hl = math.log(h / l)
+        co = math.log(c / o)
+        hc, ho = math.log(h / c), math.log(h / o)
+        lc, lo = math.log(l / c), math.log(l / o)
+
+        self.parkinson_terms.update(hl * hl / (4 * math.log(2)))
+        self.garman_klass_terms.update(0.5 * hl * hl - (2 * math.log(2) - 1) * co * co)
+        self.rogers_satchell_terms.update(hc * ho + lc * lo)
+        self.open_close_returns.update(co)
+        if self.previous_close is not None:
+            self.overnight_returns.update(math.log(o / self.previous_close))
+        self.previous_close = c
+        self.last_start = candle.start
+
+    def _window(self, window: int) -> int:
+        return window or self.windows[0]
+
+    def parkinson(self, window: int = None) -> float:
+        window = self._window(window)
+        if self.parkinson_terms.count(window) == 0:
+            return 0.0
+        return math.sqrt(self.parkinson_terms.mean(window)) * self.annualization
+
+    def garman_klass(self, window: int = None) -> float:
+        window = self._window(window)
+        if self.garman_klass_terms.count(window) == 0:
+            return 0.0
+        return math.sqrt(max(self.garman_klass_terms.mean(window), 0.0)) * self.annualization
+
+    def yang_zhang(self, window: int = None) -> float:
+        window = self._window(window)
+        n = self.overnight_returns.count(window)
+        if n < 2:
+            return 0.0
+        k = 0.34 / (1.34 + (n + 1) / (n - 1))
+        variance = (
+            self.overnight_returns.std(window, ddof=1) ** 2
+            + k * self.open_close_returns.std(window, ddof=1) ** 2
+            + (1 - k) * self.rogers_satchell_terms.mean(window)
+        )
+        return math.sqrt(max(variance, 0.0)) * self.annualization
+
+    def current_volatility(self, window: int = None) -> dict:
+        """All estimators over window candles, annualized"""
+        if self.bar_seconds is None:
+            return {'parkinson': 0, 'garman_klass': 0, 'yang_zhang': 0}
         return {
-            'instantaneous': abs(self.returns[-1]),
-            'short_term': np.std(returns[-10:]) * np.sqrt(365*24),  # Annualized
-            'long_term': np.std(returns) * np.sqrt(365*24),
-            'current_price': self.price_history[-1]
+            'parkinson': self.parkinson(window),
+            'garman_klass': self.garman_klass(window),
+            'yang_zhang': self.yang_zhang(window)
         }
@@ -0,0 +1,99 @@
+import random
+from decimal import Decimal
+
+from cryptofeed.defines import BID, ASK
+from cryptofeed.types import OrderBook
+from cryptofeed.util.book import BookAggregates
+
+
+def _brute_force(book, bands, mid=None):
+    bids, asks = book[BID], book[ASK]
+    if mid is None:
+        mid = (float(bids.index(0)[0]) + float(asks.index(0)[0])) / 2
+    ret = {}
+    for side, levels in ((BID, bids), (ASK, asks)):
+        items = levels.to_dict().items()
+        depth = []
+        for bps in bands:
+            bound = mid * (1 - bps / 10_000) if side == BID else mid * (1 + bps / 10_000)
+            depth.append(sum(size for price, size in items if (price >= bound if side == BID else price <= bound)))
+        ret[side] = (sum(size for _, size in items), sum(price * size for price, size in items), depth)
+    return ret
+
+
+def test_aggregates_track_deltas():
+    rng = random.Random(5)
+    ob = OrderBook('OKX', 'BTC-USDT',
+                   bids={Decimal(1000 - i): Decimal(rng.randint(1, 9)) for i in range(1, 50)},
+                   asks={Decimal(1000 + i): Decimal(rng.randint(1, 9)) for i in range(1, 50)})
+    agg = BookAggregates(bands=(20, 100), top_k=5, rebase_bps=0)
+    agg.reset(ob.book)
+
+    for _ in range(500):
+        side = rng.choice((BID, ASK))
+        levels = ob.book[side]
+        price = Decimal(1000 - rng.randint(1, 60)) if side == BID else Decimal(1000 + rng.randint(1, 60))
+        old = levels[price] if price in levels else 0
+        new = Decimal(rng.randint(0, 9)) if len(levels) > 10 else Decimal(rng.randint(1, 9))
+        agg.update(side, price, old, new)
+        if new:
+            levels[price] = new
+        elif price in levels:
+            del levels[price]
+        agg.refresh()
+
+        expected = _brute_force(ob.book, (20, 100))
+        for s in (BID, ASK):
+            volume, notional, depth = expected[s]
+            assert agg.volume[s] == volume
+            assert agg.notional[s] == notional
+            assert agg.depth[s] == depth
+            assert agg.top(s) == [ob.book[s].index(i) for i in range(5)]
+
+
+def test_bands_rebase_once_mid_drifts():
+    # 0.05 ticks around 1000, 1 bps of mid is 0.1
+    tick = Decimal('0.05')
+    ob = OrderBook('OKX', 'BTC-USDT',
+                   bids={1000 - tick * i: Decimal(i % 7 + 1) for i in range(1, 400)},
+                   asks={1000 + tick * i: Decimal(i % 5 + 1) for i in range(1, 400)})
+    bands = (10, 50)
+    agg = BookAggregates(bands=bands, top_k=5)
+    agg.reset(ob.book)
+    assert agg.anchor == 1000.0 and agg.rebases == 1
+
+    def apply(side, price, new):
+        levels = ob.book[side]
+        agg.update(side, price, levels[price] if price in levels else 0, new)
+        if new:
+            levels[price] = new
+        elif price in levels:
+            del levels[price]
+
+    def check(mid):
+        _, _, bid_depth = _brute_force(ob.book, bands, mid)[BID]
+        _, _, ask_depth = _brute_force(ob.book, bands, mid)[ASK]
+        assert agg.depth[BID] == bid_depth and agg.depth[ASK] == ask_depth
+
+    # the best bid goes, mid 999.975 is within 1 bps: the bands stay on the old anchor
+    apply(BID, Decimal('999.95'), 0)
+    # levels between the band edges of the anchor and those of the current mid
+    apply(BID, Decimal('998.98'), Decimal('20'))
+    apply(ASK, Decimal('1000.99'), Decimal('20'))
+    apply(ASK, Decimal('1004.99'), Decimal('20'))
+    agg.refresh()
+    assert agg.anchor == 1000.0 and agg.rebases == 1
+    check(1000.0)
+    current = _brute_force(ob.book, bands)
+    assert agg.depth[BID] != current[BID][2] and agg.depth[ASK] != current[ASK][2]
+
+    # the mid moves to 999.85, more than 1 bps: re-anchored on it
+    for price in ('999.90', '999.85', '999.80', '999.75', '999.70'):
+        apply(BID, Decimal(price), 0)
+    agg.refresh()
+    assert agg.rebases == 2 and agg.anchor == (999.65 + 1000.05) / 2
+    check(agg.anchor)
+    fresh = BookAggregates(bands=bands)
+    fresh.reset(ob.book)
+    assert agg.depth == fresh.depth
+    assert agg.volume == fresh.volume and agg.notional == fresh.notional
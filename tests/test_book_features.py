@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import numpy as np
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+from models.book_features import BookFeatureCache, BookFeatures, book_arrays
+
+
+def _book():
+    return OrderBook('OKX', 'BTC-USDT',
+                     bids={Decimal('99'): Decimal('2'), Decimal('98'): Decimal('1'), Decimal('90'): Decimal('5')},
+                     asks={Decimal('101'): Decimal('1'), Decimal('102'): Decimal('3'), Decimal('120'): Decimal('4')})
+
+
+def test_book_features():
+    features = BookFeatures(_book(), bands=(250, 1000))
+
+    assert features.mid == 100.0
+    assert features.spread == 2.0
+    assert abs(features.microprice - (99 * 1 + 101 * 2) / 3) < 1e-12
+    assert abs(features.imbalance - 1 / 3) < 1e-12
+    assert features.total_volume == 16.0
+    assert np.allclose(features.bid_depth, [3.0, 8.0])
+    assert np.allclose(features.ask_depth, [4.0, 4.0])
+    assert features.depth(250) == (3.0, 4.0)
+    assert features.depth(100) == (2.0, 1.0)
+
+
+def test_cache_keyed_on_book_update():
+    cache = BookFeatureCache()
+    book = _book()
+    assert cache.get(book) is not cache.get(book)
+
+    book.checksum = 1
+    book.timestamp = 1.0
+    first = cache.get(book)
+    assert cache.get(book) is first
+    assert cache.hits == 1
+
+    book.book.bids[Decimal('99.5')] = Decimal('1')
+    book.timestamp = 2.0
+    updated = cache.get(book)
+    assert updated is not first
+    assert updated.best_bid == 99.5
+
+
+def test_top_levels_into_preallocated_arrays():
+    book = _book()
+    prices = np.full(5, np.nan)
+    sizes = np.full(5, np.nan)
+
+    assert book.top_levels(BID, 2, prices, sizes) == 2
+    assert prices[:2].tolist() == [99.0, 98.0] and sizes[:2].tolist() == [2.0, 1.0]
+    assert np.isnan(prices[2:]).all()
+    # never more than the side holds
+    assert book.top_levels(ASK, 5, prices, sizes) == 3
+    assert prices[:3].tolist() == [101.0, 102.0, 120.0]
+
+    prices, sizes = book_arrays(book, ASK, depth=2)
+    assert prices.tolist() == [101.0, 102.0] and sizes.tolist() == [1.0, 3.0]
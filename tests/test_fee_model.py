@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from models.fee_model import FeeModel, VolumeTieredFees, VolumeTracker
+
+
+DAY = 86400
+
+
+def test_calculate_fee_matches_schedule():
+    model = FeeModel()
+    for exchange, schedules in model.fee_schedules.items():
+        for s in schedules:
+            assert model.calculate_fee(exchange, s['tier'], 1000.0, is_maker=True) == pytest.approx(1000.0 * s['maker'])
+            assert model.calculate_fee(exchange, s['tier'], 1000.0) == pytest.approx(1000.0 * s['taker'])
+
+
+def test_calculate_fees_vectorized():
+    model = FeeModel()
+    notionals = np.array([100.0, 2500.0, 10.0, 0.0])
+    is_maker = np.array([True, False, False, True])
+
+    fees = model.calculate_fees('OKX', 1, notionals, is_maker)
+    expected = [model.calculate_fee('OKX', 1, n, m) for n, m in zip(notionals, is_maker)]
+    assert np.allclose(fees, expected)
+    assert np.allclose(model.calculate_fees('OKX', 2, notionals, False), notionals * model.rate('OKX', 2))
+
+
+def test_instrument_type_schedules_fall_back_to_exchange_wide():
+    model = FeeModel()
+    model.rates = model._compile({'OKX': [
+        {'tier': 1, 'maker': -0.0002, 'taker': 0.0005},
+        {'tier': 1, 'instrument_type': 'perpetual', 'maker': -0.0001, 'taker': 0.0004}
+    ]})
+    assert model.rate('OKX', 1, instrument_type='perpetual') == 0.0004
+    assert model.rate('OKX', 1, is_maker=True, instrument_type='spot') == -0.0002
+    with pytest.raises(KeyError):
+        model.rate('OKX', 3)
+
+
+def test_volume_tracker_matches_brute_force():
+    rng = np.random.default_rng(3)
+    timestamps = np.sort(rng.uniform(0, 120 * DAY, 2000))
+    notionals = rng.uniform(-5000, 5000, 2000)
+    tracker = VolumeTracker(window=30)
+
+    for i, (ts, notional) in enumerate(zip(timestamps, notionals)):
+        day = ts // DAY
+        prior = timestamps[:i] // DAY
+        expected = np.abs(notionals[:i][(prior >= day - 30) & (prior < day)]).sum()
+        assert tracker.volume(ts) == pytest.approx(expected)
+        tracker.add(ts, notional)
+
+
+def test_tier_moves_with_rolling_volume():
+    fees = VolumeTieredFees()
+    threshold = fees.thresholds[1]
+
+    assert fees.tier('acct', 0) == 1
+    assert fees.record_fill('acct', 0, threshold, is_maker=False) == pytest.approx(threshold * 0.0005)
+    # the tier changes at the next day boundary and falls back once the volume leaves the window
+    assert fees.tier('acct', DAY / 2) == 1
+    assert fees.tier('acct', DAY) == 2
+    assert fees.record_fill('acct', 30 * DAY, 100.0) == pytest.approx(100.0 * 0.0008)
+    assert fees.tier('acct', 31 * DAY) == 1
+
+
+def test_project_fees_matches_sequential_fills():
+    rng = np.random.default_rng(11)
+    timestamps = np.sort(rng.uniform(0, 90 * DAY, 5000))
+    notionals = rng.uniform(0, 20_000, 5000)
+    is_maker = rng.random(5000) < 0.4
+
+    sequential = VolumeTieredFees()
+    sequential.record_fill('acct', 0, 1_000_000)
+    expected = [sequential.record_fill('acct', t, n, m) for t, n, m in zip(timestamps, notionals, is_maker)]
+
+    batch = VolumeTieredFees()
+    batch.record_fill('acct', 0, 1_000_000)
+    fees, tiers = batch.project_fees('acct', timestamps, notionals, is_maker)
+    assert np.allclose(fees, expected)
+    assert set(tiers.tolist()) == {1, 2}
+    # projections leave the account untouched, recording does not
+    assert batch.volume('acct') == 0
+    batch.record_fills('acct', timestamps, notionals, is_maker)
+    assert batch.volume('acct', timestamps[-1]) == pytest.approx(sequential.volume('acct', timestamps[-1]))
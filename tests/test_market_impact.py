@@ -1,5 +1,10 @@
 import unittest
-from models.algren_chriss import AlmgrenChriss
+
+import numpy as np
+
+from cryptofeed.defines import BUY, SELL
+from cryptofeed.types import OrderBook
+from models.algren_chriss import AlmgrenChriss, stack_books
 
 class TestAlmgrenChriss(unittest.TestCase):
     def setUp(self):
@@ -12,4 +17,128 @@ class TestAlmgrenChriss(unittest.TestCase):
     def test_impact_calculation(self):
         result = self.model.calculate_impact(100, self.test_book)
         self.assertIn('total', result)
-        self.assertGreater(result['total'], 0)
\ No newline at end of file
+        self.assertGreater(result['total'], 0)
+
+    def test_book_calibration(self):
+        result = self.model.calculate_impact(1.0, self.test_book)
+        # half spread 50 on a 50050 mid, 4.2 asks inside 50 bps
+        coefficients = self.model.coefficients(self.test_book)
+        self.assertAlmostEqual(coefficients['half_spread'], 50 / 50050)
+        self.assertAlmostEqual(coefficients['eta'], 0.5 * 0.005 / 4.2)
+        self.assertAlmostEqual(result['temporary'], 50 / 50050 + 0.5 * 0.005 / 4.2)
+
+        sell = self.model.calculate_impact(1.0, self.test_book, side=SELL)
+        self.assertAlmostEqual(self.model.coefficients(self.test_book, SELL)['eta'], 0.5 * 0.005 / 3.5)
+        self.assertLess(sell['execution_price'], 50050)
+
+    def test_fill_calibration(self):
+        model = AlmgrenChriss(min_fills=10)
+        model.coefficients(self.test_book)
+        half_spread = 50 / 50050
+        rng = np.random.default_rng(1)
+        for q in rng.uniform(0.1, 5, 50):
+            model.record_fill(BUY, q, 50050 * (1 + half_spread + 2e-4 * q), 50050, post_mid=50050 * (1 + 1e-4 * q))
+        coefficients = model.coefficients(self.test_book)
+        # half of the 1e-4 permanent move is part of the 2e-4 the fills paid
+        self.assertAlmostEqual(coefficients['eta'], 1.5e-4)
+        self.assertAlmostEqual(coefficients['gamma'], 1e-4)
+        # the calibrated cost is the realized cost, not the permanent impact again on top
+        for q in (0.5, 2.0, 4.0):
+            self.assertAlmostEqual(model.calculate_impact(q, self.test_book)['total'], half_spread + 2e-4 * q)
+
+    def test_fill_calibration_per_symbol(self):
+        model = AlmgrenChriss(min_fills=10)
+        wide = OrderBook('OKX', 'ETH-USDT', bids={2990.0: 5.0}, asks={3010.0: 5.0})
+        tight = OrderBook('OKX', 'BTC-USDT', bids={50049.0: 1.0}, asks={50051.0: 1.0})
+        model.coefficients(wide)
+        # the last book seen is another symbol's, fills keep their own symbol's spread
+        model.coefficients(tight)
+        half_spread = 10 / 3000
+        rng = np.random.default_rng(2)
+        for q in rng.uniform(0.1, 5, 50):
+            model.record_fill(SELL, q, 3000 * (1 - half_spread - 2e-4 * q), 3000, symbol='ETH-USDT')
+        self.assertEqual(model.half_spreads, {'ETH-USDT': half_spread, 'BTC-USDT': 1 / 50050})
+        self.assertAlmostEqual(model.coefficients(wide, SELL)['eta'], 2e-4)
+        # another symbol's fills leave a book on its own depth estimate
+        self.assertAlmostEqual(model.coefficients(tight, SELL)['eta'], 0.5 * 0.005 / 1.0)
+        self.assertEqual(model.fills_version, {'ETH-USDT': 50})
+
+        for q in rng.uniform(0.1, 5, 50):
+            model.record_fill(BUY, q, 50050 * (1 + 1 / 50050 + 5e-4 * q), 50050, symbol='BTC-USDT')
+        self.assertAlmostEqual(model.coefficients(tight)['eta'], 5e-4)
+        self.assertAlmostEqual(model.coefficients(wide, SELL)['eta'], 2e-4)
+
+    def test_live_volatility(self):
+        sigma = [0.5]
+        model = AlmgrenChriss(volatility=lambda: sigma[0], horizon=300)
+        risk = model.calculate_impact(1.0, self.test_book)['risk']
+        sigma[0] = 1.0
+        self.assertAlmostEqual(model.calculate_impact(1.0, self.test_book)['risk'], 2 * risk)
+
+    def test_solve_schedule(self):
+        model = AlmgrenChriss(volatility=0.8)
+        model.coefficients(self.test_book, SELL)
+        grid = np.array([0.0, 1e-4, 1e-3, 1e-2])
+        schedule = model.solve_schedule(10.0, 600, 20, risk_aversion=grid)
+        self.assertEqual(schedule['holdings'].shape, (4, 21))
+        np.testing.assert_allclose(schedule['holdings'][:, 0], 10.0)
+        np.testing.assert_allclose(schedule['holdings'][:, -1], 0.0, atol=1e-12)
+        np.testing.assert_allclose(schedule['trades'].sum(axis=1), 10.0)
+        # risk neutral is a straight line
+        np.testing.assert_allclose(schedule['holdings'][0], np.linspace(10, 0, 21))
+        # more risk averse trades faster: higher expected cost, lower variance
+        self.assertTrue((np.diff(schedule['expected_cost']) > 0).all())
+        self.assertTrue((np.diff(schedule['variance']) < 0).all())
+
+        # matches a direct solve of E + lambda * Var over the interior holdings
+        c = model.coefficients(self.test_book, SELL)
+        mid, tau, n = c['mid'], 600 / 20, 20
+        eta_tilde = c['eta'] * mid - c['gamma'] * mid / 2
+        sigma = model.sigma_per_second * mid
+        for lam, holdings in zip(grid, schedule['holdings']):
+            a = 2 * eta_tilde + lam * sigma ** 2 * tau
+            system = np.diag(np.full(n - 1, a)) - eta_tilde * (np.eye(n - 1, k=1) + np.eye(n - 1, k=-1))
+            rhs = np.zeros(n - 1)
+            rhs[0] = eta_tilde * 10.0
+            np.testing.assert_allclose(holdings[1:-1], np.linalg.solve(system, rhs), rtol=1e-9, atol=1e-12)
+
+        single = model.solve_schedule(10.0, 600, 20, risk_aversion=1e-3)
+        np.testing.assert_allclose(single['holdings'], schedule['holdings'][2])
+        self.assertEqual(np.ndim(single['expected_cost']), 0)
+
+        # very risk averse schedules stay finite
+        self.assertTrue(np.isfinite(model.solve_schedule(10.0, 600, 2000, risk_aversion=1e6)['holdings']).all())
+
+    def test_batch_matches_single_book(self):
+        books = [
+            self.test_book,
+            {'bids': [[100.0, 5.0], [99.9, 1.0], [99.0, 10.0]], 'asks': [[100.1, 2.0]]},
+            {'bids': [[10.0, 50.0]], 'asks': [[10.02, 40.0], [10.03, 60.0]]}
+        ]
+        levels = 3
+        stacked = [np.full((3, levels), np.nan), np.zeros((3, levels)), np.full((3, levels), np.nan), np.zeros((3, levels))]
+        for i, book in enumerate(books):
+            for j, (price, size) in enumerate(book['bids']):
+                stacked[0][i, j], stacked[1][i, j] = price, size
+            for j, (price, size) in enumerate(book['asks']):
+                stacked[2][i, j], stacked[3][i, j] = price, size
+
+        ladder = np.array([0.5, 1.0, 2.0, 4.0])
+        for side in (BUY, SELL):
+            batch = self.model.calculate_impact_batch(np.tile(ladder, (3, 1)), *stacked, side=side)
+            self.assertEqual(batch['total'].shape, (3, 4))
+            for i, book in enumerate(books):
+                single = AlmgrenChriss().calculate_impact(ladder, book, side=side)
+                for key in ('temporary', 'permanent', 'total', 'execution_price'):
+                    np.testing.assert_allclose(batch[key][i], single[key])
+
+        per_book = self.model.calculate_impact_batch(np.array([1.0, 2.0, 3.0]), *stacked)
+        self.assertEqual(per_book['total'].shape, (3,))
+
+    def test_stack_books(self):
+        book = OrderBook('OKX', 'BTC-USDT', bids={100.0: 1.0, 99.0: 2.0}, asks={101.0: 3.0})
+        bid_prices, bid_sizes, ask_prices, ask_sizes = stack_books([book], levels=3)
+        np.testing.assert_array_equal(bid_prices, [[100.0, 99.0, np.nan]])
+        np.testing.assert_array_equal(bid_sizes, [[1.0, 2.0, 0.0]])
+        np.testing.assert_array_equal(ask_prices, [[101.0, np.nan, np.nan]])
+        np.testing.assert_array_equal(ask_sizes, [[3.0, 0.0, 0.0]])
@@ -0,0 +1,138 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from cryptofeed.defines import ASK, BID, BUY, CANCELLED, DECIMAL, FILL_OR_KILL, FLOAT, FILLED, FILLS, IMMEDIATE_OR_CANCEL, L2_BOOK, LIMIT, MAKER, MAKER_OR_CANCEL, MARKET, OPEN, ORDER_INFO, PARTIAL, SELL, TAKER, TRADES
+from cryptofeed.types import OrderBook, Trade
+from cryptofeed.util.matching import MatchingEngine
+
+
+D = Decimal
+
+
+class SimFeed:
+    id = 'SIM'
+    numeric_mode = DECIMAL
+
+    def __init__(self):
+        self.callbacks = {L2_BOOK: [], TRADES: [], FILLS: [self._record_fill], ORDER_INFO: [self._record_order]}
+        self._l2_book = {'BTC-USDT': OrderBook('SIM', 'BTC-USDT', bids={D('100'): D('3'), D('99'): D('5')}, asks={D('101'): D('2'), D('102'): D('4')})}
+        self.fills = []
+        self.order_updates = []
+
+    async def _record_fill(self, fill, timestamp):
+        self.fills.append(fill)
+
+    async def _record_order(self, oi, timestamp):
+        self.order_updates.append(oi)
+
+    async def callback(self, data_type, obj, receipt_timestamp):
+        for cb in self.callbacks[data_type]:
+            await cb(obj, receipt_timestamp)
+
+    async def update(self, side, price, size, timestamp=1.0):
+        book = self._l2_book['BTC-USDT']
+        if size == 0:
+            del book.book[side][price]
+        else:
+            book.book[side][price] = size
+        book.delta = {BID: [], ASK: []}
+        book.delta[side].append((price, size))
+        book.timestamp = timestamp
+        await self.callback(L2_BOOK, book, timestamp)
+
+    async def trade(self, side, amount, price, timestamp=2.0):
+        await self.callback(TRADES, Trade('SIM', 'BTC-USDT', side, amount, price, timestamp), timestamp)
+
+
+def fill_args(fill):
+    return fill.side, fill.amount, fill.price, fill.liquidity
+
+
+def test_taker_orders():
+    async def run():
+        feed = SimFeed()
+        engine = MatchingEngine(feed)
+
+        order = await engine.submit('BTC-USDT', BUY, D('3'), order_type=MARKET, timestamp=1.0)
+        assert order.status == FILLED
+        assert feed.order_updates[-1].status == FILLED and feed.order_updates[-1].price == D('0')
+        assert [fill_args(f) for f in feed.fills] == [(BUY, D('2'), D('101'), TAKER), (BUY, D('1'), D('102'), TAKER)]
+
+        # the first level was taken on this tick, the next order starts at what remains
+        order = await engine.submit('BTC-USDT', BUY, D('5'), order_type=IMMEDIATE_OR_CANCEL, price=D('102'), timestamp=1.0)
+        assert order.status == CANCELLED and order.remaining == D('2')
+        assert fill_args(feed.fills[-1]) == (BUY, D('3'), D('102'), TAKER)
+
+        # a book update on the level makes its size available again
+        await feed.update(ASK, D('101'), D('2'))
+        order = await engine.submit('BTC-USDT', BUY, D('3'), order_type=FILL_OR_KILL, price=D('102'), timestamp=1.0)
+        assert order.status == CANCELLED and order.remaining == D('3')
+        order = await engine.submit('BTC-USDT', BUY, D('2'), order_type=FILL_OR_KILL, price=D('102'), timestamp=1.0)
+        assert order.status == FILLED
+
+        order = await engine.submit('BTC-USDT', SELL, D('1'), order_type=MAKER_OR_CANCEL, price=D('100'), timestamp=1.0)
+        assert order.status == CANCELLED
+        assert feed.order_updates[-1].status == CANCELLED
+
+    asyncio.run(run())
+
+
+def test_resting_queue_position():
+    async def run():
+        feed = SimFeed()
+        engine = MatchingEngine(feed)
+        order = await engine.submit('BTC-USDT', BUY, D('2'), order_type=LIMIT, price=D('100'), timestamp=1.0)
+        assert order.status == OPEN and order.queue_ahead == D('3')
+
+        # prints at the price eat the queue ahead first
+        await feed.trade(SELL, D('2'), D('100'), 2.0)
+        assert order.queue_ahead == D('1') and not feed.fills
+        # cancellations shrink the queue once the level is smaller than it
+        await feed.update(BID, D('100'), D('0.5'))
+        assert order.queue_ahead == D('0.5')
+
+        await feed.trade(SELL, D('1'), D('100'), 3.0)
+        assert order.status == PARTIAL and order.remaining == D('1.5')
+        assert fill_args(feed.fills[-1]) == (BUY, D('0.5'), D('100'), MAKER)
+
+        # asks crossing the resting price fill it
+        await feed.update(ASK, D('99.5'), D('4'))
+        assert order.status == FILLED and order.remaining == 0
+        assert fill_args(feed.fills[-1]) == (BUY, D('1.5'), D('100'), MAKER)
+        assert engine.open_orders() == []
+
+        order = await engine.submit('BTC-USDT', SELL, D('1'), order_type=LIMIT, price=D('105'), timestamp=4.0)
+        await engine.cancel(order.id)
+        assert order.status == CANCELLED and engine.open_orders() == []
+
+    asyncio.run(run())
+
+
+def test_queue_ahead_is_shared():
+    async def run():
+        feed = SimFeed()
+        engine = MatchingEngine(feed)
+        first = await engine.submit('BTC-USDT', BUY, D('1'), order_type=LIMIT, price=D('100'), timestamp=1.0)
+        second = await engine.submit('BTC-USDT', BUY, D('1'), order_type=LIMIT, price=D('100'), timestamp=1.0)
+        assert first.queue_ahead == second.queue_ahead == D('3')
+
+        # the print takes the exchange's size at the price once, for both orders
+        await feed.trade(SELL, D('2'), D('100'), 2.0)
+        assert first.queue_ahead == second.queue_ahead == D('1') and not feed.fills
+
+        # what is left after the shared queue fills the orders in time priority
+        await feed.trade(SELL, D('2.5'), D('100'), 3.0)
+        assert first.queue_ahead == second.queue_ahead == 0
+        assert first.status == FILLED and second.status == PARTIAL and second.remaining == D('0.5')
+        assert [fill_args(f) for f in feed.fills] == [(BUY, D('1'), D('100'), MAKER), (BUY, D('0.5'), D('100'), MAKER)]
+
+    asyncio.run(run())
+
+
+def test_requires_decimal_mode():
+    feed = SimFeed()
+    feed.numeric_mode = FLOAT
+    with pytest.raises(ValueError):
+        MatchingEngine(feed)
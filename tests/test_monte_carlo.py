@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cryptofeed.defines import BUY, SELL
+from models.algren_chriss import AlmgrenChriss
+from models.monte_carlo import ExecutionSimulator
+
+
+BOOK = {
+    'bids': [[100.0, 2.0], [99.9, 3.0], [99.8, 5.0], [99.5, 10.0]],
+    'asks': [[100.2, 2.0], [100.3, 3.0], [100.4, 5.0], [100.7, 10.0]]
+}
+
+
+def test_deterministic_paths_match_book_walk():
+    model = AlmgrenChriss(volatility=0.0)
+    simulator = ExecutionSimulator(model, max_workers=1)
+    result = simulator.simulate(BOOK, 6.0, 60, 3, side=SELL, risk_aversion=0.0, n_paths=100, liquidity_vol=0.0, parallel=False)
+
+    # three slices of 2 each fill entirely at the best bid, the mid moves by the permanent impact between them
+    c = model.coefficients(BOOK, SELL)
+    mid = c['mid']
+    expected = 0.0
+    drift = 0.0
+    for _ in range(3):
+        price = mid * (1 - drift) * (1 - 0.1 / mid)
+        expected += (mid - price) * 2
+        drift += c['gamma'] * 2
+    np.testing.assert_allclose(result.costs, expected)
+    assert result.std < 1e-9
+
+
+def test_sharded_results_do_not_depend_on_executor():
+    model = AlmgrenChriss(volatility=0.8)
+    inline = ExecutionSimulator(model, max_workers=2).simulate(BOOK, 30.0, 300, 10, side=BUY, n_paths=2_001, seed=42, parallel=False)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sharded = ExecutionSimulator(model, max_workers=8, executor=executor).simulate(BOOK, 30.0, 300, 10, side=BUY, n_paths=2_001, seed=42)
+    assert len(sharded.costs) == 2_001
+    np.testing.assert_array_equal(inline.costs, sharded.costs)
+
+    # the owned process pool pickles the params and seeds to its workers
+    simulator = ExecutionSimulator(model, max_workers=3)
+    try:
+        pooled = simulator.simulate(BOOK, 30.0, 300, 10, side=BUY, n_paths=2_001, seed=42)
+    finally:
+        simulator.shutdown()
+    np.testing.assert_array_equal(inline.costs, pooled.costs)
+
+    summary = sharded.summary()
+    assert summary['cost_at_risk_99'] >= summary['cost_at_risk_95'] >= summary['percentiles'][50]
+    assert summary['expected_shortfall_95'] >= summary['cost_at_risk_95']
+    # buying 30 through a book holding 20 costs more than the spread
+    assert summary['mean_bps'] > 10
@@ -0,0 +1,123 @@
+import asyncio
+from collections import defaultdict
+from decimal import Decimal
+import os
+
+import pytest
+
+from cryptofeed.defines import ASK, BID, CANDLES, DECIMAL, FIXED_POINT, FLOAT, FUNDING, L2_BOOK, TICKER, TRADES
+from cryptofeed.exchanges.okx import OKX
+from cryptofeed.util.replay import load_symbols
+
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_data')
+
+BOOK_SNAPSHOT = '{"arg":{"channel":"books","instId":"BTC-USDT"},"action":"snapshot","data":[{"asks":[["30001.5","0.5","0","1"]],"bids":[["30000.1","1.25","0","2"]],"ts":"1652459225000","checksum":0}]}'
+BOOK_UPDATE = '{"arg":{"channel":"books","instId":"BTC-USDT"},"action":"update","data":[{"asks":[["30001.5","0","0","0"],["30002.0","0.75","0","1"]],"bids":[],"ts":"1652459225100","checksum":0}]}'
+TRADE = '{"arg":{"channel":"trades","instId":"BTC-USDT"},"data":[{"instId":"BTC-USDT","tradeId":"7","px":"30000.1","sz":"0.01","side":"sell","ts":"1652459225200"}]}'
+TICKER_MSG = '{"arg":{"channel":"tickers","instId":"BTC-USDT"},"data":[{"instId":"BTC-USDT","last":"30000.1","bidPx":"30000.1","askPx":"30002.0","ts":"1652459225300"}]}'
+BOOKS5 = '{"arg":{"channel":"books5","instId":"BTC-USDT"},"data":[{"asks":[["30003.0","2","0","1"],["30004.0","1","0","1"]],"bids":[["29999.0","3","0","1"]],"instId":"BTC-USDT","ts":"1652459225400"}]}'
+BBO = '{"arg":{"channel":"bbo-tbt","instId":"BTC-USDT"},"data":[{"asks":[["30001.0","0.4","0","1"]],"bids":[["30000.5","0.2","0","1"]],"ts":"1652459225500"}]}'
+FUNDING_MSG = '{"arg":{"channel":"funding-rate","instId":"BTC-USD-SWAP"},"data":[{"fundingRate":"0.0001","fundingTime":"1652486400000","instId":"BTC-USD-SWAP","instType":"SWAP","nextFundingRate":"0.00012"}]}'
+CANDLE = '{"arg":{"channel":"candle1m","instId":"BTC-USDT"},"data":[["1652459220000","30000.1","30002.0","29999.9","30001.5","12.5","375000","375000","0"]]}'
+
+
+def okx(**kwargs):
+    """OKX feed with symbols from the sample capture, recording every callback by channel"""
+    load_symbols(OKX, os.path.join(SAMPLE_DATA, 'OKX.0'))
+    received = defaultdict(list)
+
+    def record(channel):
+        async def callback(obj, timestamp):
+            received[channel].append(obj)
+        return callback
+
+    feed = OKX(callbacks={channel: record(channel) for channel in (L2_BOOK, TRADES, TICKER, CANDLES, FUNDING)}, **kwargs)
+    return feed, received
+
+
+def handle(feed, *messages):
+    async def run():
+        for i, msg in enumerate(messages):
+            await feed.message_handler(msg, None, 1652459226.0 + i)
+    asyncio.run(run())
+
+
+# (price, size) of each numeric mode, BTC-USDT has a 0.1 tick and a 0.00000001 lot
+NUMERIC_MODES = {
+    DECIMAL: (Decimal, Decimal),
+    FLOAT: (float, float),
+    FIXED_POINT: (lambda v: int(Decimal(v) / Decimal('0.1')), lambda v: int(Decimal(v) / Decimal('0.00000001')))
+}
+
+
+@pytest.mark.parametrize('numeric_mode', [DECIMAL, FLOAT, FIXED_POINT])
+def test_numeric_modes(numeric_mode):
+    px, sz = NUMERIC_MODES[numeric_mode]
+    number = int if numeric_mode == FIXED_POINT else type(px('1'))
+    feed, received = okx(numeric_mode=numeric_mode)
+    handle(feed, BOOK_SNAPSHOT, BOOK_UPDATE, TRADE, TICKER_MSG, CANDLE)
+
+    book = received[L2_BOOK][-1]
+    assert len(received[L2_BOOK]) == 2
+    assert book.book[BID].to_dict() == {px('30000.1'): sz('1.25')}
+    assert book.book[ASK].to_dict() == {px('30002.0'): sz('0.75')}
+    assert book.delta == {BID: [], ASK: [(px('30001.5'), 0), (px('30002.0'), sz('0.75'))]}
+    assert all(type(value) is number for level in book.book[ASK].to_dict().items() for value in level)
+
+    trade, = received[TRADES]
+    assert (trade.price, trade.amount) == (px('30000.1'), sz('0.01'))
+    assert type(trade.price) is number and type(trade.amount) is number
+
+    ticker, = received[TICKER]
+    assert (ticker.bid, ticker.ask) == (px('30000.1'), px('30002.0'))
+    assert type(ticker.bid) is number
+
+    candle, = received[CANDLES]
+    assert (candle.open, candle.close, candle.high, candle.low) == (px('30000.1'), px('30001.5'), px('30002.0'), px('29999.9'))
+    assert candle.volume == sz('12.5')
+    assert type(candle.open) is number and type(candle.volume) is number
+
+
+def test_numeric_mode_validation():
+    with pytest.raises(ValueError):
+        okx(numeric_mode='double')
+    with pytest.raises(ValueError):
+        okx(numeric_mode=FLOAT, checksum_validation=True)
+
+
+def test_message_dispatch():
+    feed, received = okx()
+    unknown = '{"arg":{"channel":"mark-price","instId":"BTC-USDT"},"data":[{"instId":"BTC-USDT","markPx":"30000","ts":"1652459225600"}]}'
+    handle(feed, '{"event":"subscribe","arg":{"channel":"books","instId":"BTC-USDT"}}', BOOK_SNAPSHOT, BOOK_UPDATE, TRADE, TICKER_MSG, CANDLE, FUNDING_MSG, unknown, unknown)
+
+    assert len(received[L2_BOOK]) == 2
+    assert [len(received[channel]) for channel in (TRADES, TICKER, CANDLES, FUNDING)] == [1, 1, 1, 1]
+    assert received[FUNDING][0].rate == Decimal('0.0001') and received[FUNDING][0].symbol == 'BTC-USD-PERP'
+    # counted on every message, resolved and logged once
+    assert feed.unhandled_channels == {'mark-price': 2}
+    assert feed._handlers['mark-price'] is None
+
+    # books5 and bbo-tbt carry no action, every message replaces the book
+    handle(feed, BOOKS5)
+    book = received[L2_BOOK][-1]
+    assert book.delta is None
+    assert book.book[BID].to_dict() == {Decimal('29999.0'): Decimal('3')}
+    assert book.book[ASK].to_dict() == {Decimal('30003.0'): Decimal('2'), Decimal('30004.0'): Decimal('1')}
+    handle(feed, BBO)
+    book = received[L2_BOOK][-1]
+    assert book.book[BID].to_dict() == {Decimal('30000.5'): Decimal('0.2')}
+    assert book.book[ASK].to_dict() == {Decimal('30001.0'): Decimal('0.4')}
+    assert len(received[L2_BOOK]) == 4
+
+    # candle channels of any valid interval resolve to the candle handler
+    handle(feed, CANDLE.replace('candle1m', 'candle1Dutc'))
+    assert len(received[CANDLES]) == 2
+    assert feed.unhandled_channels == {'mark-price': 2}
+
+
+def test_book_channel_validation():
+    feed, _ = okx(book_channel='bbo-tbt')
+    assert feed.book_channel == 'bbo-tbt'
+    with pytest.raises(ValueError):
+        okx(book_channel='books1000')
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+pytest.importorskip('dash')
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+from ui.components.order_book import OrderBookVisualization
+from ui.snapshot import SnapshotPublisher
+
+
+def apply_patch(figure, patch):
+    for op in patch.to_plotly_json()['operations']:
+        assert op['operation'] == 'Assign'
+        *path, last = op['location']
+        target = figure
+        for key in path:
+            target = target[key]
+        target[last] = op['params']['value']
+
+
+def top(book, side, n):
+    levels = book.book[side]
+    return [float(p) for p in list(levels)[:n]], [float(levels[p]) for p in list(levels)[:n]]
+
+
+def test_patches_track_book_deltas():
+    rng = random.Random(5)
+    book = OrderBook('OKX', 'BTC-USDT', bids={100 - i: 1 + i for i in range(30)}, asks={101 + i: 1 + i for i in range(30)})
+    viz = OrderBookVisualization(depth_levels=10)
+    publisher = SnapshotPublisher(interval=0, depth=10)
+    publisher.update(book)
+
+    # one page polling every update and one polling every seventh, both start from the empty figure
+    pages = [({'data': [{'x': [], 'y': []}, {'x': [], 'y': []}]}, 0, 1), ({'data': [{'x': [], 'y': []}, {'x': [], 'y': []}]}, 0, 7)]
+    for step in range(500):
+        book.delta = {BID: [], ASK: []}
+        for _ in range(rng.randint(1, 4)):
+            side = rng.choice((BID, ASK))
+            price = rng.randint(90, 100) if side == BID else rng.randint(101, 111)
+            size = 0 if rng.random() < 0.3 else rng.randint(1, 9)
+            if size == 0:
+                if price in book.book[side]:
+                    del book.book[side][price]
+            else:
+                book.book[side][price] = size
+            book.delta[side].append((price, size))
+        publisher.update(book)
+
+        for i, (figure, version, every) in enumerate(pages):
+            if step % every:
+                continue
+            patch, version = viz.patch(publisher.latest('BTC-USDT'), version)
+            if patch is not None:
+                apply_patch(figure, patch)
+            pages[i] = (figure, version, every)
+            for side, trace in ((BID, 0), (ASK, 1)):
+                prices, sizes = top(book, side, 10)
+                assert figure['data'][trace]['y'] == prices
+                assert figure['data'][trace]['x'] == sizes
+
+
+def test_unchanged_book_sends_nothing():
+    book = OrderBook('OKX', 'BTC-USDT', bids={100: 1, 99: 2, 98: 3}, asks={101: 2})
+    viz = OrderBookVisualization()
+    publisher = SnapshotPublisher(interval=0)
+    publisher.update(book)
+    patch, version = viz.patch(publisher.latest('BTC-USDT'), None)
+    assert patch is not None
+    assert viz.patch(publisher.latest('BTC-USDT'), version) == (None, version)
+
+    # a size change is sent as that one element
+    book.book[BID][99] = 5
+    book.delta = {BID: [(99, 5)], ASK: []}
+    publisher.update(book)
+    patch, version = viz.patch(publisher.latest('BTC-USDT'), version)
+    assert patch.to_plotly_json()['operations'] == [{'operation': 'Assign', 'location': ['data', 0, 'x', 1], 'params': {'value': 5.0}}]
@@ -0,0 +1,105 @@
+import asyncio
+from collections import Counter
+import os
+import time
+
+import pytest
+
+from cryptofeed.defines import L2_BOOK, TICKER, TRADES
+from cryptofeed.exchanges.okx import OKX
+from cryptofeed.symbols import Symbols
+from cryptofeed.util.replay import CONFIGURATION, CONNECT, RECEIVE, REST, SEND, ReplayConnection, load_symbols, parse_record, read_capture, replay
+
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_data')
+
+
+class RecordingFeed:
+    def __init__(self):
+        self.messages = []
+
+    async def message_handler(self, msg, conn, timestamp):
+        self.messages.append((msg, timestamp))
+
+
+def test_parse_record():
+    assert parse_record('wss://ws.okx.com:8443/ws/v5/public <-> 1652459224.5300605\n') == (CONNECT, 'wss://ws.okx.com:8443/ws/v5/public', 1652459224.5300605, None)
+    assert parse_record('wss://ws.okx.com:8443/ws/v5/public <- 1652459225.5: {"op":"subscribe"}') == (SEND, 'wss://ws.okx.com:8443/ws/v5/public', 1652459225.5, '{"op":"subscribe"}')
+    assert parse_record('1652459225.5: {"event":"subscribe"}\r\n') == (RECEIVE, None, 1652459225.5, '{"event":"subscribe"}')
+    assert parse_record('https://www.okx.com/api?instType=SPOT -> 1652458996.25: {"code":"0"}') == (REST, 'https://www.okx.com/api?instType=SPOT', 1652458996.25, '{"code":"0"}')
+    assert parse_record('configuration: {"l2_book":["BTC-USDT"]}').kind == CONFIGURATION
+    # payloads may themselves contain the separators
+    assert parse_record('1.5: {"a": "b <- c: d"}').payload == '{"a": "b <- c: d"}'
+
+    with pytest.raises(ValueError):
+        parse_record('garbage')
+
+
+def test_read_capture_sample():
+    kinds = [record.kind for record in read_capture(os.path.join(SAMPLE_DATA, 'OKX.ws.1.0'))]
+    assert kinds[0] == CONNECT
+    assert set(kinds) == {CONNECT, SEND, RECEIVE}
+
+    timestamps = [record.timestamp for record in read_capture(os.path.join(SAMPLE_DATA, 'OKX.ws.1.0'))]
+    assert timestamps == sorted(timestamps)
+
+
+def test_load_symbols():
+    class Exchange:
+        id = 'TEST'
+
+        @classmethod
+        def _parse_symbol_data(cls, data):
+            cls.data = data
+            return {'BTC-USDT': 'BTC-USDT'}, {'tick_size': {}}
+
+    configuration = load_symbols(Exchange, os.path.join(SAMPLE_DATA, 'OKX.0'))
+    assert configuration['l2_book'] == ['BTC-USD-22K27', 'UNI-USD-PERP', 'BTC-USDT']
+    # five endpoints, refreshed several times, the latest response of each is used
+    assert len(Exchange.data) == 5
+    assert Symbols.get('TEST')[0] == {'BTC-USDT': 'BTC-USDT'}
+
+
+def test_replay_fast():
+    path = os.path.join(SAMPLE_DATA, 'OKX.ws.1.0')
+    expected = [(record.payload, record.timestamp) for record in read_capture(path) if record.kind == RECEIVE]
+
+    feed = RecordingFeed()
+    conn = asyncio.run(replay(feed, path))
+    assert feed.messages == expected
+    assert conn.received == len(expected)
+    assert conn.address == 'wss://ws.okx.com:8443/ws/v5/public'
+    assert not conn.is_open
+
+
+def test_replay_okx_sample():
+    configuration = load_symbols(OKX, os.path.join(SAMPLE_DATA, 'OKX.0'))
+    counts = Counter()
+
+    def count(channel):
+        async def callback(obj, timestamp):
+            counts[channel] += 1
+        return callback
+
+    feed = OKX(subscription=configuration, checksum_validation=True, callbacks={channel: count(channel) for channel in (L2_BOOK, TRADES, TICKER)})
+    # a checksum mismatch raises BadChecksum out of the replay
+    conn = asyncio.run(replay(feed, os.path.join(SAMPLE_DATA, 'OKX.ws.1.0')))
+    assert counts == {L2_BOOK: 290, TRADES: 74, TICKER: 28}
+    assert not feed.unhandled_channels
+    assert set(feed._l2_book) == set(configuration[L2_BOOK])
+    assert conn.received == 410
+
+
+def test_replay_paced(tmp_path):
+    path = tmp_path / 'TEST.ws.1.0'
+    path.write_text('wss://test <-> 100.0\n100.0: a\n100.5: b\n101.0: c\n')
+
+    feed = RecordingFeed()
+    start = time.perf_counter()
+    asyncio.run(replay(feed, str(path), speed=10))
+    elapsed = time.perf_counter() - start
+    assert [msg for msg, _ in feed.messages] == ['a', 'b', 'c']
+    assert 0.1 <= elapsed < 1.0
+
+    with pytest.raises(ValueError):
+        ReplayConnection(str(path), speed=-1)
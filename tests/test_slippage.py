@@ -1,5 +1,9 @@
+import numpy as np
 import pytest
-from models.slippage import SlippageModel
+
+from cryptofeed.defines import BUY, SELL
+from models.online import OnlineQuantile, RollingLeastSquares, SampleWindow
+from models.slippage import DepthWalk, SlippageModel
 
 def test_slippage_calculation():
     model = SlippageModel()
@@ -16,4 +20,129 @@ def test_slippage_calculation():
     
     # Test model prediction
     model.train([10, 20, 30], [0.1, 0.2, 0.3])
-    assert model.predict(15.0, book_depth) is not None
\ No newline at end of file
+    assert model.predict(15.0, book_depth) is not None
+
+def test_depth_walk_vectorized():
+    walk = DepthWalk(np.array([100.0, 100.1, 100.2]), np.array([10.0, 5.0, 20.0]), BUY)
+    quantities = np.array([5.0, 15.0, 35.0, 40.0])
+    vwap = walk.vwap(quantities)
+
+    assert vwap[0] == 100.0
+    assert abs(vwap[1] - (10.0*100.0 + 5.0*100.1)/15.0) < 1e-9
+    assert abs(vwap[2] - (10.0*100.0 + 5.0*100.1 + 20.0*100.2)/35.0) < 1e-9
+    assert np.isnan(vwap[3])
+    assert abs(walk.slippage(15.0) - (vwap[1] - 100.0)/100.0) < 1e-12
+
+    bids = DepthWalk(np.array([99.9, 99.8]), np.array([1.0, 1.0]), SELL)
+    assert abs(bids.slippage(2.0) - (99.9 - 99.85)/99.9) < 1e-12
+
+
+def test_rolling_least_squares_matches_window_fit():
+    rng = np.random.default_rng(7)
+    window = SampleWindow(3, 50)
+    model = RollingLeastSquares(3)
+    for _ in range(120):
+        x = rng.normal(size=3)
+        y = x @ [0.5, -1.0, 2.0] + 0.1 + rng.normal(scale=0.01)
+        evicted = window.append(x, y)
+        model.add(x, y)
+        if evicted is not None:
+            model.remove(*evicted)
+
+    X, y = window.arrays()
+    beta = np.linalg.lstsq(np.column_stack([np.ones(len(y)), X]), y, rcond=None)[0]
+    assert len(window) == 50
+    assert np.allclose(model.coef_, beta[1:], atol=1e-6)
+    assert abs(model.intercept_ - beta[0]) < 1e-6
+
+
+def test_rolling_least_squares_resync():
+    rng = np.random.default_rng(5)
+    window = SampleWindow(3, 40)
+    model = RollingLeastSquares(3, resync_interval=1000)
+    resyncs = 0
+    for _ in range(30000):
+        x = rng.normal(loc=5.0, size=3)
+        y = x @ [0.5, -1.0, 2.0] + 0.1 + rng.normal(scale=0.01)
+        evicted = window.append(x, y)
+        model.add(x, y)
+        if evicted is not None:
+            model.remove(*evicted)
+        if model.resync_due:
+            model.resync(*window.arrays())
+            resyncs += 1
+
+    assert resyncs == 59 and model.updates < 1000 and model.n_samples == 40
+    X, y = window.arrays()
+    rows = np.column_stack([np.ones(len(y)), X])
+    # only the rounding of the adds and removes since the last resync is left
+    assert np.allclose(model._xtx, rows.T @ rows, rtol=1e-12, atol=0)
+    # within the small bias of the ridge guard
+    beta = np.linalg.lstsq(rows, y, rcond=None)[0]
+    assert np.allclose(model.coef_, beta[1:], atol=1e-5)
+    assert abs(model.intercept_ - beta[0]) < 1e-5
+
+    # a resync is exact
+    model.resync(X, y)
+    assert np.array_equal(model._xtx, rows.T @ rows) and np.array_equal(model._xty, rows.T @ y)
+
+
+def test_online_quantile_converges():
+    rng = np.random.default_rng(11)
+    q = OnlineQuantile(quantile=0.95)
+    data = rng.normal(size=20000)
+    for x in data:
+        q.update(x)
+    assert abs(q.value - np.quantile(data, 0.95)) < 0.15
+
+
+def test_estimate_many_matches_estimate():
+    from decimal import Decimal
+    from cryptofeed.types import OrderBook
+    from models.slippage import SlippageCalculator
+
+    book = OrderBook('OKX', 'BTC-USDT',
+                     bids={Decimal('99'): Decimal('2'), Decimal('98'): Decimal('3')},
+                     asks={Decimal('101'): Decimal('1'), Decimal('102'): Decimal('4')})
+    calc = SlippageCalculator(window_size=50, online=True)
+    rng = np.random.default_rng(3)
+    for quantity in rng.uniform(0.1, 4.0, size=40):
+        calc.update_model(book, 100.5 + 0.1 * quantity + rng.normal(scale=0.01), quantity)
+
+    quantities = np.array([0.5, 1.0, 2.0, 4.0])
+    batch = calc.estimate_many(book, quantities, [BUY, BUY, SELL, SELL])
+    for i, quantity in enumerate(quantities):
+        single = calc.estimate(book, quantity)
+        assert abs(batch['expected'][i] - single['expected']) < 1e-9
+        assert abs(batch['worst_case'][i] - single['worst_case']) < 1e-9
+        assert abs(batch['liquidity_shortfall'][i] - single['liquidity_shortfall']) < 1e-12
+    assert batch['exact'][1] == 0.0
+    assert abs(batch['exact'][3] - (99 - (99 * 2 + 98 * 2) / 4) / 99) < 1e-12
+
+
+def test_estimate_many_broadcasts_ladders():
+    from decimal import Decimal
+    from cryptofeed.types import OrderBook
+    from models.slippage import SlippageCalculator
+
+    book = OrderBook('OKX', 'ETH-USDT',
+                     bids={Decimal('99'): Decimal('2'), Decimal('98'): Decimal('3')},
+                     asks={Decimal('101'): Decimal('1'), Decimal('102'): Decimal('4')})
+    calc = SlippageCalculator(window_size=50)
+
+    # one side for the whole ladder, the models are not fit yet
+    ladder = calc.estimate_many(book, [0.5, 1.0, 3.0, 10.0])
+    assert set(ladder) == {'quantity', 'side', 'expected', 'worst_case', 'liquidity_shortfall', 'exact'}
+    assert all(len(values) == 4 for values in ladder.values())
+    assert list(ladder['side']) == [BUY] * 4
+    assert not ladder['expected'].any() and not ladder['worst_case'].any()
+    assert ladder['exact'][1] == 0.0
+    assert abs(ladder['exact'][2] - ((101 + 102 * 2) / 3 - 101) / 101) < 1e-12
+    assert np.isnan(ladder['exact'][3])
+
+    # a (quantities, 1) column against both sides gives the full grid, flattened row major
+    grid = calc.estimate_many(book, np.array([[1.0], [2.0]]), [BUY, SELL])
+    assert list(grid['quantity']) == [1.0, 1.0, 2.0, 2.0]
+    assert list(grid['side']) == [BUY, SELL, BUY, SELL]
+    exact = calc.exact_slippage(book, np.array([1.0, 2.0]))
+    assert np.allclose(grid['exact'], [exact[BUY][0], exact[SELL][0], exact[BUY][1], exact[SELL][1]])
@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+from ui.snapshot import SnapshotPublisher
+
+
+def _book():
+    return OrderBook('OKX', 'BTC-USDT', bids={100: 1, 99: 2}, asks={101: 3, 102: 4})
+
+
+def _update(book, side, price, size):
+    if size == 0:
+        del book.book[side][price]
+    else:
+        book.book[side][price] = size
+    book.delta = {BID: [], ASK: []}
+    book.delta[side].append((price, size))
+
+
+def test_snapshots_are_immutable_and_sequenced():
+    book = _book()
+    publisher = SnapshotPublisher(interval=0, depth=5, metrics=lambda b: {'best_bid': b.book[BID].index(0)[0]})
+    assert publisher.latest('BTC-USDT') is None
+
+    publisher.update(book)
+    first = publisher.latest('BTC-USDT')
+    assert first.bid_prices.tolist() == [100.0, 99.0] and first.ask_sizes.tolist() == [3.0, 4.0]
+    assert first.metrics['best_bid'] == 100
+    with pytest.raises(ValueError):
+        first.bid_sizes[0] = 5.0
+    with pytest.raises(TypeError):
+        first.metrics['best_bid'] = 0
+
+    _update(book, BID, 100.5, 7)
+    publisher.update(book)
+    second = publisher.latest('BTC-USDT')
+    assert second.sequence > first.sequence
+    assert second.bid_prices.tolist() == [100.5, 100.0, 99.0]
+    # earlier snapshots are unaffected by later updates
+    assert first.bid_prices.tolist() == [100.0, 99.0]
+    assert list(publisher.snapshots()) == ['BTC-USDT']
+
+
+def test_updates_within_interval_are_coalesced():
+    async def run():
+        book = _book()
+        publisher = SnapshotPublisher(interval=0.05)
+        publisher.update(book)
+        first = publisher.latest('BTC-USDT')
+        for size in (5, 6, 7):
+            _update(book, ASK, 101, size)
+            publisher.update(book)
+        assert publisher.latest('BTC-USDT') is first
+
+        # the last update is published once the interval is up
+        await asyncio.sleep(0.1)
+        latest = publisher.latest('BTC-USDT')
+        assert latest.sequence == first.sequence + 1
+        assert np.array_equal(latest.ask_sizes, [7.0, 4.0])
+
+    asyncio.run(run())
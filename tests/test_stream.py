@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from cryptofeed.types import OrderBook
+from ui.snapshot import SnapshotPublisher
+from ui.stream import events, register
+
+
+def _publisher(*symbols):
+    publisher = SnapshotPublisher(interval=0)
+    books = {symbol: OrderBook('OKX', symbol, bids={100: 1}, asks={101: 1}) for symbol in symbols}
+    return publisher, books
+
+
+def test_events_coalesce_per_symbol():
+    publisher, books = _publisher('BTC-USDT', 'ETH-USDT')
+    for _ in range(3):
+        publisher.update(books['BTC-USDT'])
+    publisher.update(books['ETH-USDT'])
+
+    stream = events(publisher, min_interval=0)
+    # last value wins, one event for everything published so far
+    assert next(stream) == 'data: {"BTC-USDT":3,"ETH-USDT":4}\n\n'
+
+    # the next event waits for a publish from the feed thread
+    timer = threading.Timer(0.05, publisher.update, (books['ETH-USDT'],))
+    timer.start()
+    assert next(stream) == 'data: {"ETH-USDT":5}\n\n'
+    timer.join()
+
+
+def test_events_filter_and_heartbeat():
+    publisher, books = _publisher('BTC-USDT', 'ETH-USDT')
+    publisher.update(books['ETH-USDT'])
+    stream = events(publisher, symbols=['BTC-USDT'], min_interval=0, heartbeat=0.01)
+    assert next(stream) == ': heartbeat\n\n'
+    publisher.update(books['BTC-USDT'])
+    assert next(stream) == 'data: {"BTC-USDT":2}\n\n'
+
+
+def test_stream_route():
+    publisher, books = _publisher('BTC-USDT')
+    publisher.update(books['BTC-USDT'])
+    server = flask.Flask(__name__)
+    register(server, publisher)
+
+    response = server.test_client().get('/stream?symbols=BTC-USDT', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    assert next(response.response) == b'data: {"BTC-USDT":1}\n\n'
+    response.close()
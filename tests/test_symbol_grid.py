@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('dash')
+
+from dash import no_update
+
+from cryptofeed.types import OrderBook
+from ui.components.symbol_grid import SymbolGrid
+from ui.snapshot import SnapshotPublisher
+
+
+def _publisher(symbols):
+    publisher = SnapshotPublisher(interval=0)
+    for symbol in symbols:
+        publisher.update(OrderBook('OKX', symbol, bids={100: 1}, asks={101: 2}))
+    return publisher
+
+
+def test_only_visible_symbols_are_computed():
+    symbols = ['BTC-USDT', 'ETH-USDT', 'SOL-USDT']
+    grid = SymbolGrid(symbols, size=2)
+    publisher = _publisher(symbols)
+    assert grid.pages == 2
+
+    figures, titles, metrics, state = grid.update(publisher, 1, {})
+    assert titles == ['BTC-USDT', 'ETH-USDT']
+    assert state == {'0': ['BTC-USDT', 1], '1': ['ETH-USDT', 2]}
+    assert all(f is not no_update for f in figures)
+    # a visualization exists only for symbols that have been shown
+    assert set(grid._viz) == {'BTC-USDT', 'ETH-USDT'}
+
+    # pushes for symbols off the page compute nothing
+    assert grid.update(publisher, 1, state, pushed={'SOL-USDT': 3}) is None
+    # and a page that is current sends nothing
+    figures, titles, metrics, state = grid.update(publisher, 1, state, pushed={'BTC-USDT': 1})
+    assert figures == [no_update, no_update] and titles == [no_update, no_update]
+
+
+def test_page_change_rebinds_slots():
+    symbols = ['BTC-USDT', 'ETH-USDT', 'SOL-USDT']
+    grid = SymbolGrid(symbols, size=2)
+    publisher = _publisher(symbols)
+    _, _, _, state = grid.update(publisher, 1, {})
+
+    figures, titles, metrics, state = grid.update(publisher, 2, state)
+    assert titles == ['SOL-USDT', '']
+    assert state == {'0': ['SOL-USDT', 3]}
+    # the emptied slot is cleared
+    operations = figures[1].to_plotly_json()['operations']
+    assert {tuple(op['location']) for op in operations} == {('data', 0, 'x'), ('data', 0, 'y'), ('data', 1, 'x'), ('data', 1, 'y')}
+    assert all(op['params']['value'] == [] for op in operations)
+
+
+def test_metrics():
+    publisher = SnapshotPublisher(interval=0, metrics=lambda book: {
+        'slippage': {'expected': 0.0123, 'worst_case': 0.0456, 'liquidity_shortfall': 0.25},
+        'volatility': {'instantaneous': 0.7, 'short_term': 0.5, 'long_term': 0.4}
+    })
+    publisher.update(OrderBook('OKX', 'BTC-USDT', bids={100: 1}, asks={101: 2}))
+    slippage, _, volatility = SymbolGrid.metrics(publisher.latest('BTC-USDT')).children
+    assert slippage.children == 'Slippage: 0.0123% expected, 0.0456% worst, 25.00% shortfall'
+    assert volatility.children == 'Volatility: 0.7000 instant, 0.5000 short, 0.4000 long'
+    # symbols without a snapshot yet show zeros
+    assert SymbolGrid.metrics(None).children[0].children.endswith('0.00% shortfall')
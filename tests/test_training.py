@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+import threading
+
+import numpy as np
+
+from models.slippage import SlippageCalculator
+from models.training import FittedModel, TrainingService
+
+
+def _fit(X, y):
+    return {'linear_coef': np.linalg.lstsq(X, y, rcond=None)[0]}
+
+
+class _Model:
+    def __init__(self):
+        self.X = np.eye(3)
+        self.y = np.array([1.0, 2.0, 3.0])
+        self.fitted = None
+        self.installed = threading.Event()
+
+    def training_job(self):
+        return _fit, (self.X.copy(), self.y.copy())
+
+    def install(self, params, trained_at):
+        self.fitted = FittedModel(self.fitted.version + 1 if self.fitted else 1, trained_at, params)
+        self.installed.set()
+
+
+def test_training_service_installs_versions():
+    service = TrainingService(executor=ThreadPoolExecutor(max_workers=1))
+    model = _Model()
+
+    service.submit(model)
+    assert model.installed.wait(5)
+    first = model.fitted
+    assert first.version == 1
+    assert np.allclose(first.params['linear_coef'], [1.0, 2.0, 3.0])
+
+    model.y = np.array([2.0, 2.0, 2.0])
+    model.installed.clear()
+    service.submit(model)
+    assert model.installed.wait(5)
+    assert model.fitted.version == 2
+    assert model.fitted.trained_at >= first.trained_at
+    service.shutdown()
+    assert service.metrics()['completed'] == 2
+    assert service.metrics()['pending'] == 0
+
+
+def test_training_service_process_pool():
+    # the default executor: the job, sklearn estimators included, is pickled to a worker process
+    service = TrainingService(max_workers=1)
+    calculator = SlippageCalculator(window_size=50, trainer=service)
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        features = rng.random(SlippageCalculator.n_features)
+        calculator.samples.append(features, float(features @ np.arange(1, 7)))
+
+    assert service.submit(calculator) is not None
+    # joins the pool, its done callbacks included
+    service.shutdown()
+    assert service.metrics()['completed'] == 1
+    assert calculator.fitted and calculator.fitted_model.version == 1
+    assert np.allclose(calculator.fitted_model.params['linear_coef'], np.arange(1, 7))
+
+    fitted = pickle.loads(pickle.dumps(calculator.fitted_model))
+    assert fitted.version == 1
+    assert np.array_equal(fitted.params['quantile_coef'], calculator.fitted_model.params['quantile_coef'])
+
+    # inline refits continue the calculator's own version sequence
+    calculator._retrain_models()
+    assert calculator.fitted_model.version == 2
@@ -0,0 +1,146 @@
+from collections import deque
+from decimal import Decimal
+
+import numpy as np
+
+from models.volatility import RangeVolatility, RealizedVolatility, RollingVolatility, VolatilityEngine, VolatilityEstimator
+
+
+class _Trade:
+    def __init__(self, price):
+        self.price = price
+
+
+def test_rolling_volatility_matches_full_recompute():
+    rng = np.random.default_rng(7)
+    windows = (1, 5, 10, 64)
+    rolling = RollingVolatility(windows, resync_interval=50)
+    history = deque(maxlen=max(windows))
+
+    for value in rng.normal(0, 0.01, 500):
+        rolling.update(value)
+        history.append(value)
+        for window in windows:
+            expected = np.asarray(history)[-window:]
+            assert rolling.count(window) == len(expected)
+            assert np.isclose(rolling.std(window), np.std(expected), rtol=1e-9, atol=1e-15)
+            assert np.isclose(rolling.std(window, ddof=1), np.std(expected, ddof=1) if len(expected) > 1 else 0.0, rtol=1e-9, atol=1e-15)
+        assert rolling.last == value
+
+
+def test_volatility_estimator_matches_previous_output():
+    rng = np.random.default_rng(3)
+    prices = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.001, 300)))
+    estimator = VolatilityEstimator(window_size=100)
+    assert estimator.current_volatility() == {'instantaneous': 0, 'short_term': 0, 'long_term': 0}
+
+    history = deque(maxlen=100)
+    for price in prices:
+        estimator.update(_Trade(Decimal(str(price))))
+        history.append(float(Decimal(str(price))))
+
+    returns = np.diff(np.asarray(history)) / np.asarray(history)[:-1]
+    metrics = estimator.current_volatility()
+    assert np.isclose(metrics['instantaneous'], abs(returns[-1]))
+    assert np.isclose(metrics['short_term'], np.std(returns[-10:]) * np.sqrt(365 * 24))
+    assert np.isclose(metrics['long_term'], np.std(returns) * np.sqrt(365 * 24))
+    assert metrics['current_price'] == history[-1]
+
+
+def test_volatility_engine_matches_per_symbol_estimators():
+    rng = np.random.default_rng(11)
+    symbols = ['BTC-USDT', 'ETH-USDT', 'SOL-USDT-PERP']
+    engine = VolatilityEngine(windows=(5, 20), capacity=1, resync_interval=37)
+    estimators = {s: VolatilityEstimator(window_size=21, windows=(5,)) for s in symbols}
+    prices = {s: 100.0 * (i + 1) for i, s in enumerate(symbols)}
+
+    for _ in range(40):
+        # batches interleave symbols and repeat them
+        batch_symbols = list(rng.choice(symbols, size=rng.integers(1, 8)))
+        batch_prices = []
+        for s in batch_symbols:
+            prices[s] *= np.exp(rng.normal(0, 0.002))
+            batch_prices.append(prices[s])
+            estimators[s].update(_Trade(prices[s]))
+        engine.update_batch(batch_symbols, batch_prices)
+
+    short, long = engine.volatility(5), engine.volatility(20)
+    for s in symbols:
+        expected = estimators[s].current_volatility()
+        got = engine.current_volatility(s)
+        assert got.keys() == expected.keys()
+        for key in expected:
+            assert np.isclose(got[key], expected[key], rtol=1e-9, atol=1e-15)
+        assert np.isclose(short[engine.ids[s]], expected['short_term'])
+        assert np.isclose(long[engine.ids[s]], expected['long_term'])
+
+    assert engine.current_volatility('XRP-USDT') == {'instantaneous': 0, 'short_term': 0, 'long_term': 0}
+
+
+class _Candle:
+    def __init__(self, start, open, high, low, close, closed=True, interval=60):
+        self.start = start
+        self.stop = start + interval
+        self.open, self.high, self.low, self.close = (Decimal(str(x)) for x in (open, high, low, close))
+        self.closed = closed
+
+
+def test_realized_volatility_time_bars():
+    rv = RealizedVolatility(bar_seconds=60, windows=(5,))
+    closes = [100.0, 101.0, 100.5, 102.0, 101.0, 103.0, 104.0]
+    for i, close in enumerate(closes):
+        # several trades per bar, only the last one is the close
+        rv.update_price(i * 60 + 1, close * 0.99)
+        rv.update_price(i * 60 + 59, close)
+    # the last bar is still open
+    returns = np.diff(np.log(closes[:-1]))
+    annualization = np.sqrt(365 * 24 * 60)
+    assert np.isclose(rv.volatility(), np.std(returns[-5:], ddof=1) * annualization)
+
+    # a two bar gap adds zero returns for the bars without trades
+    rv = RealizedVolatility(bar_seconds=60, windows=(10,))
+    for ts, price in ((0, 100.0), (60, 101.0), (240, 102.0), (300, 102.5)):
+        rv.update_price(ts, price)
+    returns = [np.log(101 / 100), 0.0, 0.0, np.log(102 / 101)]
+    assert np.isclose(rv.volatility(), np.std(returns, ddof=1) * annualization)
+
+
+def test_range_volatility_estimators():
+    rng = np.random.default_rng(5)
+    n = 40
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opens = np.r_[100.0, closes[:-1]] * np.exp(rng.normal(0, 0.001, n))
+    highs = np.maximum(opens, closes) * np.exp(np.abs(rng.normal(0, 0.005, n)))
+    lows = np.minimum(opens, closes) * np.exp(-np.abs(rng.normal(0, 0.005, n)))
+
+    rv = RangeVolatility(windows=(20,))
+    for i in range(n):
+        # in-progress updates for the bar, then the next bar's first update closes it
+        rv.update(_Candle(i * 60, opens[i], highs[i], lows[i], opens[i], closed=False))
+        rv.update(_Candle(i * 60, opens[i], highs[i], lows[i], closes[i], closed=False))
+    rv.update(_Candle(n * 60, closes[-1], closes[-1], closes[-1], closes[-1], closed=False))
+
+    # recompute from the floats the candles carry
+    o, h, l, c = (np.array([float(Decimal(str(x))) for x in a]) for a in (opens, highs, lows, closes))
+    annualization = np.sqrt(365 * 24 * 60)
+    w = slice(-20, None)
+    hl = np.log(h / l)[w]
+    co = np.log(c / o)[w]
+    parkinson = np.sqrt(np.mean(hl ** 2) / (4 * np.log(2))) * annualization
+    garman_klass = np.sqrt(np.mean(0.5 * hl ** 2 - (2 * np.log(2) - 1) * co ** 2)) * annualization
+    overnight = np.log(o[1:] / c[:-1])[-20:]
+    rs = (np.log(h / c) * np.log(h / o) + np.log(l / c) * np.log(l / o))[w]
+    k = 0.34 / (1.34 + 21 / 19)
+    yang_zhang = np.sqrt(np.var(overnight, ddof=1) + k * np.var(co, ddof=1) + (1 - k) * np.mean(rs)) * annualization
+
+    metrics = rv.current_volatility()
+    assert np.isclose(metrics['parkinson'], parkinson)
+    assert np.isclose(metrics['garman_klass'], garman_klass)
+    assert np.isclose(metrics['yang_zhang'], yang_zhang)
+
+    # a closed candle is committed once, repeats are ignored
+    rv = RangeVolatility(windows=(5,))
+    candle = _Candle(0, 100, 101, 99, 100.5)
+    rv.update(candle)
+    rv.update(candle)
+    assert rv.parkinson_terms.count(5) == 1
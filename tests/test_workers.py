@@ -0,0 +1,33 @@
+import pickle
+
+import pytest
+
+from cryptofeed.types import OrderBook
+from ui.snapshot import SnapshotPublisher
+from ui.workers import shard
+
+
+def test_shard_splits_in_order():
+    symbols = [f'S{i}' for i in range(10)]
+    shards = shard(symbols, 4)
+    assert [len(s) for s in shards] == [3, 3, 2, 2]
+    assert sum(shards, []) == symbols
+    assert shard(symbols[:2], 8) == [['S0'], ['S1']]
+    assert shard([], 4) == []
+
+
+def test_snapshots_cross_processes():
+    worker = SnapshotPublisher(interval=0, metrics=lambda book: {'volatility': {'short_term': 0.5}})
+    dashboard = SnapshotPublisher()
+    for symbol in ('BTC-USDT', 'ETH-USDT', 'BTC-USDT'):
+        worker.update(OrderBook('OKX', symbol, bids={100: 1}, asks={101: 2}))
+    # the dashboard renumbers snapshots from any number of workers into its own sequence
+    dashboard.put(pickle.loads(pickle.dumps(worker.latest('BTC-USDT'))))
+    received = dashboard.put(pickle.loads(pickle.dumps(worker.latest('ETH-USDT'))))
+
+    assert received.sequence == dashboard.sequence == 2
+    assert received.ask_sizes.tolist() == [2.0]
+    assert received.metrics['volatility'] == {'short_term': 0.5}
+    with pytest.raises(ValueError):
+        received.bid_prices[0] = 0.0
+    assert set(dashboard.snapshots()) == {'BTC-USDT', 'ETH-USDT'}
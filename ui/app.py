@@ -1,99 +1,66 @@
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, ALL, ctx, html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
-from cryptofeed import FeedHandler
-from cryptofeed.exchanges import OKX
-from cryptofeed.types import OrderBook, Trade
-from models import SlippageCalculator, VolatilityEstimator
-from ui.components.order_book import OrderBookVisualization
+from config.okx_config import OKXConfig
+from ui.components.symbol_grid import SymbolGrid
+from ui.snapshot import SnapshotPublisher
+from ui.stream import register
+from ui.workers import ShardedFeed
+
+config = OKXConfig.load()
+# push snapshot updates to the browser over server-sent events instead of polling every second
+PUSH = True
 
 # Initialize components
 app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
-slippage_model = SlippageCalculator()
-volatility_model = VolatilityEstimator()
-book_viz = OrderBookVisualization()
+grid = SymbolGrid(config.symbols)
 
-# Store current state
-current_book = None
-current_trade = None
+# the feed workers' snapshots are published here, callbacks only ever read them
+snapshots = SnapshotPublisher()
+if PUSH:
+    register(app.server, snapshots)
 
 # Layout
 app.layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.H1("OKX Trade Simulator POC"),
-            dcc.Interval(id='update', interval=1000)
+            dcc.Interval(id='update', interval=1000, disabled=PUSH),
+            # written by assets/stream.js on every pushed update
+            dcc.Store(id='book-stream'),
+            # slot -> [symbol, order book version] the page shows
+            dcc.Store(id='grid-state', data={})
         ], width=12)
     ]),
     dbc.Row([
         dbc.Col([
-            html.H3("Order Book"),
-            dcc.Graph(id='order-book', figure=book_viz.create_figure(OrderBook('BTC-USDT')))
-        ], width=6),
-        dbc.Col([
-            html.H3("Execution Metrics"),
-            html.Div(id='slippage-metrics'),
-            html.Div(id='volatility-metrics'),
-            html.Div(id='latency-metrics')
-        ], width=6)
+            html.Span(f"{len(grid.symbols)} instruments"),
+            dbc.Pagination(id='grid-page', max_value=grid.pages, active_page=1, fully_expanded=False)
+        ], width=12)
+    ]),
+    dbc.Row([
+        dbc.Col([grid.layout()], width=12)
     ])
-])
+], fluid=True)
 
 # Callbacks
 @app.callback(
-    [Output('order-book', 'figure'),
-     Output('slippage-metrics', 'children'),
-     Output('volatility-metrics', 'children')],
-    Input('update', 'n_intervals')
+    [Output({'type': 'grid-book', 'slot': ALL}, 'figure'),
+     Output({'type': 'grid-title', 'slot': ALL}, 'children'),
+     Output({'type': 'grid-metrics', 'slot': ALL}, 'children'),
+     Output('grid-state', 'data')],
+    Input('update', 'n_intervals'),
+    Input('book-stream', 'data'),
+    Input('grid-page', 'active_page'),
+    State('grid-state', 'data')
 )
-def update_ui(n):
-    """Update all UI components"""
-    global current_book, current_trade
-    
-    # Update order book visualization
-    fig = book_viz.update_figure(book_viz.create_figure(OrderBook('BTC-USDT')), current_book)
-    
-    # Calculate slippage metrics
-    slippage = slippage_model.estimate(current_book, 100) if current_book else {}
-    
-    # Get volatility metrics
-    volatility = volatility_model.current_volatility() if current_trade else {}
-    
-    return (
-        fig,
-        html.Div([
-            html.H4("Slippage Estimation"),
-            html.P(f"Expected: {slippage.get('expected', 0):.4f}%"),
-            html.P(f"Worst Case: {slippage.get('worst_case', 0):.4f}%"),
-            html.P(f"Liquidity Shortfall: {slippage.get('liquidity_shortfall', 0):.2%}")
-        ]),
-        html.Div([
-            html.H4("Volatility Metrics"),
-            html.P(f"Instant: {volatility.get('instantaneous', 0):.4f}"),
-            html.P(f"Short-Term: {volatility.get('short_term', 0):.4f}"),
-            html.P(f"Long-Term: {volatility.get('long_term', 0):.4f}")
-        ])
-    )
+def update_ui(n, pushed, page, state):
+    """Update the visible symbols"""
+    # pushes name the symbols that changed, anything else redraws whatever is stale
+    outputs = grid.update(snapshots, page, state, pushed if ctx.triggered_id == 'book-stream' else None)
+    if outputs is None:
+        return [no_update] * grid.size, [no_update] * grid.size, [no_update] * grid.size, no_update
+    return outputs
 
 def start_feed_handler():
-    """Initialize and run cryptofeed"""
-    def book_update(book: OrderBook, timestamp: float):
-        global current_book
-        current_book = book
-        # Additional processing if needed
-    
-    def trade_update(trade: Trade, timestamp: float):
-        global current_trade
-        current_trade = trade
-        volatility_model.update(trade)
-        # Additional processing if needed
-    
-    fh = FeedHandler()
-    fh.add_feed(OKX(
-        symbols=['BTC-USDT'],
-        channels=['book', 'trades'],
-        callbacks={
-            'book': book_update,
-            'trades': trade_update
-        }
-    ))
-    fh.run()
+    """Run the sharded feed workers and publish their snapshots, blocks"""
+    ShardedFeed(config.symbols, snapshots).run()
@@ -0,0 +1,21 @@
+// Push mode: forward server-sent snapshot updates (see ui/stream.py) into the
+// book-stream store, whose callbacks then run only when a symbol changed.
+(function () {
+    function connect() {
+        if (!window.dash_clientside || !window.dash_clientside.set_props) {
+            setTimeout(connect, 100);
+            return;
+        }
+        var source = new EventSource('stream');
+        source.onmessage = function (event) {
+            window.dash_clientside.set_props('book-stream', {data: JSON.parse(event.data)});
+        };
+        // the browser reconnects by itself unless the route is missing (poll mode)
+        source.onerror = function () {
+            if (source.readyState === EventSource.CLOSED) {
+                source.close();
+            }
+        };
+    }
+    connect();
+})();
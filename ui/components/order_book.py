@@ -1,22 +1,106 @@
-import dash_core_components as dcc
+from dash import Patch
 import plotly.graph_objs as go
+from cryptofeed.defines import ASK, BID
 from cryptofeed.types import OrderBook
+from ui.snapshot import BookSnapshot, TopLevels
+
+# trace index of each side in the figure
+TRACES = {BID: 0, ASK: 1}
+
 
 class OrderBookVisualization:
-    def __init__(self, depth_levels=20):
+    """
+    Order book depth chart, drawn from the BookSnapshots of a SnapshotPublisher.
+    The browser is sent Dash Patch updates holding only the traces, or single
+    sizes, that changed since the snapshot the page last drew.
+    """
+    def __init__(self, depth_levels=20, history=8):
+        """
+        history: int
+            number of snapshots kept, figures older than that get both traces in full
+        """
         self.depth_levels = depth_levels
-        
-    def create_figure(self, book: OrderBook) -> go.Figure:
+        self.history = history
+        # (current version, version -> {side: (prices, sizes)}, (from, to) -> patch).
+        # Replaced as a whole, so concurrent requests need no lock. Version 0 is
+        # the empty figure, the others are snapshot sequence numbers
+        self._state = (0, {0: {BID: ([], []), ASK: ([], [])}}, {})
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def _publish(self, snapshot: BookSnapshot):
+        version, versions, _ = self._state
+        if snapshot is None or snapshot.sequence <= version:
+            return
+        levels = {side: tuple(a.tolist() for a in snapshot.levels(side)) for side in (BID, ASK)}
+        kept = list(versions.items())[-(self.history - 1):] if self.history > 1 else []
+        self._state = (snapshot.sequence, dict(kept + [(snapshot.sequence, levels)]), {})
+
+    @staticmethod
+    def _full_patch(levels) -> Patch:
+        patch = Patch()
+        for side, (prices, sizes) in levels.items():
+            patch['data'][TRACES[side]]['x'] = sizes
+            patch['data'][TRACES[side]]['y'] = prices
+        return patch
+
+    @staticmethod
+    def empty_patch() -> Patch:
+        """Patch clearing both traces"""
+        return OrderBookVisualization._full_patch({BID: ([], []), ASK: ([], [])})
+
+    @staticmethod
+    def _diff_patch(previous, levels) -> Patch:
+        patch = Patch()
+        for side, (prices, sizes) in levels.items():
+            trace = TRACES[side]
+            old_prices, old_sizes = previous[side]
+            if prices != old_prices:
+                patch['data'][trace]['x'] = sizes
+                patch['data'][trace]['y'] = prices
+                continue
+            changed = [i for i, (new, old) in enumerate(zip(sizes, old_sizes)) if new != old]
+            if len(changed) > len(sizes) // 2:
+                patch['data'][trace]['x'] = sizes
+            else:
+                for i in changed:
+                    patch['data'][trace]['x'][i] = sizes[i]
+        return patch
+
+    def patch(self, snapshot: BookSnapshot, version: int = None):
+        """
+        Bring a figure at version up to date with snapshot. Returns (patch, version),
+        the patch is None when the figure is current. Figures at a recent version
+        get the changes only, anything older or None gets both traces.
+        """
+        self._publish(snapshot)
+        current, versions, patches = self._state
+        if version == current:
+            return None, current
+        if version not in versions:
+            return self._full_patch(versions[current]), current
+        # shared by every figure at version
+        patch = patches.get(version)
+        if patch is None:
+            patch = patches[version] = self._diff_patch(versions[version], versions[current])
+        return patch, current
+
+    def _levels(self, book: OrderBook, side: str):
+        top = TopLevels(side, self.depth_levels)
+        if book is not None:
+            top.reset(book)
+        return top.prices, top.sizes
+
+    def create_figure(self, book: OrderBook = None) -> go.Figure:
         """Generate Plotly figure from order book"""
-        bids = sorted(book.bids.items(), reverse=True)[:self.depth_levels]
-        asks = sorted(book.asks.items())[:self.depth_levels]
-        
-        bid_prices, bid_sizes = zip(*bids) if bids else ([], [])
-        ask_prices, ask_sizes = zip(*asks) if asks else ([], [])
-        
+        bid_prices, bid_sizes = self._levels(book, BID)
+        ask_prices, ask_sizes = self._levels(book, ASK)
+
         return go.Figure(
             data=[
-                go.Bar(x=bid_sizes, y=bid_prices, 
+                go.Bar(x=bid_sizes, y=bid_prices,
                        orientation='h', name='Bids',
                        marker=dict(color='green')),
                 go.Bar(x=ask_sizes, y=ask_prices,
@@ -31,15 +115,15 @@ class OrderBookVisualization:
                 hovermode='closest'
             )
         )
-    
+
     def update_figure(self, fig: go.Figure, book: OrderBook) -> go.Figure:
         """Update existing figure with new data"""
-        bids = sorted(book.bids.items(), reverse=True)[:self.depth_levels]
-        asks = sorted(book.asks.items())[:self.depth_levels]
-        
+        bid_prices, bid_sizes = self._levels(book, BID)
+        ask_prices, ask_sizes = self._levels(book, ASK)
+
         with fig.batch_update():
-            fig.data[0].x = [size for _, size in bids]
-            fig.data[0].y = [price for price, _ in bids]
-            fig.data[1].x = [size for _, size in asks]
-            fig.data[1].y = [price for price, _ in asks]
+            fig.data[0].x = bid_sizes
+            fig.data[0].y = bid_prices
+            fig.data[1].x = ask_sizes
+            fig.data[1].y = ask_prices
         return fig
@@ -0,0 +1,105 @@
+from typing import List, Sequence
+
+from dash import dcc, html, no_update
+
+from ui.components.order_book import OrderBookVisualization
+from ui.snapshot import SnapshotPublisher
+
+
+class SymbolGrid:
+    """
+    Order book charts and metrics for a page of symbols at a time. The grid has
+    a fixed number of slots that the visible symbols are bound to, so only the
+    visible symbols' figures are ever computed, however many are subscribed.
+    Each slot is patched from the order book visualization of the symbol it
+    shows; moving to another page redraws the slots in full.
+    """
+    def __init__(self, symbols: Sequence[str], size: int = 12, columns: int = 3, depth_levels: int = 20):
+        """
+        size: int
+            symbols shown per page
+        columns: int
+            slots per grid row
+        """
+        self.symbols = list(symbols)
+        self.size = size
+        self.columns = columns
+        self.depth_levels = depth_levels
+        # symbol -> visualization, created when the symbol is first shown
+        self._viz = {}
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.symbols) // self.size))
+
+    def visible(self, page: int) -> List[str]:
+        start = (max(page or 1, 1) - 1) * self.size
+        return self.symbols[start:start + self.size]
+
+    def viz(self, symbol: str) -> OrderBookVisualization:
+        viz = self._viz.get(symbol)
+        if viz is None:
+            viz = self._viz.setdefault(symbol, OrderBookVisualization(self.depth_levels))
+        return viz
+
+    def layout(self) -> html.Div:
+        figure = OrderBookVisualization(self.depth_levels).create_figure()
+        figure.update_layout(title=None, height=320, margin=dict(l=40, r=10, t=10, b=30), showlegend=False)
+        slots = [
+            html.Div([
+                html.H5(id={'type': 'grid-title', 'slot': slot}),
+                dcc.Graph(id={'type': 'grid-book', 'slot': slot}, figure=figure, config={'displayModeBar': False}),
+                html.Div(id={'type': 'grid-metrics', 'slot': slot})
+            ], style={'minWidth': 0})
+            for slot in range(self.size)
+        ]
+        return html.Div(slots, style={'display': 'grid', 'gridTemplateColumns': f'repeat({self.columns}, 1fr)', 'gap': '1rem'})
+
+    @staticmethod
+    def metrics(snapshot) -> html.Div:
+        metrics = snapshot.metrics if snapshot else {}
+        slippage = metrics.get('slippage', {})
+        volatility = metrics.get('volatility', {})
+        return html.Div([
+            html.Small(f"Slippage: {slippage.get('expected', 0):.4f}% expected, {slippage.get('worst_case', 0):.4f}% worst, "
+                       f"{slippage.get('liquidity_shortfall', 0):.2%} shortfall"),
+            html.Br(),
+            html.Small(f"Volatility: {volatility.get('instantaneous', 0):.4f} instant, {volatility.get('short_term', 0):.4f} short, "
+                       f"{volatility.get('long_term', 0):.4f} long")
+        ])
+
+    def update(self, publisher: SnapshotPublisher, page: int, state: dict, pushed: dict = None):
+        """
+        Outputs for every slot: (figures, titles, metrics, state). state maps a
+        slot to the [symbol, version] its figure shows. pushed holds the symbols
+        changed since the last update; when none of them is visible nothing is
+        computed and None is returned.
+        """
+        visible = self.visible(page)
+        state = state or {}
+        if pushed is not None and not any(symbol in pushed for symbol in visible):
+            return None
+
+        figures, titles, metrics, new_state = [], [], [], {}
+        for slot in range(self.size):
+            symbol = visible[slot] if slot < len(visible) else None
+            shown, version = state.get(str(slot), (None, None))
+            if symbol is None:
+                if shown is None:
+                    figures.append(no_update)
+                else:
+                    # no symbol left for this slot on the last page
+                    figures.append(OrderBookVisualization.empty_patch())
+                titles.append('' if shown is not None else no_update)
+                metrics.append('' if shown is not None else no_update)
+                continue
+
+            if shown != symbol:
+                version = None
+            snapshot = publisher.latest(symbol)
+            patch, version = self.viz(symbol).patch(snapshot, version)
+            new_state[str(slot)] = [symbol, version]
+            figures.append(patch if patch is not None else no_update)
+            titles.append(symbol if shown != symbol else no_update)
+            metrics.append(self.metrics(snapshot) if patch is not None or shown != symbol else no_update)
+        return figures, titles, metrics, new_state
@@ -0,0 +1,225 @@
+'''
+Handoff of book state from the feed thread to the Dash server.
+
+The feed thread owns the live OrderBook objects and every model; nothing on the
+UI side reads them. On each book update the feed thread folds the delta into a
+top of book cache and, at most once per interval per symbol, publishes a
+BookSnapshot: the top levels as read-only arrays plus the metrics computed from
+the book at that moment. Snapshots are immutable and published with a single
+reference store, so a reader always sees a complete one, without locks and
+without copying anything. Each carries a sequence number that only grows, so
+readers can tell cheaply whether anything changed, or block in wait() until
+it does.
+'''
+import asyncio
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping
+
+import numpy as np
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+
+
+class TopLevels:
+    """
+    The best n levels of one side of a book, as floats best first, kept current
+    from the book's deltas. Size changes and new levels are applied in place;
+    only a delta removing a level inside the top n re-reads the top of the book,
+    through OrderBook.top_levels into buffers allocated once.
+    """
+    __slots__ = ('side', 'n', 'prices', 'sizes', '_keys', '_price_buffer', '_size_buffer')
+
+    def __init__(self, side: str, n: int):
+        self.side = side
+        self.n = n
+        self.prices = []
+        self.sizes = []
+        # ascending sort keys of prices, bids are negated
+        self._keys = []
+        self._price_buffer = np.empty(n, dtype=np.float64)
+        self._size_buffer = np.empty(n, dtype=np.float64)
+
+    def _key(self, price: float) -> float:
+        return -price if self.side == BID else price
+
+    def reset(self, book: OrderBook):
+        count = book.top_levels(self.side, self.n, self._price_buffer, self._size_buffer)
+        self.prices = self._price_buffer[:count].tolist()
+        self.sizes = self._size_buffer[:count].tolist()
+        self._keys = [self._key(p) for p in self.prices]
+
+    def apply(self, delta, book: OrderBook):
+        """delta: (price, size) updates to the side, size 0 removes the level. book: the book after the update"""
+        for price, size in delta:
+            price, size = float(price), float(size)
+            key = self._key(price)
+            i = bisect_left(self._keys, key)
+            present = i < len(self._keys) and self._keys[i] == key
+            if size == 0:
+                if present:
+                    # the levels that move up are only known to the book
+                    self.reset(book)
+                    return
+            elif present:
+                self.sizes[i] = size
+            elif i < self.n:
+                self.prices.insert(i, price)
+                self.sizes.insert(i, size)
+                self._keys.insert(i, key)
+                if len(self.prices) > self.n:
+                    del self.prices[-1], self.sizes[-1], self._keys[-1]
+
+
+def _frozen(values) -> np.ndarray:
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class BookSnapshot:
+    symbol: str
+    sequence: int
+    timestamp: float
+    bid_prices: np.ndarray
+    bid_sizes: np.ndarray
+    ask_prices: np.ndarray
+    ask_sizes: np.ndarray
+    metrics: Mapping[str, object]
+
+    def levels(self, side: str):
+        """(prices, sizes) of side, best first"""
+        return (self.bid_prices, self.bid_sizes) if side == BID else (self.ask_prices, self.ask_sizes)
+
+    def __reduce__(self):
+        # the metrics proxy does not pickle, snapshots cross process boundaries
+        return _snapshot, (self.symbol, self.sequence, self.timestamp, self.bid_prices, self.bid_sizes, self.ask_prices, self.ask_sizes, dict(self.metrics))
+
+
+def _snapshot(symbol, sequence, timestamp, bid_prices, bid_sizes, ask_prices, ask_sizes, metrics) -> BookSnapshot:
+    return BookSnapshot(symbol, sequence, timestamp, _frozen(bid_prices), _frozen(bid_sizes), _frozen(ask_prices), _frozen(ask_sizes), MappingProxyType(metrics))
+
+
+class SnapshotPublisher:
+    def __init__(self, interval: float = 0.25, depth: int = 20, metrics: Callable[[OrderBook], dict] = None, sink: Callable[[BookSnapshot], None] = None):
+        """
+        interval: float
+            minimum seconds between snapshots of a symbol. Updates in between are
+            coalesced; the last one is published when the interval is up
+        depth: int
+            levels per side in a snapshot
+        metrics: callable
+            computes the metrics published with a snapshot from the live book, on
+            the feed thread
+        sink: callable
+            also called with every snapshot published, e.g. to forward them to
+            another process
+        """
+        self.interval = interval
+        self.depth = depth
+        self.metrics = metrics
+        self.sink = sink
+        self.sequence = 0
+        # symbol -> latest snapshot. Replaced, never resized, when a symbol is
+        # added so readers may iterate it while the feed thread publishes
+        self._latest: Dict[str, BookSnapshot] = {}
+        # feed thread only
+        self._top = {}
+        self._books = {}
+        self._published = {}
+        self._pending = set()
+        # set, and replaced, on every publish
+        self._changed = threading.Event()
+
+    def update(self, book: OrderBook):
+        """Fold a book update into the cache and publish if the symbol is due. Call from the feed thread"""
+        symbol = book.symbol
+        top = self._top.get(symbol)
+        if top is None or book is not self._books[symbol] or book.delta is None:
+            top = self._top[symbol] = {side: TopLevels(side, self.depth) for side in (BID, ASK)}
+            self._books[symbol] = book
+            for levels in top.values():
+                levels.reset(book)
+        else:
+            for side, levels in top.items():
+                if book.delta[side]:
+                    levels.apply(book.delta[side], book)
+
+        wait = self._published.get(symbol, 0.0) + self.interval - time.monotonic()
+        if wait <= 0:
+            self.publish(symbol)
+        elif symbol not in self._pending:
+            self._pending.add(symbol)
+            try:
+                asyncio.get_running_loop().call_later(wait, self._flush, symbol)
+            except RuntimeError:
+                # no event loop to flush from, the next update publishes
+                self._pending.discard(symbol)
+
+    def _flush(self, symbol: str):
+        if symbol in self._pending:
+            self.publish(symbol)
+
+    def publish(self, symbol: str) -> BookSnapshot:
+        book = self._books[symbol]
+        top = self._top[symbol]
+        self._pending.discard(symbol)
+        self._published[symbol] = time.monotonic()
+        snapshot = BookSnapshot(
+            symbol=symbol,
+            sequence=self.sequence + 1,
+            timestamp=book.timestamp if book.timestamp is not None else time.time(),
+            bid_prices=_frozen(top[BID].prices),
+            bid_sizes=_frozen(top[BID].sizes),
+            ask_prices=_frozen(top[ASK].prices),
+            ask_sizes=_frozen(top[ASK].sizes),
+            metrics=MappingProxyType(dict(self.metrics(book)) if self.metrics else {})
+        )
+        self._store(snapshot)
+        if self.sink is not None:
+            self.sink(snapshot)
+        return snapshot
+
+    def put(self, snapshot: BookSnapshot) -> BookSnapshot:
+        """
+        Publish a snapshot built elsewhere, e.g. by a publisher in a worker
+        process. It is renumbered into this publisher's sequence
+        """
+        snapshot = replace(snapshot, sequence=self.sequence + 1)
+        self._store(snapshot)
+        return snapshot
+
+    def _store(self, snapshot: BookSnapshot):
+        symbol = snapshot.symbol
+        if symbol in self._latest:
+            self._latest[symbol] = snapshot
+        else:
+            self._latest = {**self._latest, symbol: snapshot}
+        # only once the snapshot is visible, readers go by the sequence
+        self.sequence = snapshot.sequence
+        changed, self._changed = self._changed, threading.Event()
+        changed.set()
+
+    def wait(self, sequence: int, timeout: float = None) -> int:
+        """
+        Block until a snapshot newer than sequence is published, or timeout
+        seconds pass. Returns the latest sequence. Safe from any thread
+        """
+        # taken before reading the sequence, a publish in between has set it
+        changed = self._changed
+        if self.sequence <= sequence:
+            changed.wait(timeout)
+        return self.sequence
+
+    def latest(self, symbol: str) -> BookSnapshot:
+        """Latest snapshot of symbol, None before the first. Safe from any thread"""
+        return self._latest.get(symbol)
+
+    def snapshots(self) -> Dict[str, BookSnapshot]:
+        """Latest snapshot of every symbol. Safe from any thread"""
+        return dict(self._latest)
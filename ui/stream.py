@@ -0,0 +1,56 @@
+'''
+Server-sent events push of snapshot updates to the dashboard.
+
+Each browser holds one EventSource on the stream route. Whenever the
+SnapshotPublisher publishes, the stream sends the latest sequence number of
+every symbol that changed since its last event; updates published while an
+event is being sent, or within min_interval of the last one, are coalesced so
+only the newest sequence per symbol is sent. assets/stream.js writes each event
+into a dcc.Store, and the Dash callbacks reading that store run only when a
+symbol actually changed.
+'''
+import time
+from typing import Iterable, Iterator
+
+from flask import Flask, Response, request
+from yapic import json
+
+from ui.snapshot import SnapshotPublisher
+
+
+def events(publisher: SnapshotPublisher, symbols: Iterable[str] = None, min_interval: float = 0.1, heartbeat: float = 15.0) -> Iterator[str]:
+    """
+    Server-sent event stream of {symbol: sequence} updates for symbols (all
+    symbols when None). A comment is sent after heartbeat idle seconds so
+    proxies keep the connection open.
+    """
+    symbols = set(symbols) if symbols is not None else None
+    seen = {}
+    sequence = 0
+    last = 0.0
+    while True:
+        wait = last + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        current = publisher.wait(sequence, timeout=heartbeat)
+        if current == sequence:
+            yield ': heartbeat\n\n'
+            continue
+        sequence = current
+        changed = {symbol: snapshot.sequence for symbol, snapshot in publisher.snapshots().items()
+                   if snapshot.sequence > seen.get(symbol, 0) and (symbols is None or symbol in symbols)}
+        if not changed:
+            continue
+        seen.update(changed)
+        last = time.monotonic()
+        yield f'data: {json.dumps(changed)}\n\n'
+
+
+def register(server: Flask, publisher: SnapshotPublisher, path: str = '/stream', min_interval: float = 0.1):
+    """Serve events() at path on the Dash app's Flask server, a symbols query argument filters symbols"""
+    def stream():
+        symbols = request.args.get('symbols')
+        return Response(events(publisher, symbols.split(',') if symbols else None, min_interval=min_interval),
+                        mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    server.add_url_rule(path, 'snapshot_stream', stream)
@@ -0,0 +1,95 @@
+'''
+Book processing sharded across worker processes.
+
+The configured symbols are split into one shard per worker. Each worker process
+runs its own feed for its shard along with its own slippage and volatility
+models, and publishes BookSnapshots exactly like the single process dashboard
+does. Every snapshot is sent over a queue to the dashboard process, which only
+renumbers it into its SnapshotPublisher; no book or model state lives there.
+'''
+import multiprocessing
+import os
+from typing import List, Sequence
+
+from cryptofeed.defines import L2_BOOK, TRADES
+from models import SlippageCalculator, VolatilityEngine
+from ui.snapshot import SnapshotPublisher
+
+
+def shard(symbols: Sequence[str], shards: int) -> List[List[str]]:
+    """Split symbols into at most shards non-empty lists of near equal length, in order"""
+    shards = max(1, min(shards, len(symbols)))
+    size, extra = divmod(len(symbols), shards)
+    ret = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        ret.append(list(symbols[start:end]))
+        start = end
+    return [s for s in ret if s]
+
+
+def run_shard(symbols: List[str], queue, interval: float = 0.25, depth: int = 20, quantity: float = 100):
+    """Worker process: feed, models and snapshot publishing for symbols"""
+    # the dashboard process never runs a feed, only its workers import one
+    from cryptofeed import FeedHandler
+    from cryptofeed.exchanges import OKX
+
+    slippage_model = SlippageCalculator()
+    volatility_model = VolatilityEngine()
+
+    def book_metrics(book) -> dict:
+        return {
+            'slippage': slippage_model.estimate(book, quantity),
+            'volatility': volatility_model.current_volatility(book.symbol)
+        }
+
+    publisher = SnapshotPublisher(interval=interval, depth=depth, metrics=book_metrics, sink=queue.put)
+
+    async def book_update(book, timestamp):
+        publisher.update(book)
+
+    async def trade_update(trade, timestamp):
+        volatility_model.update(trade)
+
+    fh = FeedHandler()
+    fh.add_feed(OKX(symbols=symbols, channels=[L2_BOOK, TRADES], callbacks={L2_BOOK: book_update, TRADES: trade_update}))
+    fh.run()
+
+
+class ShardedFeed:
+    def __init__(self, symbols: Sequence[str], publisher: SnapshotPublisher, processes: int = None, interval: float = 0.25, depth: int = 20):
+        """
+        publisher: SnapshotPublisher
+            receives the snapshots of every worker
+        processes: int
+            number of worker processes, defaults to the number of CPUs
+        interval, depth: see SnapshotPublisher, applied in each worker
+        """
+        self.publisher = publisher
+        self.shards = shard(symbols, processes or os.cpu_count() or 1)
+        # spawned, the dashboard process has server threads running
+        context = multiprocessing.get_context('spawn')
+        self.queue = context.Queue()
+        self.processes = [context.Process(target=run_shard, args=(symbols, self.queue, interval, depth), name=f'feed-shard-{i}', daemon=True)
+                          for i, symbols in enumerate(self.shards)]
+
+    def start(self):
+        for process in self.processes:
+            if process.pid is None:
+                process.start()
+
+    def run(self):
+        """Start the workers and publish their snapshots until stopped, blocks"""
+        self.start()
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                return
+            self.publisher.put(snapshot)
+
+    def stop(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.queue.put(None)